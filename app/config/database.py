@@ -1,10 +1,57 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, GEOSPHERE
 from .settings import settings
 
-client = AsyncIOMotorClient(settings.MONGO_URL)
+client = AsyncIOMotorClient(settings.MONGO_URL, maxPoolSize=settings.MONGO_MAX_POOL_SIZE)
 
 db = client[settings.MONGO_DB_NAME]   
 
 collection_user = db["users"]
 collection_route = db["routes"]
-collection_stop = db["stops"]
\ No newline at end of file
+collection_stop = db["stops"]
+collection_refresh_token = db["refresh_tokens"]
+collection_stop_tombstone = db["stop_tombstones"]
+collection_customer = db["customers"]
+
+
+async def create_indexes():
+    """
+    Crea (si no existen) los índices que necesitan nuestras consultas.
+    Se llama una sola vez al arrancar la aplicación (ver main.py).
+    """
+    # Índice geoespacial para las búsquedas por cercanía ($geoNear)
+    await collection_stop.create_index([("location", GEOSPHERE)])
+
+    # Paradas de una ruta en orden (listados y exportaciones)
+    await collection_stop.create_index(
+        [("route_id", ASCENDING), ("order_in_route", ASCENDING)]
+    )
+
+
+    # Sincronización incremental: cambios y borrados por ruta desde una fecha
+    await collection_stop.create_index(
+        [("route_id", ASCENDING), ("updated_at", ASCENDING)]
+    )
+    await collection_stop_tombstone.create_index(
+        [("route_id", ASCENDING), ("deleted_at", ASCENDING)]
+    )
+    await collection_stop_tombstone.create_index(
+        [("deleted_at", ASCENDING)],
+        expireAfterSeconds=settings.SYNC_TOMBSTONE_RETENTION_DAYS * 24 * 3600,
+    )
+
+    # Directorio de clientes: una entrada por (teléfono E.164, dirección).
+    # El mismo índice sirve para buscar solo por teléfono.
+    await collection_customer.create_index(
+        [("phone_e164", ASCENDING), ("address_hash", ASCENDING)], unique=True
+    )
+
+    # Refresh tokens: búsqueda por hash, revocación por usuario
+    # y borrado automático (TTL) cuando expiran
+    await collection_refresh_token.create_index(
+        [("token_hash", ASCENDING)], unique=True
+    )
+    await collection_refresh_token.create_index([("user_id", ASCENDING)])
+    await collection_refresh_token.create_index(
+        [("expires_at", ASCENDING)], expireAfterSeconds=0
+    )
\ No newline at end of file
@@ -1,4 +1,6 @@
+from pydantic import Field
 from pydantic_settings import BaseSettings
+from typing import Optional
 
 class Settings(BaseSettings):
     """
@@ -9,12 +11,99 @@ class Settings(BaseSettings):
     # --- Variables de Base de Datos ---
     MONGO_URL: str
     MONGO_DB_NAME: str
+    # Conexiones máximas del pool de Motor (ver ADMISSION_*)
+    MONGO_MAX_POOL_SIZE: int = 100
 
     # --- Variables de Seguridad (JWT) ---
     # Las que acabamos de definir para 'security.py'
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Refresh tokens (opacos, rotativos, guardados hasheados en la BBDD)
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 14
+
+    # --- Sincronización incremental (delta sync) ---
+    # La watermark queda unos segundos atrás de "ahora" (escrituras en vuelo)
+    SYNC_WATERMARK_LAG_SECONDS: int = 2
+    # Días que se guardan los tombstones; watermarks más viejas => resync completo
+    SYNC_TOMBSTONE_RETENTION_DAYS: int = 30
+
+    # --- Despacho (reparto de paradas entre repartidores) ---
+    DISPATCH_MAX_STOPS: int = 10_000
+    DISPATCH_MAX_DRIVERS: int = 200
+
+    # --- ETAs y ventanas horarias ---
+    # Velocidad media del repartidor y minutos de atención por parada.
+    # Las distancias son en línea recta (haversine): el factor de desvío
+    # las aproxima a la distancia real por calles.
+    ETA_SPEED_KMH: float = 25.0
+    ETA_SERVICE_MINUTES: float = 5.0
+    ETA_DETOUR_FACTOR: float = 1.3
+
+    # --- Compresión de respuestas (gzip / brotli) ---
+    # Respuestas más chicas que esto no se comprimen (no compensa)
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    # Si un endpoint comprime a más de este ratio (ahorro < 10%), deja de
+    # comprimirse; se re-mide 1 de cada N respuestas
+    COMPRESSION_MAX_RATIO: float = 0.9
+    COMPRESSION_MIN_SAMPLES: int = 20
+    COMPRESSION_RESAMPLE_EVERY: int = 50
+    # Peso de la historia en el ratio (0.8 => cada muestra nueva pesa 20%)
+    COMPRESSION_RATIO_DECAY: float = 0.8
+
+    # --- Logging (JSON, asíncrono vía cola) ---
+    LOG_LEVEL: str = "INFO"
+    # Si la cola se llena, los registros nuevos se descartan (nunca bloquea)
+    LOG_QUEUE_MAX_SIZE: int = 10_000
+
+    # --- Límite de intentos de Login (token bucket) ---
+    # Capacidad = ráfaga máxima; refill = intentos recuperados por minuto.
+    # El backend en memoria es POR WORKER: con N workers el límite real es N veces este.
+    LOGIN_RATE_LIMIT_ENABLED: bool = True
+    LOGIN_ACCOUNT_BUCKET_CAPACITY: int = Field(5, gt=0)
+    LOGIN_ACCOUNT_REFILL_PER_MINUTE: float = Field(5, gt=0)
+    LOGIN_CLIENT_BUCKET_CAPACITY: int = Field(20, gt=0)
+    LOGIN_CLIENT_REFILL_PER_MINUTE: float = Field(20, gt=0)
+    RATE_LIMIT_MAX_KEYS: int = Field(100_000, gt=0)
+    # IPs / redes (separadas por coma) de los proxies inversos de confianza.
+    # Solo de ellos se acepta 'X-Forwarded-For' para identificar al cliente.
+    TRUSTED_PROXY_IPS: str = ""
+
+    # --- Control de admisión (load shedding) ---
+    # Requests simultáneas por clase; la suma debería quedar por debajo
+    # de MONGO_MAX_POOL_SIZE para que la BBDD nunca se sature.
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_READ_CONCURRENCY: int = 48
+    ADMISSION_WRITE_CONCURRENCY: int = 24
+    ADMISSION_AUTH_CONCURRENCY: int = 8
+    # Requests que pueden esperar en fila (más allá: 503 inmediato)
+    ADMISSION_READ_MAX_QUEUE: int = 200
+    ADMISSION_WRITE_MAX_QUEUE: int = 100
+    ADMISSION_AUTH_MAX_QUEUE: int = 50
+    # Tiempo máximo en la fila antes de responder 503
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 1.0
+    ADMISSION_RETRY_AFTER_SECONDS: int = 2
+
+    # --- Geocodificación ---
+    # Archivo compacto de barrios (ver app/core/geodata.py).
+    # Si no se define, se usa el dict BOUNDING_BOXES del validador.
+    GEODATA_PATH: Optional[str] = None
+
+    # Proveedor: "bbox" (simulador local, por defecto) o "http"
+    # (servicio externo; ver app/tools/geocoding_server.py para uno de prueba)
+    GEOCODER_PROVIDER: str = "bbox"
+    GEOCODER_URL: Optional[str] = None
+    GEOCODER_TIMEOUT_SECONDS: float = 2.0
+    GEOCODER_MAX_CONCURRENCY: int = 8
+    GEOCODER_BATCH_SIZE: int = 100
+    # Caché LRU: coordenadas redondeadas a N decimales (4 ~ 11 metros)
+    GEOCODER_CACHE_SIZE: int = 50_000
+    GEOCODER_CACHE_PRECISION: int = 4
+    # Circuit breaker: fallos seguidos para abrir / segundos abierto
+    GEOCODER_BREAKER_FAILURES: int = 5
+    GEOCODER_BREAKER_RESET_SECONDS: float = 30
 
     class Config:
         # Le dice a Pydantic que lea el archivo .env
@@ -0,0 +1,210 @@
+"""
+Control de admisión (load shedding) para las requests que van a MongoDB.
+
+Cuando la base se pone lenta, las requests se siguen acumulando sobre el
+pool de Motor y la latencia sube para TODOS (incluso '/users/me').
+Este middleware limita cuántas requests de cada clase se atienden a la
+vez y cuánto puede esperar una request en la fila:
+
+- "read":  GET / HEAD
+- "write": POST / PUT / PATCH / DELETE
+- "auth":  /token* (verificar contraseñas es caro: cupo propio)
+
+Si la fila está llena, o la espera supera el deadline, se responde
+enseguida con 503 + 'Retry-After' en lugar de degradar a todos.
+La documentación y /metrics no pasan por aquí (hay que poder
+observar el sistema justamente cuando está saturado).
+"""
+import asyncio
+import json
+import time
+from typing import Any, Dict, Optional
+
+from app.config.settings import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Prefijos que no consumen cupo (no tocan la BBDD o sirven para diagnosticar)
+EXEMPT_PREFIXES = ("/docs", "/redoc", "/openapi.json", "/metrics")
+
+
+# --- 1. Cupo de una clase de endpoints ---
+
+class AdmissionClass:
+    """
+    Semáforo con fila acotada y deadline de espera.
+    Lleva los contadores que expone /metrics/admission.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        self.in_flight = 0
+        self.queued = 0
+        self.peak_queued = 0
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self.total_wait_ms = 0.0
+
+    async def acquire(self) -> Optional[str]:
+        """
+        Espera un lugar. Devuelve None si se admitió, o el motivo del
+        rechazo ('queue_full' / 'timeout').
+        """
+        if not self._semaphore.locked():
+            # Hay lugar libre: entra sin esperar
+            await self._semaphore.acquire()
+        else:
+            if self.queued >= self.max_queue:
+                self.shed_queue_full += 1
+                return "queue_full"
+
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.shed_timeout += 1
+                return "timeout"
+            finally:
+                self.queued -= 1
+            self.total_wait_ms += (time.perf_counter() - start) * 1000
+
+        self.in_flight += 1
+        self.admitted += 1
+        return None
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout_s": self.queue_timeout,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "peak_queued": self.peak_queued,
+            "admitted": self.admitted,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+            "avg_wait_ms": round(self.total_wait_ms / max(self.admitted, 1), 3),
+        }
+
+
+# --- 2. Controlador (clasifica y reparte los cupos) ---
+
+class AdmissionController:
+
+    def __init__(self):
+        self.enabled = settings.ADMISSION_ENABLED
+        self.retry_after = settings.ADMISSION_RETRY_AFTER_SECONDS
+        self.classes = {
+            "read": AdmissionClass(
+                "read",
+                settings.ADMISSION_READ_CONCURRENCY,
+                settings.ADMISSION_READ_MAX_QUEUE,
+                settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+            ),
+            "write": AdmissionClass(
+                "write",
+                settings.ADMISSION_WRITE_CONCURRENCY,
+                settings.ADMISSION_WRITE_MAX_QUEUE,
+                settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+            ),
+            "auth": AdmissionClass(
+                "auth",
+                settings.ADMISSION_AUTH_CONCURRENCY,
+                settings.ADMISSION_AUTH_MAX_QUEUE,
+                settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+            ),
+        }
+
+    def classify(self, method: str, path: str) -> Optional[str]:
+        """Clase de la request, o None si no pasa por el control."""
+        if method == "OPTIONS" or path == "/" or path.startswith(EXEMPT_PREFIXES):
+            return None
+        if path.startswith("/token"):
+            return "auth"
+        if method in ("GET", "HEAD"):
+            return "read"
+        return "write"
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "retry_after_s": self.retry_after,
+            "classes": {name: cls.stats() for name, cls in self.classes.items()},
+        }
+
+
+# Instancia única (igual que 'settings')
+admission_controller = AdmissionController()
+
+
+# --- 3. Middleware ---
+
+class AdmissionMiddleware:
+    """
+    Middleware ASGI: reserva un lugar de la clase de la request y lo
+    libera cuando termina la respuesta (incluidas las de streaming).
+    """
+
+    def __init__(self, app, controller: AdmissionController = admission_controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.controller.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        class_name = self.controller.classify(scope.get("method", ""), scope.get("path", ""))
+        if class_name is None:
+            await self.app(scope, receive, send)
+            return
+
+        admission = self.controller.classes[class_name]
+        reason = await admission.acquire()
+        if reason is not None:
+            logger.warning(
+                "Request rechazada por sobrecarga",
+                extra={"fields": {
+                    "class": class_name,
+                    "reason": reason,
+                    "path": scope.get("path"),
+                    "in_flight": admission.in_flight,
+                    "queued": admission.queued,
+                }},
+            )
+            await self._send_overloaded(send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release()
+
+    async def _send_overloaded(self, send) -> None:
+        body = json.dumps(
+            {"detail": "El servidor está sobrecargado. Intenta nuevamente en unos segundos."},
+            ensure_ascii=False,
+        ).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(self.controller.retry_after).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
\ No newline at end of file
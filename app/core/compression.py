@@ -0,0 +1,419 @@
+"""
+Compresión negociada (brotli / gzip) y representación MessagePack.
+
+- CompressionMiddleware: comprime las respuestas según 'Accept-Encoding'
+  (brotli si está instalado, si no gzip), solo a partir de un tamaño
+  mínimo y solo para tipos de contenido que valen la pena.
+  Mide el costo (tiempo) y la ganancia (bytes) por endpoint: si un
+  endpoint casi no se comprime, se deja de comprimir (con re-muestreo
+  ocasional por si sus respuestas cambian). La decisión usa un ratio
+  con decaimiento (pesan más las muestras recientes), así un endpoint
+  apagado vuelve a comprimirse apenas el re-muestreo muestra que conviene.
+
+- NegotiatedResponse: devuelve 'application/msgpack' en lugar de JSON
+  cuando el cliente lo prefiere en 'Accept' (mayor q que JSON).
+
+'brotli' y 'msgpack' son dependencias opcionales: sin ellas se
+usa gzip y JSON.
+"""
+import time
+import zlib
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+
+from app.config.settings import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependencia opcional
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - dependencia opcional
+    msgpack = None
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+# Tipos de contenido que se comprimen bien (texto repetitivo)
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/geo+json",
+    "application/msgpack",
+    "text/",
+)
+
+# Formato de respuesta pedido por el cliente (lo fija el middleware)
+response_format_var: ContextVar[str] = ContextVar("response_format", default="json")
+
+
+# --- 1. Métricas de codificación ---
+
+class EncodingStats:
+    """
+    Contadores por endpoint: bytes antes/después y tiempo de CPU.
+    Son la base para decidir si comprimir sigue valiendo la pena.
+    """
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _entry(self, key: str) -> Dict[str, float]:
+        entry = self._stats.get(key)
+        if entry is None:
+            entry = {
+                "responses": 0,
+                "encoded": 0,
+                "skipped": 0,
+                "bytes_in": 0,
+                "bytes_out": 0,
+                "encode_ms": 0.0,
+                # Bytes con decaimiento exponencial (para decidir)
+                "recent_in": 0.0,
+                "recent_out": 0.0,
+            }
+            self._stats[key] = entry
+        return entry
+
+    def record(self, key: str, bytes_in: int, bytes_out: int, seconds: float) -> None:
+        entry = self._entry(key)
+        entry["responses"] += 1
+        entry["encoded"] += 1
+        entry["bytes_in"] += bytes_in
+        entry["bytes_out"] += bytes_out
+        entry["encode_ms"] += seconds * 1000
+
+        decay = settings.COMPRESSION_RATIO_DECAY
+        entry["recent_in"] = entry["recent_in"] * decay + bytes_in
+        entry["recent_out"] = entry["recent_out"] * decay + bytes_out
+
+    def record_skip(self, key: str) -> None:
+        entry = self._entry(key)
+        entry["responses"] += 1
+        entry["skipped"] += 1
+
+    def ratio(self, key: str) -> Optional[float]:
+        """
+        Tamaño comprimido / original RECIENTE (None si aún no hay muestras).
+        Cada muestra vieja pesa COMPRESSION_RATIO_DECAY veces menos que
+        la siguiente: el ratio sigue a las respuestas actuales.
+        """
+        entry = self._stats.get(key)
+        if not entry or entry["encoded"] < settings.COMPRESSION_MIN_SAMPLES:
+            return None
+        return entry["recent_out"] / max(entry["recent_in"], 1)
+
+    def pays_off(self, key: str) -> bool:
+        """
+        ¿Conviene comprimir este endpoint?
+        Si el ahorro medido es bajo, solo comprimimos 1 de cada
+        COMPRESSION_RESAMPLE_EVERY respuestas para seguir midiendo.
+        """
+        ratio = self.ratio(key)
+        if ratio is None or ratio <= settings.COMPRESSION_MAX_RATIO:
+            return True
+        entry = self._stats[key]
+        return entry["responses"] % settings.COMPRESSION_RESAMPLE_EVERY == 0
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        result = {}
+        for key, entry in self._stats.items():
+            encoded = max(entry["encoded"], 1)
+            result[key] = {
+                **entry,
+                "ratio": round(entry["bytes_out"] / max(entry["bytes_in"], 1), 3),
+                "recent_ratio": round(entry["recent_out"] / max(entry["recent_in"], 1), 3),
+                "avg_encode_ms": round(entry["encode_ms"] / encoded, 3),
+            }
+        return result
+
+
+compression_stats = EncodingStats()
+
+# Costo de serializar en MessagePack (respuestas, bytes, tiempo)
+msgpack_stats: Dict[str, float] = {"responses": 0, "bytes_out": 0, "encode_ms": 0.0}
+
+
+# --- 2. Negociación ---
+
+def _parse_accept(header: str) -> Dict[str, float]:
+    """'gzip;q=0.8, br' -> {'gzip': 0.8, 'br': 1.0}"""
+    accepted: Dict[str, float] = {}
+    for part in header.split(","):
+        pieces = part.strip().split(";")
+        token = pieces[0].strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        for param in pieces[1:]:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[token] = quality
+    return accepted
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Elige 'br', 'gzip' o None (sin comprimir): la de mayor q.
+    - Una codificación nombrada usa su propio q (aunque sea 0); las no
+      nombradas toman el q del comodín '*'.
+    - A igual q se prefiere brotli (comprime más).
+    - Si 'identity' se pide explícitamente con un q mayor, no se comprime.
+    """
+    accepted = _parse_accept(accept_encoding)
+    wildcard_q = accepted.get("*", 0)
+
+    available = ("br", "gzip") if brotli is not None else ("gzip",)
+    best, best_q = None, 0.0
+    for encoding in available:
+        quality = accepted.get(encoding, wildcard_q)
+        if quality > best_q:
+            best, best_q = encoding, quality
+
+    if best is not None and accepted.get("identity", 0) > best_q:
+        return None
+    return best
+
+
+def wants_msgpack(accept: str) -> bool:
+    """
+    ¿El cliente prefiere MessagePack a JSON?
+    'application/json, application/msgpack;q=0.1' -> False (prefiere JSON).
+    Si JSON solo está cubierto por un comodín ('*/*', 'application/*'),
+    un msgpack pedido explícitamente con igual q gana.
+    """
+    if msgpack is None:
+        return False
+    accepted = _parse_accept(accept)
+    msgpack_q = max(accepted.get(media_type, 0) for media_type in MSGPACK_MEDIA_TYPES)
+    if msgpack_q <= 0:
+        return False
+
+    if "application/json" in accepted:
+        return msgpack_q > accepted["application/json"]
+    json_q = max(accepted.get("application/*", 0), accepted.get("*/*", 0))
+    return msgpack_q >= json_q
+
+
+# --- 3. Compresores (con la misma interfaz para br y gzip) ---
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            self._zlib = zlib.compressobj(
+                settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31
+            )
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+def _get_header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _without_headers(headers, names) -> List[Tuple[bytes, bytes]]:
+    return [(key, value) for key, value in headers if key.lower() not in names]
+
+
+def _add_vary(headers: List[Tuple[bytes, bytes]], value: bytes) -> List[Tuple[bytes, bytes]]:
+    vary = _get_header(headers, b"vary")
+    if vary is None:
+        return headers + [(b"vary", value)]
+    if value.lower() in vary.lower():
+        return headers
+    return _without_headers(headers, {b"vary"}) + [(b"vary", vary + b", " + value)]
+
+
+# --- 4. Middleware ---
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI de compresión negociada.
+    También fija el formato de respuesta (JSON / MessagePack) pedido en 'Accept'.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = scope.get("headers", [])
+        accept = (_get_header(request_headers, b"accept") or b"").decode("latin-1")
+        format_token = response_format_var.set("msgpack" if wants_msgpack(accept) else "json")
+
+        encoding = choose_encoding(
+            (_get_header(request_headers, b"accept-encoding") or b"").decode("latin-1")
+        )
+
+        try:
+            await _CompressedResponder(scope, send, encoding).run(self.app, receive)
+        finally:
+            response_format_var.reset(format_token)
+
+
+class _CompressedResponder:
+    """
+    Estado de UNA respuesta que quizás se comprima.
+    Toda respuesta comprimible lleva 'Vary: Accept-Encoding', se comprima
+    o no: si no, un cache podría servir la versión sin comprimir a quien
+    sí acepta gzip (o peor, la comprimida a quien no la acepta).
+    """
+
+    def __init__(self, scope, send, encoding: Optional[str]):
+        self.scope = scope
+        self.send = send
+        self.encoding = encoding
+        self.start_message = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+    def _stats_key(self) -> str:
+        # La plantilla de la ruta ('/routes/{route_id}/stops'), no la URL real
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or "otros"
+
+    def _is_compressible(self, headers) -> bool:
+        status = self.start_message["status"]
+        if status in (204, 304) or status < 200:
+            return False
+        if _get_header(headers, b"content-encoding") is not None:
+            return False
+        content_type = (_get_header(headers, b"content-type") or b"").decode("latin-1")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    async def run(self, app, receive) -> None:
+        await app(self.scope, receive, self.send_wrapper)
+
+    async def send_wrapper(self, message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            if self.encoding is None:
+                # El cliente no acepta compresión: se envía tal cual (con Vary)
+                self.passthrough = True
+                await self.send(self._passthrough_start())
+            # Si no, esperamos al primer pedazo del body para decidir
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            headers = list(self.start_message.get("headers", []))
+            key = self._stats_key()
+
+            if (
+                not self._is_compressible(headers)
+                or (not more_body and len(body) < settings.COMPRESSION_MINIMUM_SIZE)
+                or not compression_stats.pays_off(key)
+            ):
+                if self._is_compressible(headers):
+                    compression_stats.record_skip(key)
+                self.passthrough = True
+                await self.send(self._passthrough_start())
+                await self.send(message)
+                return
+
+            self.compressor = _Compressor(self.encoding)
+            headers = _without_headers(headers, {b"content-length"})
+            headers.append((b"content-encoding", self.encoding.encode("latin-1")))
+            headers = _add_vary(headers, b"Accept-Encoding")
+
+            if not more_body:
+                # Respuesta completa: podemos fijar el Content-Length final
+                compressed = self._compress(body, finish=True)
+                headers.append((b"content-length", str(len(compressed)).encode("latin-1")))
+                await self.send({**self.start_message, "headers": headers})
+                await self.send({"type": "http.response.body", "body": compressed})
+                self._record()
+                return
+
+            await self.send({**self.start_message, "headers": headers})
+
+        # Respuesta en streaming: comprimimos pedazo a pedazo
+        compressed = self._compress(body, finish=not more_body)
+        if compressed or not more_body:
+            await self.send({
+                "type": "http.response.body",
+                "body": compressed,
+                "more_body": more_body,
+            })
+        if not more_body:
+            self._record()
+
+    def _passthrough_start(self):
+        """El 'http.response.start' original, con Vary si es comprimible."""
+        headers = list(self.start_message.get("headers", []))
+        if not self._is_compressible(headers):
+            return self.start_message
+        return {**self.start_message, "headers": _add_vary(headers, b"Accept-Encoding")}
+
+    def _compress(self, body: bytes, finish: bool) -> bytes:
+        start = time.perf_counter()
+        compressed = self.compressor.compress(body)
+        if finish:
+            compressed += self.compressor.finish()
+        self.seconds += time.perf_counter() - start
+        self.bytes_in += len(body)
+        self.bytes_out += len(compressed)
+        return compressed
+
+    def _record(self) -> None:
+        compression_stats.record(self._stats_key(), self.bytes_in, self.bytes_out, self.seconds)
+
+
+# --- 5. Respuesta JSON / MessagePack ---
+
+class NegotiatedResponse(JSONResponse):
+    """
+    JSONResponse que se serializa como MessagePack si el cliente lo
+    pidió ('Accept: application/msgpack'). Se usa como
+    'default_response_class' en los routers de rutas y paradas.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if response_format_var.get() != "msgpack" or msgpack is None:
+            return super().render(content)
+
+        start = time.perf_counter()
+        body = msgpack.packb(content, use_bin_type=True, default=str)
+        msgpack_stats["responses"] += 1
+        msgpack_stats["bytes_out"] += len(body)
+        msgpack_stats["encode_ms"] += (time.perf_counter() - start) * 1000
+
+        self.media_type = MSGPACK_MEDIA_TYPES[0]
+        return body
+
+    def init_headers(self, headers=None) -> None:
+        super().init_headers(headers)
+        # La representación depende de 'Accept': los caches deben saberlo
+        self.raw_headers = _add_vary(self.raw_headers, b"Accept")
@@ -0,0 +1,212 @@
+"""
+Directorio de clientes: la 'verdad' de la calle (validation_data) ya
+cargada para un cliente se reutiliza en sus próximas paradas.
+
+Clave de cada entrada:
+- el teléfono normalizado a E.164 (ver _normalize_phone_ar), y
+- un hash de la dirección normalizada (minúsculas, sin acentos ni
+  signos), así "Calle 7 N° 1234" y "calle 7 nº 1234" son la misma.
+
+Si una parada trae 'validation_data', se guarda (o actualiza) en el
+directorio. Si no la trae, se completa desde el directorio.
+Todo se resuelve con UNA consulta y UNA escritura masiva por lote; la
+escritura se hace recién cuando las paradas se guardaron (si la
+inserción falla, el directorio no aprende nada de ese lote).
+"""
+import hashlib
+import re
+import unicodedata
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from app.config.database import collection_customer
+from app.core.logger import get_logger
+from app.core.validator import _normalize_phone_ar
+
+logger = get_logger(__name__)
+
+# Código de MongoDB para "clave duplicada" (índice único)
+DUPLICATE_KEY = 11000
+
+# Palabras que no cambian la dirección ("N° 1234", "nro. 1234")
+ADDRESS_NOISE_WORDS = {"n", "no", "nro", "num", "numero"}
+
+# Campos de la 'verdad' que se guardan en el directorio
+VALIDATION_FIELDS = ("correct_street", "correct_number", "correct_ref1", "correct_ref2")
+
+CustomerKey = Tuple[str, str]  # (phone_e164, address_hash)
+
+
+# --- 1. Normalización ---
+
+def normalize_address(street: str, number: str) -> str:
+    """'Calle 7 N°', '1.234' -> 'calle 7 1234'"""
+    text = f"{street} {number}".lower()
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r"(?<=\d)[.,](?=\d)", "", text)  # 1.234 -> 1234
+    words = re.sub(r"[^a-z0-9]+", " ", text).split()
+    return " ".join(word for word in words if word not in ADDRESS_NOISE_WORDS)
+
+
+def address_hash(street: str, number: str) -> str:
+    return hashlib.sha1(normalize_address(street, number).encode("utf-8")).hexdigest()
+
+
+def customer_key(phone: str, street: str, number: str) -> Optional[CustomerKey]:
+    """Clave del directorio, o None si el teléfono no es válido."""
+    phone_e164 = _normalize_phone_ar(phone)
+    if phone_e164 is None:
+        return None
+    return phone_e164, address_hash(street, number)
+
+
+def _stop_key(stop) -> Optional[CustomerKey]:
+    return customer_key(stop.phone_cliente, stop.address_street_cliente, stop.address_number_cliente)
+
+
+# --- 2. Consulta masiva ---
+
+async def lookup_customers(keys: Sequence[Optional[CustomerKey]]) -> Dict[CustomerKey, Dict[str, Any]]:
+    """
+    Busca varias claves en UNA consulta (índice (phone_e164, address_hash)).
+    Devuelve solo las encontradas.
+    """
+    wanted = {key for key in keys if key is not None}
+    if not wanted:
+        return {}
+
+    cursor = collection_customer.find({
+        "phone_e164": {"$in": sorted({phone for phone, _ in wanted})}
+    })
+
+    found: Dict[CustomerKey, Dict[str, Any]] = {}
+    async for customer in cursor:
+        key = (customer["phone_e164"], customer["address_hash"])
+        if key in wanted:
+            found[key] = customer
+    return found
+
+
+# --- 3. Completar la 'verdad' de un lote de paradas (solo lectura) ---
+
+async def resolve_validation_data(stops: Sequence[Any]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Devuelve la 'validation_data' de cada parada (mismo orden):
+    - la que trae la parada, o
+    - la de otra parada del mismo cliente en el lote, o
+    - la del directorio, si la parada no trae ninguna.
+    None => la parada no la trae y el cliente no está en el directorio.
+    No escribe nada: el directorio se actualiza con 'remember_customers'
+    recién cuando las paradas se guardaron.
+    """
+    keys = [_stop_key(stop) for stop in stops]
+
+    # Clientes que traen su 'verdad' en este mismo lote (no hace falta buscarlos)
+    provided: Dict[CustomerKey, Dict[str, Any]] = {
+        key: stop.validation_data.model_dump()
+        for stop, key in zip(stops, keys)
+        if stop.validation_data is not None and key is not None
+    }
+    missing_keys = [
+        key for stop, key in zip(stops, keys)
+        if stop.validation_data is None and key not in provided
+    ]
+    known = await lookup_customers(missing_keys)
+
+    resolved: List[Optional[Dict[str, Any]]] = []
+    for stop, key in zip(stops, keys):
+        if stop.validation_data is not None:
+            resolved.append(stop.validation_data.model_dump())
+        elif key in provided:
+            resolved.append(dict(provided[key]))
+        elif key in known:
+            resolved.append({
+                field: known[key]["validation_data"].get(field) for field in VALIDATION_FIELDS
+            })
+        else:
+            resolved.append(None)
+    return resolved
+
+
+# --- 4. Aprender del lote (después de guardar las paradas) ---
+
+def _directory_updates(
+    stops: Sequence[Any],
+    validation_data_list: Sequence[Optional[Dict[str, Any]]],
+    now: datetime,
+) -> List[Tuple[Dict[str, Any], Dict[str, Any], bool]]:
+    """(filtro, update, upsert) por cliente, aunque aparezca varias veces en el lote."""
+    updates: Dict[CustomerKey, Dict[str, Any]] = {}
+
+    for stop, validation_data in zip(stops, validation_data_list):
+        key = _stop_key(stop)
+        if key is None or validation_data is None:
+            continue
+        update = updates.setdefault(key, {"seen": 0})
+        update["seen"] += 1
+        if stop.validation_data is not None:
+            # La 'verdad' enviada pisa a la guardada
+            update["set"] = {
+                "customer_name": stop.customer_name,
+                "address_street": stop.address_street_cliente,
+                "address_number": stop.address_number_cliente,
+                "neighborhood": stop.neighborhood_cliente,
+                "validation_data": validation_data,
+                "updated_at": now,
+            }
+
+    return [
+        (
+            {"phone_e164": phone_e164, "address_hash": hashed_address},
+            {
+                "$set": {**update.get("set", {}), "last_seen_at": now},
+                "$inc": {"times_seen": update["seen"]},
+                "$setOnInsert": {"created_at": now},
+            },
+            # Solo se crean entradas nuevas con una 'verdad' cargada
+            "set" in update,
+        )
+        for (phone_e164, hashed_address), update in updates.items()
+    ]
+
+
+async def remember_customers(
+    stops: Sequence[Any],
+    validation_data_list: Sequence[Optional[Dict[str, Any]]],
+) -> None:
+    """
+    Guarda / actualiza en el directorio a los clientes de un lote de
+    paradas YA insertadas (UNA escritura masiva).
+
+    Dos altas simultáneas del mismo cliente nuevo chocan contra el
+    índice único: el upsert perdedor falla con E11000. Esas operaciones
+    se reintentan como updates comunes (la entrada ya existe).
+    El directorio es un complemento: si la escritura falla, se registra
+    y las paradas (ya guardadas) no se ven afectadas.
+    """
+    updates = _directory_updates(stops, validation_data_list, datetime.now(timezone.utc))
+    if not updates:
+        return
+
+    operations = [UpdateOne(query, update, upsert=upsert) for query, update, upsert in updates]
+    try:
+        try:
+            await collection_customer.bulk_write(operations, ordered=False)
+        except BulkWriteError as exc:
+            errors = exc.details.get("writeErrors", [])
+            if not errors or any(error.get("code") != DUPLICATE_KEY for error in errors):
+                raise
+            retry = [
+                UpdateOne(updates[error["index"]][0], updates[error["index"]][1])
+                for error in errors
+            ]
+            await collection_customer.bulk_write(retry, ordered=False)
+    except PyMongoError as exc:
+        logger.warning(
+            "No se pudo actualizar el directorio de clientes",
+            extra={"fields": {"error": repr(exc), "customers": len(updates)}},
+        )
\ No newline at end of file
@@ -0,0 +1,195 @@
+"""
+Despacho: reparte un conjunto de paradas entre N repartidores.
+
+1. Agrupa las paradas por cercanía con un k-means BALANCEADO
+   (cada grupo recibe floor(n / k) o ceil(n / k) paradas: nunca
+   queda un repartidor sin paradas si hay al menos una por cabeza).
+2. Ordena las paradas de cada grupo con "vecino más cercano".
+
+Todo el cálculo de distancias es vectorizado con numpy: miles de
+paradas se resuelven en milisegundos.
+"""
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Kilómetros por grado (aprox.) para proyectar lat/lon a un plano local
+KM_PER_DEG_LAT = 110.57
+KM_PER_DEG_LON_EQUATOR = 111.32
+
+
+def project_to_plane(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """
+    Proyección equirectangular alrededor del centro de los puntos.
+    Para una ciudad el error es despreciable y las distancias
+    euclídeas quedan en kilómetros.
+    """
+    lat0 = np.deg2rad(lat.mean())
+    x = lon * KM_PER_DEG_LON_EQUATOR * np.cos(lat0)
+    y = lat * KM_PER_DEG_LAT
+    return np.column_stack((x, y))
+
+
+def _kmeans_plus_plus(points: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """Centros iniciales bien separados (k-means++)."""
+    centers = np.empty((k, 2))
+    centers[0] = points[rng.integers(len(points))]
+    closest_sq = ((points - centers[0]) ** 2).sum(axis=1)
+
+    for i in range(1, k):
+        total = closest_sq.sum()
+        if total == 0:
+            # Todos los puntos coinciden con algún centro
+            centers[i] = points[rng.integers(len(points))]
+        else:
+            centers[i] = points[rng.choice(len(points), p=closest_sq / total)]
+        closest_sq = np.minimum(closest_sq, ((points - centers[i]) ** 2).sum(axis=1))
+
+    return centers
+
+
+def _balanced_assign(distances: np.ndarray) -> np.ndarray:
+    """
+    Asigna cada punto a su centro más cercano que aún tenga lugar.
+    Primero van los puntos que más "pierden" si no consiguen su centro
+    preferido (mayor diferencia entre su mejor y su peor opción).
+
+    Cada grupo tiene lugar para floor(n / k) puntos, y n % k grupos
+    (los primeros que lo pidan) reciben uno más. Los lugares suman
+    exactamente n: todos los grupos se llenan, con a lo sumo 1 de
+    diferencia entre ellos.
+    """
+    n, k = distances.shape
+    base_capacity, extra_slots = divmod(n, k)
+    preference = np.argsort(distances, axis=1)
+    regret = distances.max(axis=1) - distances.min(axis=1)
+
+    # Listas de Python: en este bucle son mucho más rápidas que numpy
+    preference_list = preference.tolist()
+    labels = [0] * n
+    load = [0] * k
+
+    for point in np.argsort(-regret).tolist():
+        for cluster in preference_list[point]:
+            if load[cluster] < base_capacity:
+                pass
+            elif load[cluster] == base_capacity and extra_slots > 0:
+                extra_slots -= 1
+            else:
+                continue
+            labels[point] = cluster
+            load[cluster] += 1
+            break
+
+    return np.asarray(labels, dtype=np.int64)
+
+
+def balanced_kmeans(
+    points: np.ndarray,
+    k: int,
+    max_iterations: int = 30,
+    tolerance_km: float = 0.01,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    k-means con capacidad: devuelve la etiqueta (0..k-1) de cada punto.
+    Cada grupo tiene floor(n / k) o ceil(n / k) puntos.
+    Termina cuando ningún centro se mueve más de 'tolerance_km'.
+    """
+    n = len(points)
+    k = min(k, n)
+    rng = np.random.default_rng(seed)
+
+    centers = _kmeans_plus_plus(points, k, rng)
+    points_sq = (points ** 2).sum(axis=1)[:, None]
+
+    for _ in range(max_iterations):
+        # Distancias de TODOS los puntos a TODOS los centros (n x k):
+        # |p - c|^2 = |p|^2 - 2 p.c + |c|^2 (un solo producto de matrices)
+        distances_sq = points_sq - 2 * points @ centers.T + (centers ** 2).sum(axis=1)
+        distances = np.sqrt(np.maximum(distances_sq, 0))
+        labels = _balanced_assign(distances)
+
+        # Nuevos centros = promedio de cada grupo (nunca dividimos por 0)
+        counts = np.bincount(labels, minlength=k)
+        new_centers = np.column_stack([
+            np.bincount(labels, weights=points[:, dim], minlength=k) / np.maximum(counts, 1)
+            for dim in range(2)
+        ])
+
+        # Un grupo vacío se re-siembra en el punto más alejado de su centro
+        empty = np.flatnonzero(counts == 0)
+        if empty.size:
+            spread = distances[np.arange(n), labels]
+            for cluster in empty.tolist():
+                farthest = int(np.argmax(spread))
+                new_centers[cluster] = points[farthest]
+                spread[farthest] = -1
+
+        shift = np.sqrt(((new_centers - centers) ** 2).sum(axis=1)).max()
+        centers = new_centers
+        if shift < tolerance_km:
+            break
+
+    return labels
+
+
+def nearest_neighbor_order(points: np.ndarray, start: np.ndarray) -> np.ndarray:
+    """
+    Orden de visita: desde 'start', siempre a la parada pendiente más cercana.
+    Devuelve los índices de 'points' en orden.
+    """
+    n = len(points)
+    visited = np.zeros(n, dtype=bool)
+    order = np.empty(n, dtype=np.int64)
+    current = start
+
+    for step in range(n):
+        distances = ((points - current) ** 2).sum(axis=1)
+        distances[visited] = np.inf
+        nearest = int(np.argmin(distances))
+        order[step] = nearest
+        visited[nearest] = True
+        current = points[nearest]
+
+    return order
+
+
+def plan_routes(
+    lat: List[float],
+    lon: List[float],
+    n_drivers: int,
+    depot: Optional[Tuple[float, float]] = None,
+) -> List[List[int]]:
+    """
+    Reparte las paradas (lat, lon) entre 'n_drivers' rutas.
+
+    Devuelve una lista por repartidor con los índices de sus paradas
+    ya ordenados (la posición en la lista = order_in_route).
+    Si hay más repartidores que paradas, algunas listas quedan vacías.
+    """
+    lat_arr = np.asarray(lat, dtype=np.float64)
+    lon_arr = np.asarray(lon, dtype=np.float64)
+
+    if depot is not None:
+        # Proyectamos el depósito junto con las paradas (mismo plano)
+        projected = project_to_plane(
+            np.append(lat_arr, depot[0]), np.append(lon_arr, depot[1])
+        )
+        points, start = projected[:-1], projected[-1]
+    else:
+        points = project_to_plane(lat_arr, lon_arr)
+        start = points.mean(axis=0)
+
+    labels = balanced_kmeans(points, n_drivers)
+
+    routes: List[List[int]] = []
+    for cluster in range(n_drivers):
+        members = np.flatnonzero(labels == cluster)
+        if len(members) == 0:
+            routes.append([])
+            continue
+        order = nearest_neighbor_order(points[members], start)
+        routes.append(members[order].tolist())
+
+    return routes
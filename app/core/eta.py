@@ -0,0 +1,284 @@
+"""
+Motor de ETAs y ventanas horarias de una ruta.
+
+Con las paradas en su 'order_in_route', calcula cuándo se llega a cada
+una (distancia haversine x factor de desvío / velocidad media), cuánto
+se espera si se llega antes de su ventana y cuáles llegan TARDE.
+
+Todo el cálculo es vectorizado con numpy. Las esperas encadenan los
+horarios ("si espero en la 3, llego más tarde a todas las siguientes"),
+pero tienen forma cerrada con un máximo acumulado:
+
+    inicio_i = C_i + max(salida, max_{j<=i} (ventana_j - C_j))
+
+donde C_i es el tiempo acumulado de viaje + atención hasta la parada i.
+
+Cuando se mueve UNA parada, solo cambian ella y las siguientes: se
+recalcula ese sufijo partiendo de la salida (ya guardada) de la anterior.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+from app.config.database import collection_stop
+from app.config.settings import settings
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+# --- 1. Cálculo vectorizado (numpy puro, sin BBDD) ---
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Distancia (km) entre pares de puntos, elemento a elemento."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def compute_schedule(
+    lat: Sequence[float],
+    lon: Sequence[float],
+    window_start: np.ndarray,
+    window_end: np.ndarray,
+    start_time: float,
+    previous_point: Optional[Tuple[float, float]] = None,
+    service_seconds: Optional[float] = None,
+    speed_kmh: Optional[float] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Horarios (segundos epoch) de paradas consecutivas.
+
+    - 'start_time': salida desde 'previous_point' (la parada anterior ya
+      calculada). Sin 'previous_point' es la llegada a la primera parada.
+    - 'window_start' / 'window_end': -inf / +inf donde no hay ventana.
+    """
+    if service_seconds is None:
+        service_seconds = settings.ETA_SERVICE_MINUTES * 60
+    if speed_kmh is None:
+        speed_kmh = settings.ETA_SPEED_KMH
+
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    n = len(lat)
+
+    # Tramo que llega a cada parada (el primero desde 'previous_point')
+    leg_km = np.zeros(n)
+    if n > 1:
+        leg_km[1:] = haversine_km(lat[:-1], lon[:-1], lat[1:], lon[1:])
+    if previous_point is not None and n:
+        leg_km[0] = haversine_km(previous_point[0], previous_point[1], lat[0], lon[0])
+    leg_km *= settings.ETA_DETOUR_FACTOR
+    travel_s = leg_km / speed_kmh * 3600
+
+    # C_i: viaje acumulado + atención de las paradas ANTERIORES a i
+    cumulative = np.cumsum(travel_s) + service_seconds * np.arange(n)
+
+    # u_i = inicio_i - C_i (máximo acumulado: las esperas se arrastran)
+    offset = np.maximum.accumulate(np.maximum(window_start - cumulative, start_time))
+    service_start = cumulative + offset
+    arrival = cumulative + np.concatenate(([start_time], offset[:-1]))[:n]
+    late_by = np.maximum(service_start - window_end, 0)
+
+    return {
+        "leg_km": leg_km,
+        "arrival": arrival,
+        "service_start": service_start,
+        "departure": service_start + service_seconds,
+        "wait_s": service_start - arrival,
+        "late": late_by > 0,
+        "late_by_s": late_by,
+    }
+
+
+# --- 2. Conversión de fechas ---
+
+def _to_epoch(value: Optional[datetime], default: float) -> float:
+    if value is None:
+        return default
+    if value.tzinfo is None:
+        # Motor devuelve fechas UTC "naive"
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _from_epoch(value: float) -> datetime:
+    return datetime.fromtimestamp(float(value), timezone.utc)
+
+
+def _windows(stops: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    window_start = np.array([_to_epoch(stop.get("time_window_start"), -np.inf) for stop in stops])
+    window_end = np.array([_to_epoch(stop.get("time_window_end"), np.inf) for stop in stops])
+    return window_start, window_end
+
+
+def _eta_documents(schedule: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Sub-documento 'eta' de cada parada (tal como se guarda)."""
+    columns = {key: values.tolist() for key, values in schedule.items()}
+    return [
+        {
+            "arrival": _from_epoch(columns["arrival"][i]),
+            "service_start": _from_epoch(columns["service_start"][i]),
+            "departure": _from_epoch(columns["departure"][i]),
+            "wait_s": round(columns["wait_s"][i], 1),
+            "late": columns["late"][i],
+            "late_by_s": round(columns["late_by_s"][i], 1),
+            "leg_km": round(columns["leg_km"][i], 3),
+        }
+        for i in range(len(columns["arrival"]))
+    ]
+
+
+def _same_eta(old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> bool:
+    """¿El ETA guardado es el mismo (al segundo)? Así no se reescribe."""
+    if not old:
+        return False
+    return old.get("late") == new["late"] and all(
+        round(_to_epoch(old.get(key), 0)) == round(new[key].timestamp())
+        for key in ("arrival", "service_start", "departure")
+    )
+
+
+# --- 3. Recalcular y guardar los ETAs de una ruta ---
+
+# Solo los campos que usa el cálculo (no traemos la parada entera)
+ETA_PROJECTION = {
+    "order_in_route": 1,
+    "gps_lat_cliente": 1,
+    "gps_lon_cliente": 1,
+    "time_window_start": 1,
+    "time_window_end": 1,
+    "eta": 1,
+}
+
+ORDER_SORT = [("order_in_route", ASCENDING), ("_id", ASCENDING)]
+
+
+async def recompute_route_etas(
+    route: Dict[str, Any],
+    from_order: Optional[int] = None,
+) -> int:
+    """
+    Recalcula y guarda el 'eta' de las paradas de la ruta.
+
+    Con 'from_order' solo se recalculan las paradas con
+    order_in_route >= from_order, partiendo de la salida guardada de la
+    parada anterior. Si esa parada no tiene ETA (o no hay 'from_order'),
+    se recalcula la ruta completa.
+    Solo se escriben las paradas cuyo ETA cambió (si una espera absorbe
+    el cambio, las siguientes quedan igual). Devuelve cuántas paradas
+    se actualizaron (0 si la ruta no tiene 'eta_start_time').
+    """
+    start_time = route.get("eta_start_time")
+    if start_time is None:
+        return 0
+
+    route_id: ObjectId = route["_id"]
+    previous = None
+    if from_order is not None:
+        previous = await collection_stop.find_one(
+            {"route_id": route_id, "order_in_route": {"$lt": from_order}},
+            ETA_PROJECTION,
+            sort=[("order_in_route", DESCENDING), ("_id", DESCENDING)],
+        )
+        if previous is None or not previous.get("eta"):
+            # Es la primera parada, o la anterior nunca se calculó
+            from_order, previous = None, None
+
+    query: Dict[str, Any] = {"route_id": route_id}
+    if from_order is not None:
+        query["order_in_route"] = {"$gte": from_order}
+    stops = await collection_stop.find(query, ETA_PROJECTION).sort(ORDER_SORT).to_list(length=None)
+    if not stops:
+        return 0
+
+    # Punto de partida: la salida de la parada anterior, o el inicio de la ruta
+    if previous is not None:
+        departure = _to_epoch(previous["eta"]["departure"], 0)
+        previous_point = (previous["gps_lat_cliente"], previous["gps_lon_cliente"])
+    else:
+        departure = _to_epoch(start_time, 0)
+        previous_point = None
+
+    window_start, window_end = _windows(stops)
+    schedule = compute_schedule(
+        [stop["gps_lat_cliente"] for stop in stops],
+        [stop["gps_lon_cliente"] for stop in stops],
+        window_start,
+        window_end,
+        start_time=departure,
+        previous_point=previous_point,
+    )
+
+    now = datetime.now(timezone.utc)
+    operations = [
+        # 'updated_at' cambia => la sincronización incremental envía el nuevo ETA
+        UpdateOne({"_id": stop["_id"]}, {"$set": {"eta": eta, "updated_at": now}})
+        for stop, eta in zip(stops, _eta_documents(schedule))
+        if not _same_eta(stop.get("eta"), eta)
+    ]
+    if operations:
+        await collection_stop.bulk_write(operations, ordered=False)
+    return len(operations)
+
+# --- 4. Reporte de ETAs de una ruta ---
+
+async def route_eta_report(
+    route: Dict[str, Any],
+    start_time: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """
+    ETAs de todas las paradas de la ruta, en orden.
+
+    - Sin 'start_time': los ETAs guardados (hora de salida de la ruta).
+      Si a alguna parada le falta, se recalcula y GUARDA la ruta
+      (o sea, puede escribir aunque la llame un GET).
+    - Con 'start_time': cálculo "qué pasaría si", sin guardar nada.
+    """
+    projection = {**ETA_PROJECTION, "customer_name": 1}
+    query = {"route_id": route["_id"]}
+    stops = await collection_stop.find(query, projection).sort(ORDER_SORT).to_list(length=None)
+
+    persisted = start_time is None
+    if persisted:
+        start_time = route["eta_start_time"]
+        if any(not stop.get("eta") for stop in stops):
+            await recompute_route_etas(route)
+            stops = await collection_stop.find(query, projection).sort(ORDER_SORT).to_list(length=None)
+        etas = [stop["eta"] for stop in stops]
+    else:
+        window_start, window_end = _windows(stops)
+        etas = _eta_documents(compute_schedule(
+            [stop["gps_lat_cliente"] for stop in stops],
+            [stop["gps_lon_cliente"] for stop in stops],
+            window_start,
+            window_end,
+            start_time=_to_epoch(start_time, 0),
+        ))
+
+    items = [
+        {
+            **eta,
+            "stop_id": str(stop["_id"]),
+            "order_in_route": stop["order_in_route"],
+            "customer_name": stop["customer_name"],
+            "time_window_start": stop.get("time_window_start"),
+            "time_window_end": stop.get("time_window_end"),
+        }
+        for stop, eta in zip(stops, etas)
+    ]
+
+    return {
+        "route_id": str(route["_id"]),
+        "start_time": start_time,
+        "end_time": items[-1]["departure"] if items else None,
+        "total_km": round(sum(item["leg_km"] for item in items), 3),
+        "late_count": sum(1 for item in items if item["late"]),
+        "persisted": persisted,
+        "stops": items,
+    }
\ No newline at end of file
@@ -0,0 +1,167 @@
+"""
+Exportación en streaming de paradas validadas (CSV / GeoJSON).
+
+Las paradas se leen del cursor de Motor, se validan en lotes acotados
+y se escriben en un buffer chico que se envía apenas supera CHUNK_SIZE. Nunca se arma el
+archivo completo en memoria, así que el consumo no depende del tamaño
+de la ruta (ni de cuántas rutas se exporten juntas).
+"""
+import csv
+import io
+import json
+import zlib
+from typing import Any, AsyncIterator, Dict, List
+
+from app.core.validator import validate_stops
+
+# Tamaño aproximado de cada pedazo enviado al cliente
+CHUNK_SIZE = 64 * 1024
+
+# Paradas que se validan juntas (una consulta al geocodificador por lote)
+VALIDATION_BATCH_SIZE = 500
+
+CSV_COLUMNS: List[str] = [
+    "id",
+    "route_id",
+    "order_in_route",
+    "customer_name",
+    "status",
+    "neighborhood_cliente",
+    "phone_cliente",
+    "gps_lat_cliente",
+    "gps_lon_cliente",
+    "address_street_cliente",
+    "address_number_cliente",
+    "address_ref1_cliente",
+    "address_ref2_cliente",
+    "correct_street",
+    "correct_number",
+    "is_phone_valid",
+    "validation_status",
+    "validation_message",
+    "created_at",
+]
+
+# Excel / LibreOffice interpretan como fórmula una celda que empieza así
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _flatten_stop(stop: Dict[str, Any]) -> Dict[str, Any]:
+    """Aplana una parada validada a las columnas del CSV."""
+    validation_data = stop.get("validation_data", {})
+    created_at = stop.get("created_at")
+    return {
+        "id": str(stop["_id"]),
+        "route_id": str(stop["route_id"]),
+        "order_in_route": stop.get("order_in_route"),
+        "customer_name": stop.get("customer_name"),
+        "status": stop.get("status"),
+        "neighborhood_cliente": stop.get("neighborhood_cliente"),
+        "phone_cliente": stop.get("phone_cliente"),
+        "gps_lat_cliente": stop.get("gps_lat_cliente"),
+        "gps_lon_cliente": stop.get("gps_lon_cliente"),
+        "address_street_cliente": stop.get("address_street_cliente"),
+        "address_number_cliente": stop.get("address_number_cliente"),
+        "address_ref1_cliente": stop.get("address_ref1_cliente"),
+        "address_ref2_cliente": stop.get("address_ref2_cliente"),
+        "correct_street": validation_data.get("correct_street"),
+        "correct_number": validation_data.get("correct_number"),
+        "is_phone_valid": validation_data.get("is_phone_valid"),
+        "validation_status": stop.get("validation_status"),
+        "validation_message": stop.get("validation_message"),
+        "created_at": created_at.isoformat() if created_at else None,
+    }
+
+
+def _escape_formula(value: Any) -> Any:
+    """
+    Neutraliza la inyección de fórmulas en el CSV: los textos que carga
+    el cliente ("=HYPERLINK(...)") se prefijan con una comilla simple.
+    Los números (ej: coordenadas negativas) no se tocan.
+    """
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+async def _validated_stops(cursor) -> AsyncIterator[Dict[str, Any]]:
+    """Lee el cursor en lotes acotados y los valida de a un lote."""
+    batch: List[Dict[str, Any]] = []
+
+    async for stop in cursor:
+        batch.append(stop)
+        if len(batch) >= VALIDATION_BATCH_SIZE:
+            for validated_stop in await validate_stops(batch):
+                yield validated_stop
+            batch = []
+
+    for validated_stop in await validate_stops(batch):
+        yield validated_stop
+
+
+async def stream_csv(cursor) -> AsyncIterator[bytes]:
+    """CSV (UTF-8 con BOM, para que Excel muestre bien los acentos)."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS)
+
+    buffer.write("\ufeff")
+    writer.writeheader()
+
+    async for stop in _validated_stops(cursor):
+        writer.writerow({
+            column: _escape_formula(value) for column, value in _flatten_stop(stop).items()
+        })
+
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode("utf-8")
+
+
+async def stream_geojson(cursor) -> AsyncIterator[bytes]:
+    """FeatureCollection GeoJSON: un 'Point' por parada."""
+    parts: List[str] = ['{"type":"FeatureCollection","features":[']
+    size = len(parts[0])
+    first = True
+
+    async for stop in _validated_stops(cursor):
+        properties = _flatten_stop(stop)
+        feature = {
+            "type": "Feature",
+            "id": properties["id"],
+            "geometry": {
+                "type": "Point",
+                "coordinates": [
+                    properties.pop("gps_lon_cliente"),
+                    properties.pop("gps_lat_cliente"),
+                ],
+            },
+            "properties": properties,
+        }
+
+        encoded = ("" if first else ",") + json.dumps(feature, ensure_ascii=False)
+        first = False
+        parts.append(encoded)
+        size += len(encoded)
+
+        if size >= CHUNK_SIZE:
+            yield "".join(parts).encode("utf-8")
+            parts = []
+            size = 0
+
+    parts.append("]}")
+    yield "".join(parts).encode("utf-8")
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """Comprime al vuelo (formato .gz) un stream de bytes."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = cabecera gzip
+
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+
+    yield compressor.flush()
@@ -0,0 +1,17 @@
+from typing import Dict, Any
+
+# --- Helpers Geoespaciales ---
+# MongoDB guarda los puntos en formato GeoJSON, que usa el orden
+# [longitud, latitud] (¡al revés que nuestros campos gps_lat/gps_lon!).
+
+def build_geo_point(lat: float, lon: float) -> Dict[str, Any]:
+    """
+    Construye un 'Point' GeoJSON a partir de una latitud y una longitud.
+    """
+    return {"type": "Point", "coordinates": [lon, lat]}
+
+def is_valid_coordinate(lat: float, lon: float) -> bool:
+    """
+    Indica si el par (lat, lon) puede guardarse en un índice '2dsphere'.
+    """
+    return -90 <= lat <= 90 and -180 <= lon <= 180
@@ -0,0 +1,326 @@
+"""
+Proveedores de Geocodificación Inversa (lat, lon) -> barrio.
+
+El validador no llama directamente al simulador de cajas: pide los
+barrios de TODAS las paradas de una vez a un 'GeocodingProvider'.
+
+- BoundingBoxProvider: el simulador local de siempre (por defecto).
+- HttpGeocodingProvider: un servicio HTTP externo, con lotes, límite
+  de concurrencia, timeout, circuit breaker (si el servicio falla, se
+  usa el simulador local como respaldo) y una caché LRU con las
+  coordenadas redondeadas a 'precision' decimales.
+
+Ver también app/tools/geocoding_server.py (servidor HTTP de prueba).
+"""
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config.settings import settings
+from app.core.logger import get_logger
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - dependencia opcional
+    httpx = None
+
+logger = get_logger(__name__)
+
+Point = Tuple[float, float]  # (lat, lon)
+
+
+# --- 1. Interfaz ---
+
+class GeocodingProvider(ABC):
+
+    @abstractmethod
+    async def reverse_batch(self, points: List[Point]) -> List[str]:
+        """Devuelve el barrio de cada punto (mismo orden que 'points')."""
+
+    async def reverse(self, lat: float, lon: float) -> str:
+        return (await self.reverse_batch([(lat, lon)]))[0]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"provider": type(self).__name__}
+
+    async def aclose(self) -> None:
+        """Libera recursos (conexiones). Se llama al apagar la app."""
+
+
+# --- 2. Proveedor local (simulador de cajas) ---
+
+class BoundingBoxProvider(GeocodingProvider):
+    """
+    Envuelve la función síncrona del simulador (BOUNDING_BOXES o el
+    archivo compacto de geodata). Es CPU pura y rapidísima.
+    """
+
+    def __init__(self, lookup: Callable[[float, float], str]):
+        self.lookup = lookup
+
+    async def reverse_batch(self, points: List[Point]) -> List[str]:
+        return [self.lookup(lat, lon) for lat, lon in points]
+
+
+# --- 3. Circuit Breaker ---
+
+class CircuitBreaker:
+    """
+    Tras 'failure_threshold' fallos seguidos se "abre": durante
+    'reset_seconds' no se llama al servicio. Luego deja pasar UN solo
+    intento de prueba ("semi-abierto"); el resto sigue usando el
+    respaldo hasta que la prueba termine. Si sale bien, se cierra.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self.probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open" or self.probe_in_flight:
+            return False
+        # Semi-abierto: esta request es la prueba
+        self.probe_in_flight = True
+        return True
+
+    def abort_probe(self) -> None:
+        """La prueba se canceló sin resultado: otra request podrá probar."""
+        self.probe_in_flight = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.probe_in_flight = False
+        self.failures += 1
+        if self.state == "half-open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+            self.opened_at = time.monotonic()
+
+
+# --- 4. Caché LRU (coordenadas cuantizadas) ---
+
+class GeocodeCache:
+    """
+    Caché LRU de barrios. Las coordenadas se redondean a 'precision'
+    decimales (4 ~ 11 metros): paradas del mismo edificio comparten
+    entrada.
+    """
+
+    def __init__(self, max_size: int, precision: int):
+        self.max_size = max_size
+        self.precision = precision
+        self._entries: "OrderedDict[Point, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, lat: float, lon: float) -> Point:
+        return (round(lat, self.precision), round(lon, self.precision))
+
+    def get(self, key: Point) -> Optional[str]:
+        name = self._entries.get(key)
+        if name is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return name
+
+    def put(self, key: Point, name: str) -> None:
+        self._entries[key] = name
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cache_size": len(self._entries),
+            "cache_max_size": self.max_size,
+            "cache_precision": self.precision,
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+        }
+
+
+# --- 5. Proveedor HTTP ---
+
+class HttpGeocodingProvider(GeocodingProvider):
+    """
+    Cliente de un servicio de geocodificación con la API:
+
+        POST {base_url}/reverse/batch   {"points": [[lat, lon], ...]}
+        ->                              {"neighborhoods": ["tolosa", ...]}
+
+    Cada punto se busca en la caché (por su clave redondeada); los
+    faltantes se deduplican y se piden al servicio con sus coordenadas
+    ORIGINALES (igual que el respaldo local), en lotes de 'batch_size'.
+    Solo se cachean respuestas REALES del servicio (nunca las del
+    respaldo), así la caché no queda "contaminada" tras una caída.
+
+    Límite de la caché: un acierto devuelve el barrio del primer punto
+    consultado en la misma celda redondeada (~11 m con precision=4).
+    Una parada a menos de esa distancia de un límite entre barrios
+    puede recibir el barrio de su vecina, aunque consultada sola se
+    validaría distinto. GEOCODER_CACHE_PRECISION más alta achica el
+    margen (a costa de menos aciertos).
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        fallback: GeocodingProvider,
+        timeout_seconds: float,
+        max_concurrency: int,
+        batch_size: int,
+        breaker: CircuitBreaker,
+        cache: GeocodeCache,
+    ):
+        if httpx is None:
+            raise RuntimeError("El proveedor HTTP de geocodificación requiere 'httpx'")
+
+        self.base_url = base_url.rstrip("/")
+        self.fallback = fallback
+        self.timeout_seconds = timeout_seconds
+        self.batch_size = batch_size
+        self.breaker = breaker
+        self.cache = cache
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(timeout=timeout_seconds)
+        self.requests = 0
+        self.failures = 0
+        self.fallbacks = 0
+
+    async def _fetch_chunk(self, chunk: List[Point]) -> List[str]:
+        if not self.breaker.allow():
+            self.fallbacks += len(chunk)
+            return await self.fallback.reverse_batch(chunk)
+
+        try:
+            async with self._semaphore:
+                self.requests += 1
+                response = await asyncio.wait_for(
+                    self._client.post(
+                        f"{self.base_url}/reverse/batch",
+                        json={"points": [[lat, lon] for lat, lon in chunk]},
+                    ),
+                    timeout=self.timeout_seconds,
+                )
+            response.raise_for_status()
+            neighborhoods = response.json()["neighborhoods"]
+            if len(neighborhoods) != len(chunk):
+                raise ValueError("La respuesta no tiene un barrio por punto")
+        except asyncio.CancelledError:
+            self.breaker.abort_probe()
+            raise
+        except Exception as exc:
+            self.failures += 1
+            self.breaker.record_failure()
+            self.fallbacks += len(chunk)
+            logger.warning(
+                "Fallo del geocodificador HTTP, usando respaldo local",
+                extra={"fields": {
+                    "error": repr(exc),
+                    "points": len(chunk),
+                    "breaker": self.breaker.state,
+                }},
+            )
+            return await self.fallback.reverse_batch(chunk)
+
+        self.breaker.record_success()
+        names = [str(name).lower().strip() for name in neighborhoods]
+        for (lat, lon), name in zip(chunk, names):
+            self.cache.put(self.cache.key(lat, lon), name)
+        return names
+
+    async def reverse_batch(self, points: List[Point]) -> List[str]:
+        # Aciertos de caché; los faltantes se agrupan por punto EXACTO
+        results: List[Optional[str]] = [None] * len(points)
+        pending: Dict[Point, List[int]] = {}
+        for index, (lat, lon) in enumerate(points):
+            name = self.cache.get(self.cache.key(lat, lon))
+            if name is None:
+                pending.setdefault((lat, lon), []).append(index)
+            else:
+                results[index] = name
+
+        missing = list(pending)
+        chunks = [
+            missing[i:i + self.batch_size]
+            for i in range(0, len(missing), self.batch_size)
+        ]
+        fetched = await asyncio.gather(*(self._fetch_chunk(chunk) for chunk in chunks))
+        for chunk, names in zip(chunks, fetched):
+            for point, name in zip(chunk, names):
+                for index in pending[point]:
+                    results[index] = name
+
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "provider": type(self).__name__,
+            "base_url": self.base_url,
+            "requests": self.requests,
+            "failures": self.failures,
+            "fallback_points": self.fallbacks,
+            "breaker_state": self.breaker.state,
+            "breaker_times_opened": self.breaker.times_opened,
+            **self.cache.stats(),
+        }
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+# --- 6. Fábrica ---
+
+def build_geocoder(local_lookup: Callable[[float, float], str]) -> GeocodingProvider:
+    """
+    Construye el proveedor según los settings.
+    'local_lookup' es el simulador de cajas (default y respaldo).
+    """
+    local_provider = BoundingBoxProvider(local_lookup)
+
+    if settings.GEOCODER_PROVIDER == "bbox":
+        return local_provider
+
+    if settings.GEOCODER_PROVIDER == "http":
+        if not settings.GEOCODER_URL:
+            raise RuntimeError("GEOCODER_PROVIDER='http' requiere GEOCODER_URL")
+        return HttpGeocodingProvider(
+            settings.GEOCODER_URL,
+            fallback=local_provider,
+            timeout_seconds=settings.GEOCODER_TIMEOUT_SECONDS,
+            max_concurrency=settings.GEOCODER_MAX_CONCURRENCY,
+            batch_size=settings.GEOCODER_BATCH_SIZE,
+            breaker=CircuitBreaker(
+                settings.GEOCODER_BREAKER_FAILURES,
+                settings.GEOCODER_BREAKER_RESET_SECONDS,
+            ),
+            cache=GeocodeCache(
+                max_size=settings.GEOCODER_CACHE_SIZE,
+                precision=settings.GEOCODER_CACHE_PRECISION,
+            ),
+        )
+
+    raise RuntimeError(f"GEOCODER_PROVIDER desconocido: '{settings.GEOCODER_PROVIDER}'")
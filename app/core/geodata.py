@@ -0,0 +1,405 @@
+"""
+Representación compacta (memory-mappable) de los barrios para geocodificación.
+
+Con muchos workers de gunicorn/uvicorn, una tabla de miles de polígonos
+guardada como dicts/listas de Python se termina copiando en cada worker:
+el contador de referencias escribe en cada objeto y rompe el
+copy-on-write del fork.
+
+Aquí los polígonos viven en UN archivo binario que cada worker abre con
+'mmap' en modo lectura. Los datos se leen directamente desde las páginas
+del archivo (vía 'memoryview', sin copiar), así que el kernel las comparte
+entre todos los procesos.
+
+Formato del archivo (little-endian, todas las secciones alineadas a 8 bytes):
+
+    cabecera   : magic (4s) | versión (I) | n_areas (I) | n_puntos (I) | n_bytes_nombres (Q)
+    grilla     : filas (I) | columnas (I) | lat0 (d) | lon0 (d) | alto_celda (d) | ancho_celda (d)
+                 | n_items_grilla (Q)
+    bboxes     : float64[n_areas * 4]     -> lat_min, lon_min, lat_max, lon_max
+    offsets    : int64[n_areas + 1]       -> índice del primer punto de cada área
+    coords     : float64[n_puntos * 2]    -> lat, lon, lat, lon, ...
+    name_offs  : int64[n_areas + 1]       -> posición de cada nombre en el blob
+    cell_offs  : int64[filas * columnas + 1] -> primer item de cada celda
+    cell_items : int64[n_items_grilla]    -> áreas cuya caja toca la celda (en orden)
+    nombres    : bytes UTF-8 (blob contiguo)
+
+La grilla gruesa sobre las cajas evita recorrer TODAS las áreas en cada
+búsqueda: solo se prueban las áreas de la celda del punto.
+
+Uso:
+    python -m app.core.geodata build geodata.bin [--geojson barrios.geojson]
+    python -m app.core.geodata check geodata.bin --pids <pid> [<pid> ...]
+
+'check' lee /proc/<pid>/smaps de los workers indicados (ej: los hijos
+de gunicorn: 'pgrep -P <pid_master>'). Cada worker también informa su
+propio uso en GET /metrics/geodata.
+"""
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+MAGIC = b"GEOD"
+VERSION = 2
+_HEADER = struct.Struct("<4sIIIQ")
+_GRID_HEADER = struct.Struct("<IIddddQ")
+
+# Celdas por lado de la grilla: ~sqrt(n_areas), con un tope
+GRID_MAX_SIDE = 256
+
+# Un polígono es un anillo exterior de puntos (lat, lon)
+Ring = Sequence[Tuple[float, float]]
+
+
+def _pad8(size: int) -> int:
+    return (size + 7) & ~7
+
+
+def box_to_ring(box: Sequence[float]) -> List[Tuple[float, float]]:
+    """
+    Convierte una 'caja' [lat_min, lon_min, lat_max, lon_max]
+    en un anillo de 4 vértices.
+    """
+    lat_min, lon_min, lat_max, lon_max = box
+    return [
+        (lat_min, lon_min),
+        (lat_min, lon_max),
+        (lat_max, lon_max),
+        (lat_max, lon_min),
+    ]
+
+
+def areas_from_bounding_boxes(boxes: Dict[str, Sequence[float]]) -> List[Tuple[str, Ring]]:
+    """Adapta el dict BOUNDING_BOXES del validador al formato de 'write_geodata'."""
+    return [(name, box_to_ring(box)) for name, box in boxes.items()]
+
+
+def areas_from_geojson(path: str) -> List[Tuple[str, Ring]]:
+    """
+    Lee un FeatureCollection GeoJSON (Polygon / MultiPolygon).
+    El nombre del barrio se toma de 'properties.name'.
+    Solo se usa el anillo exterior de cada polígono.
+    """
+    with open(path, encoding="utf-8") as f:
+        collection = json.load(f)
+
+    areas: List[Tuple[str, Ring]] = []
+    for feature in collection.get("features", []):
+        name = str(feature.get("properties", {}).get("name", "")).lower().strip()
+        geometry = feature.get("geometry") or {}
+
+        if geometry.get("type") == "Polygon":
+            polygons = [geometry["coordinates"]]
+        elif geometry.get("type") == "MultiPolygon":
+            polygons = geometry["coordinates"]
+        else:
+            continue
+
+        for polygon in polygons:
+            # GeoJSON usa [lon, lat]; nosotros guardamos (lat, lon)
+            ring = [(lat, lon) for lon, lat, *_ in polygon[0]]
+            if len(ring) > 1 and ring[0] == ring[-1]:
+                ring = ring[:-1]
+            areas.append((name, ring))
+
+    return areas
+
+
+def _grid_cells(value_min: float, value_max: float, origin: float, cell: float, count: int) -> range:
+    """Índices de celda (inclusivos) que cubre el intervalo [value_min, value_max]."""
+    first = min(max(int(math.floor((value_min - origin) / cell)), 0), count - 1)
+    last = min(max(int(math.floor((value_max - origin) / cell)), 0), count - 1)
+    return range(first, last + 1)
+
+
+def _build_grid(bboxes: array) -> Tuple[Tuple, array, array]:
+    """
+    Grilla uniforme sobre la caja de todas las áreas.
+    Cada celda lista (en orden de índice) las áreas cuya caja la toca.
+    """
+    n_areas = len(bboxes) // 4
+    if n_areas == 0:
+        return (1, 1, 0.0, 0.0, 1.0, 1.0), array("q", [0, 0]), array("q")
+
+    lat0, lon0 = min(bboxes[0::4]), min(bboxes[1::4])
+    lat1, lon1 = max(bboxes[2::4]), max(bboxes[3::4])
+    side = max(1, min(GRID_MAX_SIDE, math.ceil(math.sqrt(n_areas))))
+    cell_lat = (lat1 - lat0) / side or 1.0
+    cell_lon = (lon1 - lon0) / side or 1.0
+
+    cells: List[List[int]] = [[] for _ in range(side * side)]
+    for index in range(n_areas):
+        b = 4 * index
+        for row in _grid_cells(bboxes[b], bboxes[b + 2], lat0, cell_lat, side):
+            for col in _grid_cells(bboxes[b + 1], bboxes[b + 3], lon0, cell_lon, side):
+                cells[row * side + col].append(index)
+
+    cell_offsets = array("q", [0])
+    cell_items = array("q")
+    for members in cells:
+        cell_items.extend(members)
+        cell_offsets.append(len(cell_items))
+
+    return (side, side, lat0, lon0, cell_lat, cell_lon), cell_offsets, cell_items
+
+
+def write_geodata(path: str, areas: Iterable[Tuple[str, Ring]]) -> None:
+    """
+    Construye el archivo binario. Se ejecuta UNA vez (en el deploy),
+    no en cada worker.
+    """
+    bboxes = array("d")
+    offsets = array("q", [0])
+    coords = array("d")
+    name_offsets = array("q", [0])
+    names = bytearray()
+
+    for name, ring in areas:
+        if len(ring) < 3:
+            raise ValueError(f"El área '{name}' necesita al menos 3 vértices")
+
+        lats = [lat for lat, _ in ring]
+        lons = [lon for _, lon in ring]
+        bboxes.extend((min(lats), min(lons), max(lats), max(lons)))
+
+        for lat, lon in ring:
+            coords.extend((lat, lon))
+        offsets.append(len(coords) // 2)
+
+        names.extend(name.encode("utf-8"))
+        name_offsets.append(len(names))
+
+    n_areas = len(bboxes) // 4
+    grid, cell_offsets, cell_items = _build_grid(bboxes)
+    header = _HEADER.pack(MAGIC, VERSION, n_areas, len(coords) // 2, len(names))
+    grid_header = _GRID_HEADER.pack(*grid, len(cell_items))
+
+    sections = (bboxes, offsets, coords, name_offsets, cell_offsets, cell_items)
+    for section in sections:
+        if sys.byteorder != "little":
+            section.byteswap()
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(grid_header)
+        for section in sections:
+            f.write(section.tobytes())
+        f.write(bytes(names))
+        f.write(b"\0" * (_pad8(len(names)) - len(names)))
+
+    # Reemplazo atómico: los workers que ya tienen mapeado el archivo
+    # viejo siguen leyendo su versión hasta reiniciarse.
+    os.replace(tmp_path, path)
+
+
+class CompactGeodata:
+    """
+    Vista de solo lectura sobre el archivo de barrios mapeado en memoria.
+    Ningún polígono se copia a objetos de Python.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.realpath(path)
+
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, n_areas, n_points, names_len = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError(
+                f"'{path}' no es un archivo de geodata válido (v{VERSION}): "
+                "regenéralo con 'python -m app.core.geodata build'"
+            )
+        if sys.byteorder != "little":
+            self._mmap.close()
+            raise ValueError("El formato de geodata requiere una plataforma little-endian")
+
+        self.n_areas = n_areas
+        self.n_points = n_points
+
+        (
+            self.grid_rows, self.grid_cols, self.grid_lat0, self.grid_lon0,
+            self.grid_cell_lat, self.grid_cell_lon, n_grid_items,
+        ) = _GRID_HEADER.unpack_from(self._mmap, _HEADER.size)
+
+        view = memoryview(self._mmap)
+        pos = _HEADER.size + _GRID_HEADER.size
+
+        def take(n_bytes: int) -> memoryview:
+            nonlocal pos
+            section = view[pos:pos + n_bytes]
+            pos += n_bytes
+            return section
+
+        self.bboxes = take(8 * n_areas * 4).cast("d")
+        self.offsets = take(8 * (n_areas + 1)).cast("q")
+        self.coords = take(8 * n_points * 2).cast("d")
+        self.name_offsets = take(8 * (n_areas + 1)).cast("q")
+        self.cell_offsets = take(8 * (self.grid_rows * self.grid_cols + 1)).cast("q")
+        self.cell_items = take(8 * n_grid_items).cast("q")
+        self._names = take(names_len)
+
+    @classmethod
+    def open_or_none(cls, path: Optional[str]) -> Optional["CompactGeodata"]:
+        """Abre el archivo si la ruta está configurada y existe."""
+        if not path or not os.path.exists(path):
+            return None
+        return cls(path)
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._mmap)
+
+    def name(self, index: int) -> str:
+        start = self.name_offsets[index]
+        end = self.name_offsets[index + 1]
+        return self._names[start:end].tobytes().decode("utf-8")
+
+    def _ring_contains(self, index: int, lat: float, lon: float) -> bool:
+        """
+        Punto-en-polígono (ray casting) sobre el anillo 'index'.
+        Los puntos sobre el borde cuentan como DENTRO, igual que la
+        comparación '<=' del simulador original de cajas.
+        """
+        coords = self.coords
+        start = self.offsets[index]
+        end = self.offsets[index + 1]
+
+        inside = False
+        j = end - 1
+        for i in range(start, end):
+            lat_i, lon_i = coords[2 * i], coords[2 * i + 1]
+            lat_j, lon_j = coords[2 * j], coords[2 * j + 1]
+
+            # ¿Está sobre este lado del polígono?
+            cross = (lon - lon_i) * (lat_j - lat_i) - (lat - lat_i) * (lon_j - lon_i)
+            if (
+                cross == 0
+                and min(lat_i, lat_j) <= lat <= max(lat_i, lat_j)
+                and min(lon_i, lon_j) <= lon <= max(lon_i, lon_j)
+            ):
+                return True
+
+            if (lat_i > lat) != (lat_j > lat):
+                lon_cross = lon_i + (lat - lat_i) * (lon_j - lon_i) / (lat_j - lat_i)
+                if lon < lon_cross:
+                    inside = not inside
+            j = i
+
+        return inside
+
+    def find_area(self, lat: float, lon: float) -> Optional[str]:
+        """
+        Devuelve el nombre de la PRIMERA área que contiene al punto
+        (mismo orden que al construir el archivo), o None.
+        Solo se prueban las áreas de la celda de la grilla del punto.
+        """
+        if self.n_areas == 0:
+            return None
+        row = math.floor((lat - self.grid_lat0) / self.grid_cell_lat)
+        col = math.floor((lon - self.grid_lon0) / self.grid_cell_lon)
+        # Fuera de la grilla => fuera de todas las cajas (salvo el borde superior)
+        if row < 0 or col < 0 or row > self.grid_rows or col > self.grid_cols:
+            return None
+        cell = min(row, self.grid_rows - 1) * self.grid_cols + min(col, self.grid_cols - 1)
+
+        bboxes = self.bboxes
+        cell_items = self.cell_items
+        for item in range(self.cell_offsets[cell], self.cell_offsets[cell + 1]):
+            index = cell_items[item]
+            b = 4 * index
+            # Filtro rápido por caja antes del test de polígono
+            if not (bboxes[b] <= lat <= bboxes[b + 2] and bboxes[b + 1] <= lon <= bboxes[b + 3]):
+                continue
+            if self._ring_contains(index, lat, lon):
+                return self.name(index)
+        return None
+
+
+def mapping_memory_usage(path: str, pid: str = "self") -> Dict[str, int]:
+    """
+    Memoria (en kB) que el mapeo de 'path' ocupa en el proceso 'pid'
+    (por defecto, ESTE proceso), según /proc/<pid>/smaps (solo Linux).
+
+    - 'Rss': páginas residentes del archivo en este worker.
+    - 'Pss': parte proporcional (Rss dividido entre los procesos que lo comparten).
+    - 'Shared_Clean': páginas que este worker comparte con otros procesos.
+    - 'Private_Clean' / 'Private_Dirty': páginas que (por ahora) solo usa este worker.
+
+    Devuelve {} si no se puede leer smaps; todo en 0 si el proceso no
+    tiene el archivo mapeado (aún no lo usó).
+    """
+    target = os.path.realpath(path)
+    fields = ("Size", "Rss", "Pss", "Shared_Clean", "Private_Clean", "Private_Dirty")
+    usage = {field: 0 for field in fields}
+
+    try:
+        with open(f"/proc/{pid}/smaps", encoding="utf-8") as f:
+            in_target = False
+            for line in f:
+                parts = line.split()
+                if not parts:
+                    continue
+                if not parts[0].endswith(":"):
+                    # Línea de cabecera de un mapeo: '<rango> <perms> ... <ruta>'
+                    in_target = len(parts) >= 6 and parts[5] == target
+                elif in_target and parts[0][:-1] in usage:
+                    usage[parts[0][:-1]] += int(parts[1])
+    except OSError:
+        return {}
+
+    return usage
+
+
+def _main(argv: List[str]) -> int:
+    if len(argv) < 2 or argv[0] not in ("build", "check"):
+        print(__doc__)
+        return 1
+
+    command, path = argv[0], argv[1]
+
+    if command == "build":
+        if "--geojson" in argv:
+            areas = areas_from_geojson(argv[argv.index("--geojson") + 1])
+        else:
+            from app.core.validator import BOUNDING_BOXES
+            areas = areas_from_bounding_boxes(BOUNDING_BOXES)
+        write_geodata(path, areas)
+        print(f"Geodata escrito en '{path}' ({len(areas)} áreas)")
+        return 0
+
+    geodata = CompactGeodata(path)
+    print(f"Archivo: {geodata.path}")
+    print(f"Áreas: {geodata.n_areas} | Puntos: {geodata.n_points} | Tamaño: {geodata.size_bytes} bytes")
+
+    if "--pids" not in argv:
+        print("Indica los workers con '--pids <pid> ...' (ej: $(pgrep -P <pid_master>))")
+        return 1
+
+    # Memoria de los WORKERS (no de este proceso de la CLI)
+    pids = argv[argv.index("--pids") + 1:]
+    totals: Dict[str, int] = {}
+    for pid in pids:
+        usage = mapping_memory_usage(path, pid)
+        if not usage:
+            print(f"Worker {pid}: no se pudo leer /proc/{pid}/smaps")
+            continue
+        print(f"Worker {pid}: " + " | ".join(f"{field} {value} kB" for field, value in usage.items()))
+        for field, value in usage.items():
+            totals[field] = totals.get(field, 0) + value
+
+    if totals:
+        # Si el archivo se comparte bien, Pss total ~ tamaño del archivo (no x workers)
+        print("Total:    " + " | ".join(f"{field} {value} kB" for field, value in totals.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
@@ -0,0 +1,261 @@
+"""
+Logging estructurado (JSON) y NO bloqueante.
+
+Los endpoints solo dejan el registro en una cola en memoria
+('put_nowait'); un hilo aparte (QueueListener) lo formatea y lo escribe
+en stdout. Si la cola se llena (stdout atascado), el registro se
+descarta y se cuenta: el logging nunca frena una request.
+
+Los logs del propio uvicorn ('uvicorn', 'uvicorn.error') también pasan
+por la cola. Su access log ('uvicorn.access') se apaga: cada request ya
+queda registrada UNA vez por RequestContextMiddleware ('app.access').
+
+Uso:
+    logger = get_logger(__name__)
+    logger.info("Parada creada", extra={"fields": {"stop_id": "..."}})
+"""
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from app.config.settings import settings
+
+# Contexto de la request actual (lo completa RequestContextMiddleware)
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+request_start_var: ContextVar[Optional[float]] = ContextVar("request_start", default=None)
+
+# Claves cuyo valor NUNCA se escribe en los logs
+SENSITIVE_KEYS = {
+    "password",
+    "hashed_password",
+    "access_token",
+    "refresh_token",
+    "token",
+    "secret_key",
+    "authorization",
+}
+
+REDACTED = "***"
+
+
+def redact(value: Any) -> Any:
+    """Reemplaza (recursivamente) los valores de claves sensibles."""
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if str(key).lower() in SENSITIVE_KEYS else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    """Un objeto JSON por línea. Corre en el hilo del listener."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+
+        elapsed_ms = getattr(record, "elapsed_ms", None)
+        if elapsed_ms is not None:
+            data["elapsed_ms"] = elapsed_ms
+
+        fields = getattr(record, "fields", None)
+        if fields:
+            data.update(redact(fields))
+
+        if record.exc_text:
+            data["exception"] = record.exc_text
+
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que nunca espera: si la cola está llena, descarta.
+    El formateo pesado (JSON) queda para el hilo del listener.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Capturamos el contexto de la request AHORA (en el hilo que loguea)
+        record = copy.copy(record)
+        record.request_id = request_id_var.get()
+        start = request_start_var.get()
+        if start is not None:
+            record.elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+
+        # Dejamos el registro listo para cruzar de hilo
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    """
+    Al apagar, el centinela de parada se encola esperando lugar
+    (con la cola llena, 'put_nowait' fallaría). Solo pasa en el shutdown.
+    """
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+_listener: Optional[_QueueListener] = None
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+
+# Loggers de uvicorn que pasamos a la cola
+UVICORN_LOGGERS = ("uvicorn", "uvicorn.error")
+# Configuración original de uvicorn (se restaura al apagar)
+_uvicorn_saved: dict = {}
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Devuelve un logger hijo de 'app' (usa la cola configurada)."""
+    if not name.startswith("app"):
+        name = f"app.{name}"
+    return logging.getLogger(name)
+
+
+def setup_logging() -> None:
+    """
+    Configura el logger 'app' con la cola y arranca el hilo escritor.
+    Se llama al arrancar la aplicación (ver main.py).
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_MAX_SIZE)
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    _queue_handler = NonBlockingQueueHandler(log_queue)
+    _listener = _QueueListener(log_queue, stream_handler)
+
+    app_logger = logging.getLogger("app")
+    app_logger.setLevel(settings.LOG_LEVEL.upper())
+    app_logger.addHandler(_queue_handler)
+    app_logger.propagate = False
+
+    # uvicorn: sus mensajes por la misma cola (nada escribe directo en stdout)
+    for name in UVICORN_LOGGERS + ("uvicorn.access",):
+        uvicorn_logger = logging.getLogger(name)
+        _uvicorn_saved[name] = (
+            uvicorn_logger.handlers[:], uvicorn_logger.propagate, uvicorn_logger.disabled
+        )
+        uvicorn_logger.handlers = [_queue_handler] if name in UVICORN_LOGGERS else []
+        uvicorn_logger.propagate = False
+
+    # Su access log duplicaría el de RequestContextMiddleware
+    logging.getLogger("uvicorn.access").disabled = True
+
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Vacía la cola y detiene el hilo escritor (al apagar la app)."""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+
+    logging.getLogger("app").removeHandler(_queue_handler)
+    for name, (handlers, propagate, disabled) in _uvicorn_saved.items():
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = handlers
+        uvicorn_logger.propagate = propagate
+        uvicorn_logger.disabled = disabled
+    _uvicorn_saved.clear()
+    _listener.stop()
+    _listener = None
+    _queue_handler = None
+
+
+def dropped_log_records() -> int:
+    """Cantidad de registros descartados por cola llena."""
+    return _queue_handler.dropped if _queue_handler else 0
+
+
+# --- Middleware: request id + tiempo de cada request ---
+
+access_logger = get_logger("app.access")
+
+
+class RequestContextMiddleware:
+    """
+    Middleware ASGI que:
+    - asigna un request id (o reutiliza la cabecera 'X-Request-ID'),
+    - lo devuelve en la respuesta,
+    - loguea método, ruta, status y duración de cada request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming_id = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                incoming_id = value.decode("latin-1")[:64]
+                break
+
+        request_id = incoming_id or uuid.uuid4().hex
+        start = time.perf_counter()
+        id_token = request_id_var.set(request_id)
+        start_token = request_start_var.set(start)
+        status_code = 500
+
+        async def send_with_request_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            access_logger.info(
+                "request",
+                extra={"fields": {
+                    "method": scope.get("method"),
+                    "path": scope.get("path"),
+                    "status": status_code,
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                }},
+            )
+            request_id_var.reset(id_token)
+            request_start_var.reset(start_token)
@@ -0,0 +1,227 @@
+import ipaddress
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from fastapi import HTTPException, Request, status
+
+from app.config.settings import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# --- 1. Backends (dónde se guardan los "baldes" de tokens) ---
+
+class RateLimitBackend(ABC):
+    """
+    Interfaz de almacenamiento de los token buckets.
+    El backend en memoria sirve para un proceso; para compartir los
+    límites entre workers se puede implementar otro (ej: Redis).
+    """
+
+    @abstractmethod
+    async def consume(
+        self, key: str, capacity: float, refill_per_second: float, cost: float = 1
+    ) -> float:
+        """
+        Intenta gastar 'cost' tokens del balde 'key'.
+        Devuelve 0 si se permitió, o los segundos a esperar si no.
+        """
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """
+    Token buckets en un dict del proceso.
+    Guarda como máximo 'max_keys' baldes (descarta los menos usados)
+    para que un atacante no pueda agotar la memoria inventando usuarios.
+
+    Los baldes NO se comparten entre workers: con N workers (gunicorn)
+    cada uno lleva su cuenta y el límite efectivo es N veces el configurado.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def consume(
+        self, key: str, capacity: float, refill_per_second: float, cost: float = 1
+    ) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.pop(key, (capacity, now))
+
+        # Rellenamos según el tiempo transcurrido
+        tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+
+        if tokens >= cost:
+            tokens -= cost
+            wait = 0.0
+        else:
+            wait = (cost - tokens) / refill_per_second
+
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+        return wait
+
+
+# --- 2. Limitador (un tipo de balde con sus contadores) ---
+
+class TokenBucketLimiter:
+    def __init__(
+        self,
+        name: str,
+        capacity: float,
+        refill_per_minute: float,
+        backend: RateLimitBackend,
+    ):
+        self.name = name
+        self.capacity = capacity
+        self.refill_per_second = refill_per_minute / 60
+        self.backend = backend
+        self.allowed = 0
+        self.rejected = 0
+
+    async def hit(self, key: str) -> float:
+        """Consume un token. Devuelve los segundos a esperar (0 si se permitió)."""
+        wait = await self.backend.consume(
+            f"{self.name}:{key}", self.capacity, self.refill_per_second
+        )
+        if wait > 0:
+            self.rejected += 1
+        else:
+            self.allowed += 1
+        return wait
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "capacity": self.capacity,
+            "refill_per_minute": self.refill_per_second * 60,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+        }
+
+
+# --- 3. Identificar al cliente (detrás de un proxy inverso) ---
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def _parse_networks(value: str) -> List[Network]:
+    """'10.0.0.1, 172.16.0.0/12' -> redes (las entradas inválidas se ignoran)."""
+    networks = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            networks.append(ipaddress.ip_network(item, strict=False))
+        except ValueError:
+            logger.warning("TRUSTED_PROXY_IPS: entrada inválida", extra={"fields": {"value": item}})
+    return networks
+
+
+def _is_trusted(host: Optional[str], networks: List[Network]) -> bool:
+    if not host or not networks:
+        return False
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+def client_key(request: Request, trusted_proxies: Optional[List[Network]] = None) -> str:
+    """
+    IP del cliente para el balde 'por cliente'.
+
+    Detrás de un proxy inverso 'request.client.host' es la IP del proxy
+    (todos los usuarios compartirían el balde). Si la conexión viene de
+    un proxy de confianza (TRUSTED_PROXY_IPS) se recorre 'X-Forwarded-For'
+    de derecha a izquierda y se toma la primera IP que NO es de confianza.
+    De clientes directos el encabezado se ignora (se puede falsificar).
+    """
+    if trusted_proxies is None:
+        trusted_proxies = TRUSTED_PROXIES
+    peer = request.client.host if request.client else None
+    if not _is_trusted(peer, trusted_proxies):
+        return peer or "desconocido"
+
+    forwarded = ",".join(request.headers.getlist("x-forwarded-for"))
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted(hop, trusted_proxies):
+            return hop
+    # Todos los saltos son proxies propios: el más lejano es el cliente
+    return hops[0] if hops else peer
+
+
+TRUSTED_PROXIES = _parse_networks(settings.TRUSTED_PROXY_IPS)
+
+
+# --- 4. Throttling del Login ---
+
+class LoginThrottle:
+    """
+    Limita los intentos de login por cuenta (email) y por cliente (IP).
+    Se consulta ANTES de verificar la contraseña, que es lo caro.
+    """
+
+    def __init__(self, backend: RateLimitBackend):
+        self.enabled = settings.LOGIN_RATE_LIMIT_ENABLED
+        self.per_client = TokenBucketLimiter(
+            "login-client",
+            settings.LOGIN_CLIENT_BUCKET_CAPACITY,
+            settings.LOGIN_CLIENT_REFILL_PER_MINUTE,
+            backend,
+        )
+        self.per_account = TokenBucketLimiter(
+            "login-account",
+            settings.LOGIN_ACCOUNT_BUCKET_CAPACITY,
+            settings.LOGIN_ACCOUNT_REFILL_PER_MINUTE,
+            backend,
+        )
+
+    async def check(self, username: str, client_host: str) -> None:
+        """
+        Lanza un 429 (con 'Retry-After') si el cliente o la cuenta
+        superaron su presupuesto de intentos.
+        """
+        if not self.enabled:
+            return
+
+        # Primero el cliente: si ya está bloqueado, no gastamos
+        # tokens de la cuenta (así no bloquea al dueño legítimo).
+        wait = await self.per_client.hit(client_host)
+        if wait == 0:
+            wait = await self.per_account.hit(username.lower().strip())
+
+        if wait > 0:
+            logger.warning(
+                "Login rechazado por límite de intentos",
+                extra={"fields": {
+                    "username": username,
+                    "client": client_host,
+                    "retry_after_s": math.ceil(wait),
+                }},
+            )
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Demasiados intentos de inicio de sesión. Intenta más tarde.",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "per_client": self.per_client.stats(),
+            "per_account": self.per_account.stats(),
+        }
+
+
+# Instancia única (igual que 'settings')
+login_throttle = LoginThrottle(
+    InMemoryRateLimitBackend(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+)
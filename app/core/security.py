@@ -1,6 +1,8 @@
 from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
 from typing import Optional
+import hashlib
+import secrets
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -8,7 +10,7 @@ from jose import JWTError, jwt
 
 from app.config.settings import settings
 from app.schemas.token_schema import TokenData
-from app.config.database import collection_user
+from app.config.database import collection_user, collection_refresh_token
 
 # --- 1. Configuración de Hashing ---
 
@@ -50,6 +52,91 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     )
     return encoded_jwt
 
+# --- 2b. Refresh Tokens (opacos y rotativos) ---
+# El cliente recibe un token aleatorio; en la BBDD solo guardamos su
+# SHA-256. Como el token tiene 256 bits de entropía, un hash rápido
+# alcanza (no hace falta el costoso sha256_crypt de las contraseñas).
+
+def _hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+async def create_refresh_token(user: dict) -> str:
+    """
+    Genera un refresh token nuevo para 'user' y guarda su hash.
+    Devuelve el token en texto plano (solo se muestra una vez).
+    """
+    token = secrets.token_urlsafe(32)
+    now = datetime.now(timezone.utc)
+
+    await collection_refresh_token.insert_one({
+        "token_hash": _hash_refresh_token(token),
+        "user_id": user["_id"],
+        "email": user["email"],
+        "revoked": False,
+        "created_at": now,
+        "expires_at": now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    })
+    return token
+
+async def rotate_refresh_token(token: str) -> dict:
+    """
+    Consume un refresh token (queda revocado) y devuelve su documento.
+
+    Es UNA operación atómica sobre el índice de 'token_hash'.
+    Si alguien presenta un token que ya fue rotado (posible robo),
+    revocamos todos los refresh tokens de ese usuario.
+    """
+    token_hash = _hash_refresh_token(token)
+    now = datetime.now(timezone.utc)
+
+    token_doc = await collection_refresh_token.find_one_and_update(
+        {"token_hash": token_hash, "revoked": False, "expires_at": {"$gt": now}},
+        {"$set": {"revoked": True, "revoked_at": now, "revoked_reason": "rotated"}},
+    )
+
+    if token_doc is None:
+        reused = await collection_refresh_token.find_one(
+            {"token_hash": token_hash, "revoked_reason": "rotated"},
+            {"user_id": 1},
+        )
+        if reused:
+            await revoke_user_refresh_tokens(reused["user_id"], reason="reused")
+
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token inválido, revocado o expirado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return token_doc
+
+async def revoke_refresh_token(token: str) -> bool:
+    """Revoca un refresh token (logout). Devuelve si existía y estaba activo."""
+    result = await collection_refresh_token.update_one(
+        {"token_hash": _hash_refresh_token(token), "revoked": False},
+        {"$set": {
+            "revoked": True,
+            "revoked_at": datetime.now(timezone.utc),
+            "revoked_reason": "logout",
+        }},
+    )
+    return result.modified_count > 0
+
+async def revoke_user_refresh_tokens(user_id, reason: str = "revoked") -> int:
+    """
+    Revoca TODOS los refresh tokens activos de un usuario
+    (ej: al desactivarlo). Devuelve cuántos se revocaron.
+    """
+    result = await collection_refresh_token.update_many(
+        {"user_id": user_id, "revoked": False},
+        {"$set": {
+            "revoked": True,
+            "revoked_at": datetime.now(timezone.utc),
+            "revoked_reason": reason,
+        }},
+    )
+    return result.modified_count
+
 # --- 3. Esquema de Seguridad y Decodificación de Token ---
 
 # Esto le dice a FastAPI "busca el token en la cabecera 'Authorization'
@@ -99,6 +186,14 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
             detail="Usuario no encontrado",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    # Los access tokens ya emitidos dejan de servir al desactivarlo
+    if not user.get("is_active", True):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="El usuario está desactivado.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
         
     # Devolvemos el usuario como un diccionario
     # (nuestra ruta se encargará de validarlo con UserOut)
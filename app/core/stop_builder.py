@@ -0,0 +1,52 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from bson import ObjectId
+
+from app.core.geo import build_geo_point
+from app.core.validator import _validate_phone_ar
+from app.schemas.stop_schema import StopCreate
+
+# --- Construcción del documento de una Parada (v4) ---
+# Lo usan tanto el alta de a una (stop_routes.py) como el
+# despacho masivo (route_routes.py), así ambos guardan lo mismo.
+
+def build_stop_document(
+    route_object_id: ObjectId,
+    stop: StopCreate,
+    order_in_route: Optional[int] = None,
+    validation_data: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Arma el diccionario para la BBDD a partir del schema de entrada.
+    'order_in_route' pisa al del schema (el despacho lo calcula).
+    'validation_data' es la 'verdad' ya resuelta (ver customer_directory.py);
+    si no se pasa, se usa la del schema.
+    """
+    is_phone_valid = _validate_phone_ar(stop.phone_cliente)
+    if validation_data is None:
+        validation_data = stop.validation_data.model_dump()
+    validation_data_dict = dict(validation_data)
+    validation_data_dict["is_phone_valid"] = is_phone_valid
+    now = datetime.now(timezone.utc)
+
+    return {
+        "route_id": route_object_id,
+        "customer_name": stop.customer_name,
+        "order_in_route": stop.order_in_route if order_in_route is None else order_in_route,
+        "status": "PENDIENTE",
+        "neighborhood_cliente": stop.neighborhood_cliente,
+        "phone_cliente": stop.phone_cliente,
+        "gps_lat_cliente": stop.gps_lat_cliente,
+        "gps_lon_cliente": stop.gps_lon_cliente,
+        "location": build_geo_point(stop.gps_lat_cliente, stop.gps_lon_cliente),
+        "address_street_cliente": stop.address_street_cliente,
+        "address_number_cliente": stop.address_number_cliente,
+        "address_ref1_cliente": stop.address_ref1_cliente,
+        "address_ref2_cliente": stop.address_ref2_cliente,
+        "time_window_start": stop.time_window_start,
+        "time_window_end": stop.time_window_end,
+        "validation_data": validation_data_dict,
+        "created_at": now,
+        "updated_at": now, # Se actualiza en cada escritura (delta sync)
+    }
@@ -0,0 +1,53 @@
+"""
+Sincronización incremental (delta sync) de paradas.
+
+Cada escritura de una parada actualiza 'updated_at'. Los clientes
+guardan la 'watermark' que devolvió su última sincronización y piden
+solo lo que cambió después. Los borrados se registran como
+"tombstones" (lápidas) para que el cliente también los pueda aplicar.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from app.config.database import collection_stop_tombstone
+from app.config.settings import settings
+
+
+def sync_upper_bound() -> datetime:
+    """
+    Límite superior (y próxima watermark) de una sincronización.
+
+    Nos quedamos unos segundos atrás de "ahora": una escritura con un
+    'updated_at' de hace un instante puede no estar confirmada todavía,
+    y si la watermark la saltara el cliente nunca la vería.
+    """
+    return datetime.now(timezone.utc) - timedelta(
+        seconds=settings.SYNC_WATERMARK_LAG_SECONDS
+    )
+
+
+def requires_full_resync(since: Optional[datetime]) -> bool:
+    """
+    True si el cliente no tiene watermark o si es más vieja que la
+    retención de tombstones (podría haberse perdido algún borrado).
+    """
+    if since is None:
+        return True
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    oldest_tombstone = datetime.now(timezone.utc) - timedelta(
+        days=settings.SYNC_TOMBSTONE_RETENTION_DAYS
+    )
+    return since < oldest_tombstone
+
+
+async def record_stop_deletion(stop: Dict[str, Any]) -> None:
+    """
+    Registra el borrado de una parada. Cualquier endpoint que elimine
+    paradas debe llamarla ANTES de borrar el documento.
+    """
+    await collection_stop_tombstone.insert_one({
+        "stop_id": stop["_id"],
+        "route_id": stop["route_id"],
+        "deleted_at": datetime.now(timezone.utc),
+    })
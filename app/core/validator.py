@@ -1,14 +1,40 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import re
 
-# --- Helper 1: Validador de Teléfono (sin cambios) ---
-def _validate_phone_ar(phone_str: str) -> bool:
+from app.config.settings import settings
+from app.core.geodata import CompactGeodata
+from app.core.geocoding import GeocodingProvider, build_geocoder
+
+# --- Helper 1: Validador de Teléfono ---
+def _normalize_phone_ar(phone_str: str) -> Optional[str]:
+    """
+    Normaliza un teléfono argentino a E.164.
+    - Celular ('+549' + 10 dígitos): con el 9 internacional
+      ('+54 9 221 4567890', '5492214567890') o con el 15 local
+      ('0221 15 456-7890', '221 15 4567890').
+    - Fijo ('+54' + 10 dígitos): sin 9 ni 15 ('221 456-7890',
+      '0221 4567890', '+54 221 4567890'). Sin ninguna de esas marcas
+      no se puede saber si es un celular: se toma como fijo.
+    Devuelve None si el teléfono no es válido.
+    """
     if not phone_str:
-        return False
+        return None
     cleaned_phone = re.sub(r"[\s\-\(\)\+]", "", phone_str)
-    regex = r"^(54)?(9)?(\d{10})$"
-    match = re.match(regex, cleaned_phone)
-    return bool(match)
+
+    # [54][9][0] + código de área y número (10 dígitos)
+    match = re.fullmatch(r"(?:54)?(9)?0?(\d{10})", cleaned_phone)
+    if match:
+        mobile_prefix = "9" if match.group(1) else ""
+        return f"+54{mobile_prefix}{match.group(2)}"
+
+    # Celular marcado localmente: [54][0] + área (2-4) + '15' + número (10 dígitos sin el 15)
+    match = re.fullmatch(r"(?:54)?0?(?=\d{12}$)(\d{2,4})15(\d{6,8})", cleaned_phone)
+    if match:
+        return f"+549{match.group(1)}{match.group(2)}"
+    return None
+
+def _validate_phone_ar(phone_str: str) -> bool:
+    return _normalize_phone_ar(phone_str) is not None
 
 # --- Helper 2: Simulador de Geocodificación (v5 - Bounding Box) ---
 
@@ -44,13 +70,32 @@ BOUNDING_BOXES = {
     "punta lara":             [-34.82, -58.01, -34.78, -57.95],
 }
 
+# Versión compacta (mmap) de los barrios, compartida entre workers.
+# Se abre la primera vez que se usa (ver app/core/geodata.py).
+_compact_geodata: Optional[CompactGeodata] = None
+_compact_geodata_loaded = False
+
+def _get_compact_geodata() -> Optional[CompactGeodata]:
+    global _compact_geodata, _compact_geodata_loaded
+    if not _compact_geodata_loaded:
+        _compact_geodata = CompactGeodata.open_or_none(settings.GEODATA_PATH)
+        _compact_geodata_loaded = True
+    return _compact_geodata
+
 def _simulate_geocoding_neighborhood(lat: float, lon: float) -> str:
     """
     Simula una API de Geocodificación Inversa (v5).
     Comprueba si un (lat, lon) real cae dentro de una de
     nuestras "cajas" (bounding box) de simulación.
+
+    Si 'GEODATA_PATH' apunta a un archivo compacto, se consulta
+    ese archivo (polígonos) en lugar de BOUNDING_BOXES.
     """
     
+    geodata = _get_compact_geodata()
+    if geodata is not None:
+        return geodata.find_area(lat, lon) or "desconocido"
+
     # Comprobamos cada "caja"
     for neighborhood, box in BOUNDING_BOXES.items():
         lat_min, lon_min, lat_max, lon_max = box
@@ -61,12 +106,21 @@ def _simulate_geocoding_neighborhood(lat: float, lon: float) -> str:
     # Si no cae en ninguna caja
     return "desconocido"
 
+# Proveedor de geocodificación que usa el motor de validación.
+# Por defecto es el simulador de cajas de arriba (ver app/core/geocoding.py).
+geocoder: GeocodingProvider = build_geocoder(_simulate_geocoding_neighborhood)
+
 # --- Función Principal: El Motor v4.0 (Híbrido) ---
 # (Esta función no necesita cambios, ya que la lógica
 # de _simulate_geocoding_neighborhood está encapsulada)
-def validate_stop(stop: Dict[str, Any]) -> Dict[str, Any]:
+def validate_stop(
+    stop: Dict[str, Any], gps_neighborhood: Optional[str] = None
+) -> Dict[str, Any]:
     """
     Motor de Validación v4.0 (Híbrido)
+
+    'gps_neighborhood' es el barrio ya resuelto por el geocodificador
+    (ver validate_stops). Si no se pasa, se usa el simulador local.
     """
     errors_list: List[str] = []
     
@@ -85,10 +139,12 @@ def validate_stop(stop: Dict[str, Any]) -> Dict[str, Any]:
     is_phone_valid = validation_data_db.get("is_phone_valid", False)
 
     # --- LLAMA AL NUEVO SIMULADOR v5 ---
-    correct_hood_from_gps = _simulate_geocoding_neighborhood(
-        stop.get("gps_lat_cliente", 0),
-        stop.get("gps_lon_cliente", 0)
-    )
+    correct_hood_from_gps = gps_neighborhood
+    if correct_hood_from_gps is None:
+        correct_hood_from_gps = _simulate_geocoding_neighborhood(
+            stop.get("gps_lat_cliente", 0),
+            stop.get("gps_lon_cliente", 0)
+        )
 
     # --- INICIO DE VALIDACIONES ---
     if not is_phone_valid:
@@ -126,4 +182,27 @@ def validate_stop(stop: Dict[str, Any]) -> Dict[str, Any]:
         
     stop["validation_message"] = " | ".join(errors_list) or "Validación OK"
     
-    return stop
\ No newline at end of file
+    return stop
+
+# --- Validación en Lote (usa el proveedor de geocodificación) ---
+async def validate_stops(
+    stops: List[Dict[str, Any]],
+    provider: Optional[GeocodingProvider] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Valida varias paradas pidiendo TODOS sus barrios en una sola
+    consulta (por lotes) al geocodificador, en vez de una por parada.
+    """
+    if not stops:
+        return stops
+
+    provider = provider or geocoder
+    neighborhoods = await provider.reverse_batch([
+        (stop.get("gps_lat_cliente", 0), stop.get("gps_lon_cliente", 0))
+        for stop in stops
+    ])
+
+    return [
+        validate_stop(stop, gps_neighborhood)
+        for stop, gps_neighborhood in zip(stops, neighborhoods)
+    ]
\ No newline at end of file
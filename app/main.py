@@ -1,17 +1,41 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from app.routes import user_routes 
 from app.routes import auth_routes
 from app.routes import route_routes
 from app.routes import stop_routes
+from app.routes import metrics_routes
+from app.routes import export_routes
+from app.routes import customer_routes
+from app.config.database import create_indexes
+from app.core.logger import setup_logging, shutdown_logging, RequestContextMiddleware
+from app.core.compression import CompressionMiddleware
+from app.core.admission import AdmissionMiddleware
+from app.core.validator import geocoder
 
 # --- 1. Importa el Middleware de CORS ---
 from fastapi.middleware.cors import CORSMiddleware
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Tareas de arranque/apagado de la aplicación.
+    """
+    # Logging JSON en un hilo aparte (nunca bloquea las requests)
+    setup_logging()
+    # Creamos los índices de MongoDB (si ya existen, no hace nada)
+    await create_indexes()
+    yield
+    await geocoder.aclose()
+    shutdown_logging()
+
 # Creamos la instancia de la aplicación
 app = FastAPI(
     title="Dashboard de Validación Logística",
     description="API para el proyecto de validación de paradas.",
-    version="0.0.1"
+    version="0.0.1",
+    lifespan=lifespan
 )
 
 # --- 2. Define los "orígenes" (dominios) permitidos ---
@@ -21,14 +45,25 @@ origins = [
     "https://logistica-dashboard-react-kzi2i29v2-thomas-projects-6307dabf.vercel.app"
 ]
 
+# Control de admisión: se agrega PRIMERO para quedar por dentro de CORS
+# (así los 503 por sobrecarga también llevan las cabeceras CORS)
+app.add_middleware(AdmissionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
 
+# Request id + duración de cada request en los logs
+app.add_middleware(RequestContextMiddleware)
+
+# Compresión negociada (br/gzip) + formato JSON / MessagePack
+app.add_middleware(CompressionMiddleware)
+
 
 # --- Tus Rutas (el resto del archivo sigue igual) ---
 
@@ -39,4 +74,7 @@ def read_root():
 app.include_router(user_routes.router)
 app.include_router(auth_routes.router)
 app.include_router(route_routes.router)
-app.include_router(stop_routes.router)
\ No newline at end of file
+app.include_router(stop_routes.router)
+app.include_router(export_routes.router)
+app.include_router(customer_routes.router)
+app.include_router(metrics_routes.router)
\ No newline at end of file
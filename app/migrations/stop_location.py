@@ -0,0 +1,63 @@
+"""
+Migración: añade el campo GeoJSON 'location' a las paradas existentes.
+
+Las paradas creadas antes de la búsqueda por cercanía solo tienen
+'gps_lat_cliente' / 'gps_lon_cliente'. Este script construye el 'Point'
+a partir de esos dos campos y crea el índice '2dsphere'.
+
+Uso:
+    python -m app.migrations.stop_location
+"""
+import asyncio
+
+from pymongo import UpdateOne
+
+from app.config.database import collection_stop, create_indexes
+from app.core.geo import build_geo_point, is_valid_coordinate
+
+BATCH_SIZE = 1000
+
+
+async def migrate() -> None:
+    updated = 0
+    skipped = 0
+    operations = []
+
+    cursor = collection_stop.find(
+        {"location": {"$exists": False}},
+        {"gps_lat_cliente": 1, "gps_lon_cliente": 1},
+    )
+
+    async for stop in cursor:
+        lat = stop.get("gps_lat_cliente")
+        lon = stop.get("gps_lon_cliente")
+
+        # Coordenadas faltantes o fuera de rango: el índice las rechazaría
+        if lat is None or lon is None or not is_valid_coordinate(lat, lon):
+            skipped += 1
+            continue
+
+        operations.append(
+            UpdateOne(
+                {"_id": stop["_id"]},
+                {"$set": {"location": build_geo_point(lat, lon)}},
+            )
+        )
+
+        if len(operations) >= BATCH_SIZE:
+            result = await collection_stop.bulk_write(operations, ordered=False)
+            updated += result.modified_count
+            operations = []
+
+    if operations:
+        result = await collection_stop.bulk_write(operations, ordered=False)
+        updated += result.modified_count
+
+    await create_indexes()
+
+    print(f"Paradas actualizadas: {updated}")
+    print(f"Paradas omitidas (GPS inválido): {skipped}")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,29 @@
+"""
+Migración: añade 'updated_at' a las paradas que no lo tienen.
+
+La sincronización incremental filtra por 'updated_at'. Para las paradas
+existentes usamos su 'created_at' (nunca se modificaron desde que
+existe el campo, o al menos no lo sabemos).
+
+Uso:
+    python -m app.migrations.stop_updated_at
+"""
+import asyncio
+
+from app.config.database import collection_stop, create_indexes
+
+
+async def migrate() -> None:
+    # Update con pipeline: se resuelve entero en el servidor
+    result = await collection_stop.update_many(
+        {"updated_at": {"$exists": False}},
+        [{"$set": {"updated_at": {"$ifNull": ["$created_at", "$$NOW"]}}}],
+    )
+
+    await create_indexes()
+
+    print(f"Paradas actualizadas: {result.modified_count}")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,45 @@
+from pydantic import BaseModel, Field, ConfigDict
+from bson import ObjectId
+from datetime import datetime, timezone
+from typing import Optional
+
+# --- Sub-Documento: la 'verdad' de la calle del cliente ---
+class CustomerValidationDataModel(BaseModel):
+    correct_street: str
+    correct_number: str
+    correct_ref1: Optional[str] = None
+    correct_ref2: Optional[str] = None
+
+# --- Modelo del Directorio de Clientes ---
+# Una entrada por (teléfono E.164, dirección normalizada)
+# (ver app/core/customer_directory.py)
+class CustomerModel(BaseModel):
+    id: Optional[ObjectId] = Field(alias="_id", default=None)
+
+    phone_e164: str      # ej: '+5492214567890'
+    address_hash: str    # sha1 de la dirección normalizada
+
+    # Últimos datos "sucios" con los que se cargó la 'verdad'
+    customer_name: str
+    address_street: str
+    address_number: str
+    neighborhood: str
+
+    validation_data: CustomerValidationDataModel
+
+    # Paradas que usaron esta entrada
+    times_seen: int = 0
+
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc)
+    )
+    updated_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc)
+    )
+    last_seen_at: Optional[datetime] = None
+
+    model_config = ConfigDict(
+        populate_by_name=True,
+        arbitrary_types_allowed=True,
+        json_encoders={ObjectId: str}
+    )
\ No newline at end of file
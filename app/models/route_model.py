@@ -12,6 +12,9 @@ class RouteModel(BaseModel):
     name: str = Field(..., min_length=3)
     
     status: str = "PENDIENTE" 
+
+    # Hora de salida: si está definida, se calculan los ETAs de sus paradas
+    eta_start_time: Optional[datetime] = None
     
     created_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc)
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field, ConfigDict
 from bson import ObjectId
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Optional, List
 
 # --- 1. Sub-Documento de Validación (v4) ---
 # Almacena la 'verdad' de la calle (manual) y el estado del teléfono (calculado)
@@ -14,6 +14,22 @@ class ValidationDataModel(BaseModel):
     # Este campo lo calcula el backend (ver stop_routes.py)
     is_phone_valid: bool 
 
+# --- Sub-Documento GeoJSON ---
+# Copia de gps_lat/gps_lon en formato GeoJSON, indexada con '2dsphere'
+class GeoPointModel(BaseModel):
+    type: str = "Point"
+    coordinates: List[float] # [lon, lat]
+
+# --- Sub-Documento ETA (lo calcula app/core/eta.py) ---
+class StopEtaModel(BaseModel):
+    arrival: datetime
+    service_start: datetime
+    departure: datetime
+    wait_s: float
+    late: bool
+    late_by_s: float
+    leg_km: float
+
 # --- 2. Modelo Principal de la Parada (v4) ---
 class StopModel(BaseModel):
     id: Optional[ObjectId] = Field(alias="_id", default=None)
@@ -34,6 +50,14 @@ class StopModel(BaseModel):
     address_ref1_cliente: Optional[str] = None
     address_ref2_cliente: Optional[str] = None
 
+    # Se mantiene sincronizado con gps_lat/gps_lon (ver stop_routes.py)
+    location: Optional[GeoPointModel] = None
+
+    # --- Ventana horaria y ETA ---
+    time_window_start: Optional[datetime] = None
+    time_window_end: Optional[datetime] = None
+    eta: Optional[StopEtaModel] = None
+
     # --- Datos de Validación (v4) ---
     # Guardamos la 'verdad' de la calle/teléfono
     validation_data: ValidationDataModel
@@ -41,6 +65,10 @@ class StopModel(BaseModel):
     created_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc)
     )
+    # Se actualiza en CADA escritura (sincronización incremental)
+    updated_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc)
+    )
 
     model_config = ConfigDict(
         populate_by_name=True,
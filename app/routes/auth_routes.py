@@ -1,17 +1,26 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Body
 from fastapi.security import OAuth2PasswordRequestForm
 from typing import Any
 from datetime import timedelta
 
 # Importamos nuestras funciones de seguridad
-# ¡¡AÑADIMOS 'verify_password' aquí para el debug!!
 from app.core.security import verify_password, create_access_token
+from app.core.security import (
+    create_refresh_token, rotate_refresh_token, revoke_refresh_token,
+    revoke_user_refresh_tokens,
+)
+# Limitador de intentos de login
+from app.core.rate_limit import client_key, login_throttle
 # Importamos la configuración
 from app.config.settings import settings
 # Importamos la colección de la base de datos
 from app.config.database import collection_user
 # Importamos nuestro schema de respuesta
-from app.schemas.token_schema import Token
+from app.schemas.token_schema import Token, RefreshTokenRequest
+# Logging estructurado (no bloqueante)
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
 
 router = APIRouter(
     tags=["Auth"] # Lo agrupamos en "Auth" en los /docs
@@ -23,41 +32,55 @@ router = APIRouter(
     summary="Iniciar sesión y obtener un token de acceso"
 )
 async def login_for_access_token(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends()
 ) -> dict[str, Any]:
     """
     Endpoint de login.
+
+    Los intentos están limitados por cuenta y por cliente (429 + 'Retry-After').
     """
     
+    # 0. Limitar intentos ANTES de tocar la BBDD o verificar el hash
+    # (la IP real del cliente, aunque haya un proxy inverso adelante)
+    await login_throttle.check(form_data.username, client_key(request))
+
     # 1. Buscar al usuario
     user = await collection_user.find_one({"email": form_data.username})
     
-    # --- INICIO DEL BLOQUE DE DEBUG ---
-    print("="*30)
-    print(f"--- DEBUG: Intentando login para: {form_data.username}")
-    
-    if user:
-        print(f"--- DEBUG: Usuario encontrado en BBDD.")
-        print(f"--- DEBUG: Password recibido (front): '{form_data.password}'")
-        print(f"--- DEBUG: Hash guardado (BBDD):     '{user.get('hashed_password', '¡¡CAMPO HASHED_PASSWORD NO ENCONTRADO!!')}'")
-        
-        # Verificamos la contraseña aquí MISMO
-        is_password_correct = verify_password(form_data.password, user.get("hashed_password", ""))
-        print(f"--- DEBUG: ¿La verificación es exitosa?: {is_password_correct}")
-        
-    else:
-        print(f"--- DEBUG: Usuario NO encontrado en BBDD.")
-    
-    print("="*30)
-    # --- FIN DEL BLOQUE DE DEBUG ---
-
     # 2. Lógica de Verificación Real
-    if not user or not verify_password(form_data.password, user.get("hashed_password", "")):
+    # (el hash se verifica UNA sola vez; nunca logueamos la contraseña)
+    is_password_correct = bool(user) and verify_password(
+        form_data.password, user.get("hashed_password", "")
+    )
+
+    logger.info(
+        "Intento de login",
+        extra={"fields": {
+            "username": form_data.username,
+            "user_found": bool(user),
+            "success": is_password_correct,
+        }},
+    )
+
+    if not is_password_correct:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email o contraseña incorrectos",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    # Un usuario desactivado no obtiene NINGÚN token
+    # (solo se informa tras verificar la contraseña)
+    if not user.get("is_active", True):
+        logger.warning(
+            "Login de usuario desactivado",
+            extra={"fields": {"user_id": str(user["_id"])}},
+        )
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="El usuario está desactivado.",
+        )
         
     # 3. Crear el token JWT
     access_token_expires = timedelta(
@@ -67,5 +90,78 @@ async def login_for_access_token(
     access_token = create_access_token(
         data=token_data, expires_delta=access_token_expires
     )
+
+    # 4. Refresh token
+    refresh_token = await create_refresh_token(user)
+    
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+    }
+
+
+@router.post(
+    "/token/refresh",
+    response_model=Token,
+    summary="Obtener un nuevo access token usando un refresh token"
+)
+async def refresh_access_token(
+    body: RefreshTokenRequest = Body(...)
+) -> dict[str, Any]:
+    """
+    Canjea un refresh token por un access token nuevo
+    (sin volver a verificar la contraseña).
+
+    El refresh token usado queda revocado y se devuelve uno nuevo (rotación).
+    """
     
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    # 1. Consumir el refresh token (una búsqueda indexada)
+    token_doc = await rotate_refresh_token(body.refresh_token)
+    logger.info(
+        "Refresh token rotado",
+        extra={"fields": {"user_id": str(token_doc["user_id"])}},
+    )
+
+    # 2. El usuario debe seguir existiendo y estar activo
+    user = await collection_user.find_one(
+        {"_id": token_doc["user_id"]}, {"email": 1, "is_active": 1}
+    )
+    if not user or not user.get("is_active", True):
+        await revoke_user_refresh_tokens(token_doc["user_id"], reason="user_inactive")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="El usuario está desactivado.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    # 3. Crear el nuevo access token
+    access_token = create_access_token(
+        data={"sub": user["email"]},
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+
+    # 4. Emitir el siguiente refresh token de la cadena
+    refresh_token = await create_refresh_token(user)
+
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+    }
+
+
+@router.post(
+    "/token/revoke",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Revocar un refresh token (logout)"
+)
+async def revoke_token(
+    body: RefreshTokenRequest = Body(...)
+):
+    """
+    Revoca el refresh token recibido. Es idempotente:
+    responde 204 aunque el token ya no estuviera activo.
+    """
+    revoked = await revoke_refresh_token(body.refresh_token)
+    logger.info("Refresh token revocado", extra={"fields": {"revoked": revoked}})
\ No newline at end of file
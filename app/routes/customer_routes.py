@@ -0,0 +1,80 @@
+from fastapi import APIRouter, HTTPException, status, Body, Depends
+
+# Importaciones Clave
+from app.schemas.customer_schema import CustomerLookupRequest, CustomerLookupResponse
+from app.core.security import get_current_user
+from app.core.customer_directory import customer_key, lookup_customers
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+router = APIRouter(
+    prefix="/customers",
+    tags=["Customers"],
+    dependencies=[Depends(get_current_user)]
+)
+
+
+@router.post(
+    "/lookup",
+    response_model=CustomerLookupResponse,
+    summary="Buscar VARIOS clientes en el directorio (Solo Admins)"
+)
+async def lookup_customers_bulk(
+    lookup: CustomerLookupRequest = Body(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Para la carga masiva de paradas: indica qué clientes (teléfono +
+    dirección) ya tienen su 'validation_data' en el directorio, así
+    solo hay que cargarla para los nuevos.
+
+    Se resuelve con una sola consulta a la BBDD.
+    """
+
+    # 1. Verificar Permisos
+    if current_user.get("role") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para consultar el directorio de clientes."
+        )
+
+    # 2. Claves normalizadas (teléfono E.164 + hash de la dirección)
+    keys = [
+        customer_key(item.phone, item.address_street, item.address_number)
+        for item in lookup.customers
+    ]
+
+    # 3. Buscar todas juntas
+    found = await lookup_customers(keys)
+
+    # 4. Respuesta (mismo orden que el request)
+    results = []
+    for key in keys:
+        if key is None:
+            results.append({"found": False})
+            continue
+
+        phone_e164, hashed_address = key
+        customer = found.get(key)
+        if customer is None:
+            results.append({"found": False, "phone_e164": phone_e164, "address_hash": hashed_address})
+            continue
+
+        results.append({
+            "found": True,
+            "phone_e164": phone_e164,
+            "address_hash": hashed_address,
+            "customer_name": customer.get("customer_name"),
+            "neighborhood": customer.get("neighborhood"),
+            "validation_data": customer.get("validation_data"),
+            "times_seen": customer.get("times_seen", 0),
+            "last_seen_at": customer.get("last_seen_at"),
+        })
+
+    logger.info(
+        "Búsqueda en el directorio de clientes",
+        extra={"fields": {"requested": len(keys), "found": len(found)}},
+    )
+
+    return {"results": results}
\ No newline at end of file
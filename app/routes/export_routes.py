@@ -0,0 +1,166 @@
+from fastapi import APIRouter, HTTPException, status, Depends, Path, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING
+
+# Importaciones Clave
+from app.config.database import collection_stop, collection_route
+from app.core.security import get_current_user
+from app.core.exporter import stream_csv, stream_geojson, gzip_stream
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+router = APIRouter(
+    prefix="/routes",
+    tags=["Export"],
+    dependencies=[Depends(get_current_user)]
+)
+
+# Formatos soportados: (generador, media type, extensión)
+EXPORT_FORMATS = {
+    "csv": (stream_csv, "text/csv; charset=utf-8", "csv"),
+    "geojson": (stream_geojson, "application/geo+json", "geojson"),
+}
+
+# Cuántas paradas trae Motor por cada viaje a la BBDD
+CURSOR_BATCH_SIZE = 500
+
+
+def _export_response(query: dict, export_format: str, use_gzip: bool, filename: str):
+    """
+    Arma la StreamingResponse: cursor ordenado -> validación -> formato -> (gzip).
+    """
+    stream_fn, media_type, extension = EXPORT_FORMATS[export_format]
+
+    # El índice (route_id, order_in_route) cubre este orden
+    cursor = collection_stop.find(query, batch_size=CURSOR_BATCH_SIZE).sort(
+        [("route_id", ASCENDING), ("order_in_route", ASCENDING)]
+    )
+
+    body = stream_fn(cursor)
+    filename = f"{filename}.{extension}"
+
+    if use_gzip:
+        body = gzip_stream(body)
+        media_type = "application/gzip"
+        filename = f"{filename}.gz"
+
+    logger.info(
+        "Exportación iniciada",
+        extra={"fields": {"format": export_format, "gzip": use_gzip, "filename": filename}},
+    )
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get(
+    "/export",
+    summary="Exportar las paradas de VARIAS rutas (CSV / GeoJSON) (Solo Admins)"
+)
+async def export_routes_stops(
+    export_format: str = Query("csv", alias="format", pattern="^(csv|geojson)$"),
+    gzip: bool = Query(False, description="Comprimir la descarga (.gz)"),
+    route_ids: Optional[List[str]] = Query(None, description="IDs de rutas a exportar"),
+    created_from: Optional[datetime] = Query(None, description="Rutas creadas desde (incl.)"),
+    created_to: Optional[datetime] = Query(None, description="Rutas creadas hasta (excl.)"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Exporta en un solo archivo las paradas validadas de varias rutas
+    (ej: el cierre de mes), elegidas por ID y/o por fecha de creación.
+
+    La respuesta se envía en streaming: el consumo de memoria es
+    constante sin importar cuántas paradas haya.
+    """
+
+    # 1. Verificar Permisos
+    if current_user.get("role") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para exportar varias rutas."
+        )
+
+    if not route_ids and not created_from and not created_to:
+        raise HTTPException(
+            status_code=400,
+            detail="Indica 'route_ids' o un rango de fechas ('created_from' / 'created_to')."
+        )
+
+    # 2. Resolver las rutas
+    route_query: dict = {}
+    if route_ids:
+        try:
+            route_query["_id"] = {"$in": [ObjectId(route_id) for route_id in route_ids]}
+        except Exception:
+            raise HTTPException(status_code=400, detail="ID de Ruta inválido")
+
+    created_filter = {}
+    if created_from:
+        created_filter["$gte"] = created_from
+    if created_to:
+        created_filter["$lt"] = created_to
+    if created_filter:
+        route_query["created_at"] = created_filter
+
+    routes_cursor = collection_route.find(route_query, {"_id": 1})
+    route_object_ids = [route["_id"] async for route in routes_cursor]
+
+    # 3. Exportar
+    return _export_response(
+        {"route_id": {"$in": route_object_ids}},
+        export_format,
+        gzip,
+        filename="rutas",
+    )
+
+
+@router.get(
+    "/{route_id}/export",
+    summary="Exportar las paradas VALIDADAS de una ruta (CSV / GeoJSON)"
+)
+async def export_route_stops(
+    route_id: str = Path(..., title="El ID de la ruta"),
+    export_format: str = Query("csv", alias="format", pattern="^(csv|geojson)$"),
+    gzip: bool = Query(False, description="Comprimir la descarga (.gz)"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Descarga las paradas de una ruta, con 'validation_status' y
+    'validation_message', como CSV o como FeatureCollection GeoJSON.
+    """
+
+    # 1. Validar ruta
+    try:
+        route_object_id = ObjectId(route_id)
+        route = await collection_route.find_one({"_id": route_object_id})
+    except Exception:
+        raise HTTPException(status_code=400, detail="ID de Ruta inválido")
+
+    if not route:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No se encontró la ruta con ID {route_id}"
+        )
+
+    # 2. Permisos (igual que GET /routes/{route_id}/stops)
+    is_repartidor = current_user.get("role") == "repartidor"
+    if is_repartidor and route.get("owner_id") != current_user.get("_id"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para ver esta ruta."
+        )
+
+    # 3. Exportar
+    return _export_response(
+        {"route_id": route_object_id},
+        export_format,
+        gzip,
+        filename=f"ruta_{route_id}",
+    )
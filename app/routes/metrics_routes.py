@@ -0,0 +1,128 @@
+import os
+
+from fastapi import APIRouter, HTTPException, status, Depends
+
+from app.core.security import get_current_user
+from app.core.rate_limit import login_throttle
+from app.core.logger import dropped_log_records
+from app.core.compression import compression_stats, msgpack_stats
+from app.core.validator import geocoder
+from app.core.geodata import mapping_memory_usage
+from app.config.settings import settings
+from app.core.admission import admission_controller
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"],
+    dependencies=[Depends(get_current_user)]
+)
+
+
+def _require_admin(current_user: dict) -> None:
+    if current_user.get("role") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para ver las métricas."
+        )
+
+
+@router.get(
+    "/rate-limit",
+    summary="Contadores del limitador de login (Solo Admins)"
+)
+async def get_rate_limit_metrics(
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Devuelve cuántos intentos de login se permitieron / rechazaron
+    por cliente y por cuenta, junto con los límites configurados.
+    """
+    _require_admin(current_user)
+    return login_throttle.stats()
+
+
+
+@router.get(
+    "/logging",
+    summary="Estado del logging asíncrono (Solo Admins)"
+)
+async def get_logging_metrics(
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Devuelve cuántos registros de log se descartaron porque la cola
+    estaba llena (la salida de logs no da abasto).
+    """
+    _require_admin(current_user)
+    return {"dropped_records": dropped_log_records()}
+
+
+@router.get(
+    "/compression",
+    summary="Costo y ganancia de la compresión por endpoint (Solo Admins)"
+)
+async def get_compression_metrics(
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Por endpoint: respuestas comprimidas/omitidas, bytes antes y después,
+    ratio y tiempo medio de compresión. Incluye el costo de MessagePack.
+    """
+    _require_admin(current_user)
+    return {
+        "compression": compression_stats.snapshot(),
+        "msgpack": msgpack_stats,
+    }
+
+
+@router.get(
+    "/geocoding",
+    summary="Estado del proveedor de geocodificación (Solo Admins)"
+)
+async def get_geocoding_metrics(
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Proveedor activo y, si es HTTP: requests, fallos, estado del
+    circuit breaker y aciertos de la caché.
+    """
+    _require_admin(current_user)
+    return geocoder.stats()
+
+
+@router.get(
+    "/admission",
+    summary="Estado del control de admisión (Solo Admins)"
+)
+async def get_admission_metrics(
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Por clase (read / write / auth): requests en curso, en fila, pico
+    de la fila, admitidas, rechazadas (fila llena / deadline vencido)
+    y espera media en la fila.
+    """
+    _require_admin(current_user)
+    return admission_controller.stats()
+
+
+@router.get(
+    "/geodata",
+    summary="Memoria del archivo de geodata en ESTE worker (Solo Admins)"
+)
+async def get_geodata_metrics(
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Rss / Pss / páginas compartidas del mapeo de GEODATA_PATH en el
+    worker que atiende la request (según su /proc/self/smaps).
+    Cada request puede caer en otro worker: el 'pid' indica cuál.
+    """
+    _require_admin(current_user)
+    if not settings.GEODATA_PATH:
+        return {"pid": os.getpid(), "geodata_path": None, "usage_kb": {}}
+    return {
+        "pid": os.getpid(),
+        "geodata_path": settings.GEODATA_PATH,
+        "usage_kb": mapping_memory_usage(settings.GEODATA_PATH),
+    }
\ No newline at end of file
@@ -1,15 +1,32 @@
-from fastapi import APIRouter, HTTPException, status, Body, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, status, Body, Depends, Path, Query
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional
 from datetime import datetime, timezone
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+import time
 
 # --- Importaciones Clave ---
-from app.schemas.route_schema import RouteCreate, RouteOut
-from app.config.database import collection_route
+from app.schemas.route_schema import (
+    RouteCreate, RouteOut, DispatchRequest, DispatchRouteOut, RouteEtaStartIn, RouteEtaOut
+)
+from app.config.database import collection_route, collection_stop, collection_user
+from app.config.settings import settings
+from app.core.dispatch import plan_routes
+from app.core.stop_builder import build_stop_document
+from app.core.customer_directory import remember_customers, resolve_validation_data
+from app.core.eta import recompute_route_etas, route_eta_report
 from app.core.security import get_current_user # <-- Nuestra dependencia
+from app.core.logger import get_logger
+from app.core.compression import NegotiatedResponse
+
+logger = get_logger(__name__)
 
 router = APIRouter(
     prefix="/routes",
     tags=["Routes"],
+    # JSON o MessagePack según la cabecera 'Accept'
+    default_response_class=NegotiatedResponse,
     # Protegemos TODAS las rutas de este router
     dependencies=[Depends(get_current_user)] 
 )
@@ -59,5 +76,301 @@ async def create_route(
         # Convertimos IDs a strings para el schema RouteOut
         created_route["id"] = str(created_route["_id"])
         created_route["owner_id"] = str(created_route["owner_id"])
+        logger.info("Ruta creada", extra={"fields": {"route_id": created_route["id"]}})
         
-    return created_route
\ No newline at end of file
+    return created_route
+
+
+@router.post(
+    "/dispatch",
+    response_model=List[DispatchRouteOut],
+    status_code=status.HTTP_201_CREATED,
+    summary="Repartir paradas entre repartidores (crea las rutas) (Solo Admins)"
+)
+async def dispatch_routes(
+    dispatch: DispatchRequest = Body(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Recibe las paradas NUEVAS del día (los datos de cada una, como en
+    POST /routes/{route_id}/stops) y los repartidores disponibles.
+    No reasigna paradas que ya existan en la BBDD: las crea.
+
+    - Agrupa las paradas por cercanía (k-means balanceado): cada
+      repartidor recibe aproximadamente la misma cantidad.
+    - Ordena las paradas de cada grupo ('order_in_route').
+    - Crea una ruta por repartidor (su 'owner_id') y todas las paradas
+      con inserciones masivas.
+    - Las paradas sin 'validation_data' la toman del directorio de clientes.
+    - Si falla alguna inserción se borra lo ya creado (rutas y paradas):
+      o se crea el despacho completo, o nada.
+    """
+
+    # 1. Verificar Permisos
+    if current_user.get("role") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para despachar rutas."
+        )
+
+    if len(dispatch.stops) > settings.DISPATCH_MAX_STOPS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo {settings.DISPATCH_MAX_STOPS} paradas por despacho."
+        )
+    if len(dispatch.driver_ids) > settings.DISPATCH_MAX_DRIVERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo {settings.DISPATCH_MAX_DRIVERS} repartidores por despacho."
+        )
+    if (dispatch.depot_lat is None) != (dispatch.depot_lon is None):
+        raise HTTPException(
+            status_code=400,
+            detail="Indica 'depot_lat' y 'depot_lon' juntos."
+        )
+
+    # 2. Verificar los repartidores (existen, activos y con rol 'repartidor')
+    try:
+        driver_object_ids = [ObjectId(driver_id) for driver_id in dispatch.driver_ids]
+    except Exception:
+        raise HTTPException(status_code=400, detail="ID de Repartidor inválido")
+
+    if len(set(driver_object_ids)) != len(driver_object_ids):
+        raise HTTPException(status_code=400, detail="Hay repartidores repetidos.")
+
+    drivers_cursor = collection_user.find(
+        {
+            "_id": {"$in": driver_object_ids},
+            "role": "repartidor",
+            "is_active": {"$ne": False},
+        },
+        {"_id": 1}
+    )
+    found_ids = {driver["_id"] async for driver in drivers_cursor}
+    missing = [str(driver_id) for driver_id in driver_object_ids if driver_id not in found_ids]
+
+    if missing:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Repartidores inexistentes o inactivos: {', '.join(missing)}"
+        )
+
+    # 3. Resolver la 'verdad' de la calle de cada parada (directorio de clientes)
+    validation_data_list = await resolve_validation_data(dispatch.stops)
+    unresolved = [
+        str(index) for index, validation_data in enumerate(validation_data_list)
+        if validation_data is None
+    ]
+    if unresolved:
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                "Clientes fuera del directorio, envía su 'validation_data' "
+                f"(paradas: {', '.join(unresolved[:20])})"
+            )
+        )
+
+    # 4. Planificar (CPU): en un thread, para no bloquear el event loop
+    start = time.perf_counter()
+    depot = None
+    if dispatch.depot_lat is not None:
+        depot = (dispatch.depot_lat, dispatch.depot_lon)
+
+    plan = await run_in_threadpool(
+        plan_routes,
+        [stop.gps_lat_cliente for stop in dispatch.stops],
+        [stop.gps_lon_cliente for stop in dispatch.stops],
+        len(driver_object_ids),
+        depot,
+    )
+    planning_ms = (time.perf_counter() - start) * 1000
+
+    # 5. Armar las rutas (una por repartidor con paradas)
+    now = datetime.now(timezone.utc)
+    assignments = [
+        (driver_id, stop_indexes)
+        for driver_id, stop_indexes in zip(driver_object_ids, plan)
+        if stop_indexes
+    ]
+    # Los IDs se generan aquí: así se sabe qué borrar si algo falla a mitad
+    new_routes = [
+        {
+            "_id": ObjectId(),
+            "name": f"{dispatch.name_prefix} #{number}",
+            "status": "PENDIENTE",
+            "owner_id": driver_id, # La ruta queda asignada al repartidor
+            "created_at": now,
+        }
+        for number, (driver_id, _) in enumerate(assignments, start=1)
+    ]
+    route_object_ids = [route["_id"] for route in new_routes]
+
+    # 6. Armar TODAS las paradas
+    new_stops = []
+    for route_object_id, (_, stop_indexes) in zip(route_object_ids, assignments):
+        for order, stop_index in enumerate(stop_indexes, start=1):
+            new_stops.append(
+                build_stop_document(
+                    route_object_id,
+                    dispatch.stops[stop_index],
+                    order,
+                    validation_data=validation_data_list[stop_index],
+                )
+            )
+
+    # 7. Guardar rutas y paradas (dos inserciones masivas).
+    # Sin transacciones (MongoDB standalone): si algo falla, se limpia
+    try:
+        await collection_route.insert_many(new_routes)
+        await collection_stop.insert_many(new_stops, ordered=False)
+    except PyMongoError:
+        logger.exception(
+            "Despacho fallido, se borran las rutas creadas",
+            extra={"fields": {"routes": len(new_routes), "stops": len(new_stops)}},
+        )
+        await collection_stop.delete_many({"route_id": {"$in": route_object_ids}})
+        await collection_route.delete_many({"_id": {"$in": route_object_ids}})
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="No se pudo crear el despacho. No se guardó ninguna ruta."
+        )
+
+    # Despacho guardado: ahora el directorio de clientes aprende del lote
+    await remember_customers(dispatch.stops, validation_data_list)
+
+    logger.info(
+        "Despacho creado",
+        extra={"fields": {
+            "routes": len(new_routes),
+            "stops": len(new_stops),
+            "planning_ms": round(planning_ms, 2),
+        }},
+    )
+
+    # 8. Respuesta
+    dispatched_routes = []
+    for route_dict, route_object_id, (_, stop_indexes) in zip(
+        new_routes, route_object_ids, assignments
+    ):
+        dispatched_routes.append({
+            **{key: value for key, value in route_dict.items() if key != "_id"},
+            "id": str(route_object_id),
+            "owner_id": str(route_dict["owner_id"]),
+            "stop_count": len(stop_indexes),
+        })
+
+    return dispatched_routes
+
+
+@router.get(
+    "/{route_id}/eta",
+    response_model=RouteEtaOut,
+    summary="ETAs de las paradas y entregas fuera de su ventana horaria"
+)
+async def get_route_eta(
+    route_id: str = Path(..., title="El ID de la ruta"),
+    start_time: Optional[datetime] = Query(
+        None, description="Simular otra hora de salida (no se guarda)"
+    ),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Hora estimada de llegada a cada parada (en orden), esperas por
+    llegar antes de la ventana y paradas que llegan TARDE.
+
+    Sin 'start_time' devuelve los ETAs guardados, calculados con la
+    hora de salida de la ruta (ver PUT /routes/{route_id}/eta).
+    Ojo: si a alguna parada le falta su ETA (ej: un recálculo que se
+    interrumpió), este GET lo calcula y lo GUARDA para toda la ruta
+    (actualiza 'eta' y 'updated_at'). Es idempotente: una segunda
+    lectura ya no escribe nada.
+
+    Con 'start_time' es una simulación: no se guarda nada.
+    """
+
+    # 1. Validar ruta
+    try:
+        route = await collection_route.find_one({"_id": ObjectId(route_id)})
+    except Exception:
+        raise HTTPException(status_code=400, detail="ID de Ruta inválido")
+
+    if not route:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No se encontró la ruta con ID {route_id}"
+        )
+
+    # 2. Permisos (igual que GET /routes/{route_id}/stops)
+    is_repartidor = current_user.get("role") == "repartidor"
+    if is_repartidor and route.get("owner_id") != current_user.get("_id"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para ver esta ruta."
+        )
+
+    if start_time is None and route.get("eta_start_time") is None:
+        raise HTTPException(
+            status_code=400,
+            detail="La ruta no tiene hora de salida: defínela (PUT) o indica 'start_time'."
+        )
+
+    # 3. Calcular / leer los ETAs
+    return await route_eta_report(route, start_time)
+
+
+@router.put(
+    "/{route_id}/eta",
+    response_model=RouteEtaOut,
+    summary="Definir la hora de salida de una ruta y calcular sus ETAs"
+)
+async def set_route_eta_start(
+    route_id: str = Path(..., title="El ID de la ruta"),
+    eta_start: RouteEtaStartIn = Body(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Guarda la hora de salida (llegada a la primera parada) y calcula
+    el ETA de todas las paradas. Desde ese momento, mover una parada
+    recalcula solo esa parada y las siguientes.
+    """
+
+    # 1. Validar ruta
+    try:
+        route_object_id = ObjectId(route_id)
+        route = await collection_route.find_one({"_id": route_object_id})
+    except Exception:
+        raise HTTPException(status_code=400, detail="ID de Ruta inválido")
+
+    if not route:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No se encontró la ruta con ID {route_id}"
+        )
+
+    # 2. Permisos: el admin o el repartidor dueño de la ruta
+    is_repartidor = current_user.get("role") == "repartidor"
+    if is_repartidor and route.get("owner_id") != current_user.get("_id"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para modificar esta ruta."
+        )
+
+    # 3. Guardar la hora de salida y recalcular la ruta completa
+    start_time = eta_start.start_time
+    if start_time.tzinfo is None:
+        start_time = start_time.replace(tzinfo=timezone.utc)
+
+    await collection_route.update_one(
+        {"_id": route_object_id},
+        {"$set": {"eta_start_time": start_time}}
+    )
+    route["eta_start_time"] = start_time
+    updated_stops = await recompute_route_etas(route)
+
+    logger.info(
+        "Hora de salida de ruta definida",
+        extra={"fields": {"route_id": route_id, "updated_stops": updated_stops}},
+    )
+
+    # 4. Respuesta (ETAs recién guardados)
+    return await route_eta_report(route)
\ No newline at end of file
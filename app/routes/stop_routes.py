@@ -1,19 +1,29 @@
-from fastapi import APIRouter, HTTPException, status, Body, Depends, Path
-from typing import List
+from fastapi import APIRouter, HTTPException, status, Body, Depends, Path, Query
+from typing import List, Optional
 from datetime import datetime, timezone
 from bson import ObjectId
-from app.core.validator import validate_stop
+from app.core.validator import validate_stops
 from app.schemas.stop_schema import StopLocationUpdate
 from app.core.validator import _simulate_geocoding_neighborhood
 
 # Importaciones Clave
-from app.schemas.stop_schema import StopCreate, StopOut
-from app.config.database import collection_stop, collection_route
+from app.schemas.stop_schema import StopCreate, StopOut, StopNearbyOut, StopChangesOut
+from app.config.database import collection_stop, collection_route, collection_stop_tombstone
 from app.core.security import get_current_user
-from app.core.validator import _validate_phone_ar
+from app.core.stop_builder import build_stop_document
+from app.core.customer_directory import remember_customers, resolve_validation_data
+from app.core.eta import recompute_route_etas
+from app.core.geo import build_geo_point
+from app.core.sync import sync_upper_bound, requires_full_resync
+from app.core.logger import get_logger
+from app.core.compression import NegotiatedResponse
+
+logger = get_logger(__name__)
 
 router = APIRouter(
     tags=["Stops"],
+    # JSON o MessagePack según la cabecera 'Accept'
+    default_response_class=NegotiatedResponse,
     dependencies=[Depends(get_current_user)] 
 )
 
@@ -30,6 +40,10 @@ async def create_stop_for_route(
 ):
     """
     Crea una nueva parada (v4) y la asocia a una ruta existente.
+
+    Si no se envía 'validation_data', se toma del directorio de
+    clientes (mismo teléfono y dirección). Si se envía, se guarda en
+    el directorio para las próximas paradas de ese cliente.
     """
     
     # 1. Verificar Permisos (igual)
@@ -52,40 +66,44 @@ async def create_stop_for_route(
             detail=f"No se encontró la ruta con ID {route_id}"
         )
         
-    # 3. Crear el diccionario para la BBDD (v4)
-    is_phone_valid = _validate_phone_ar(stop.phone_cliente)
-    validation_data_dict = stop.validation_data.model_dump()
-    validation_data_dict["is_phone_valid"] = is_phone_valid
-
-    new_stop_dict = {
-        "route_id": route_object_id,
-        "customer_name": stop.customer_name,
-        "order_in_route": stop.order_in_route,
-        "status": "PENDIENTE",
-        "neighborhood_cliente": stop.neighborhood_cliente,
-        "phone_cliente": stop.phone_cliente,
-        "gps_lat_cliente": stop.gps_lat_cliente,
-        "gps_lon_cliente": stop.gps_lon_cliente,
-        "address_street_cliente": stop.address_street_cliente,
-        "address_number_cliente": stop.address_number_cliente,
-        "address_ref1_cliente": stop.address_ref1_cliente,
-        "address_ref2_cliente": stop.address_ref2_cliente,
-        "validation_data": validation_data_dict,
-        "created_at": datetime.now(timezone.utc)
-    }
+    # 3. Resolver la 'verdad' de la calle (enviada o del directorio)
+    validation_data = (await resolve_validation_data([stop]))[0]
+    if validation_data is None:
+        raise HTTPException(
+            status_code=400,
+            detail="El cliente no está en el directorio: envía 'validation_data'."
+        )
+
+    # 4. Crear el diccionario para la BBDD (v4)
+    new_stop_dict = build_stop_document(route_object_id, stop, validation_data=validation_data)
     
-    # 4. Insertar en la base de datos
+    # 5. Insertar en la base de datos
     insert_result = await collection_stop.insert_one(new_stop_dict)
+
+    # La parada ya se guardó: ahora el directorio aprende de ella
+    await remember_customers([stop], [validation_data])
+
+    # Si la ruta tiene hora de salida, la nueva parada corre los ETAs
+    # de las siguientes: recalculamos desde ella
+    await recompute_route_etas(route, from_order=new_stop_dict["order_in_route"])
     
-    # 5. Devolver la parada recién creada (validada)
+    # 6. Devolver la parada recién creada (validada)
     created_stop = await collection_stop.find_one(
         {"_id": insert_result.inserted_id}
     )
     
     if created_stop:
-        created_stop = validate_stop(created_stop)
+        created_stop = (await validate_stops([created_stop]))[0]
         created_stop["id"] = str(created_stop["_id"])
         created_stop["route_id"] = str(created_stop["route_id"])
+        logger.info(
+            "Parada creada",
+            extra={"fields": {
+                "stop_id": created_stop["id"],
+                "route_id": route_id,
+                "validation_status": created_stop["validation_status"],
+            }},
+        )
         
     return created_stop
 
@@ -131,11 +149,12 @@ async def get_stops_for_route(
     # -----------------------------------------------
         
     # 3. BUSCAR, VALIDAR Y CONSTRUIR LA RESPUESTA
+    # (todos los barrios se piden juntos al geocodificador)
     stops_cursor = collection_stop.find({"route_id": route_object_id})
+    stops = await stops_cursor.to_list(length=None)
     validated_stops_list = []
     
-    async for stop in stops_cursor:
-        validated_stop = validate_stop(stop)
+    for validated_stop in await validate_stops(stops):
         validated_stop["id"] = str(validated_stop["_id"])
         validated_stop["route_id"] = str(validated_stop["route_id"])
         validated_stops_list.append(validated_stop)
@@ -186,7 +205,12 @@ async def update_stop_location(
         "$set": {
             "gps_lat_cliente": location.gps_lat_cliente,
             "gps_lon_cliente": location.gps_lon_cliente,
+            # Mantenemos el punto GeoJSON sincronizado (búsqueda por cercanía)
+            "location": build_geo_point(
+                location.gps_lat_cliente, location.gps_lon_cliente
+            ),
             # ¡Ya NO actualizamos el neighborhood_cliente!
+            "updated_at": datetime.now(timezone.utc),
         }
     }
     
@@ -195,16 +219,176 @@ async def update_stop_location(
         {"_id": stop_object_id},
         update_data
     )
+
+    # Cambian los tramos hacia y desde esta parada: recalculamos los
+    # ETAs SOLO de ella y las siguientes (si la ruta tiene hora de salida)
+    route = await collection_route.find_one(
+        {"_id": stop["route_id"]}, {"eta_start_time": 1}
+    )
+    if route:
+        await recompute_route_etas(route, from_order=stop["order_in_route"])
     
     # 5. Obtenemos la parada actualizada
     updated_stop = await collection_stop.find_one({"_id": stop_object_id})
     
     # 6. La validamos y la devolvemos
     if updated_stop:
-        # validate_stop AHORA hará la comparación correcta:
+        # validate_stops AHORA hará la comparación correcta:
         # (ej: 'city bell' vs 'tolosa')
-        updated_stop = validate_stop(updated_stop)
+        updated_stop = (await validate_stops([updated_stop]))[0]
         updated_stop["id"] = str(updated_stop["_id"])
         updated_stop["route_id"] = str(updated_stop["route_id"])
+        logger.info(
+            "Ubicación de parada actualizada",
+            extra={"fields": {
+                "stop_id": stop_id,
+                "user_id": str(current_user["_id"]),
+                "validation_status": updated_stop["validation_status"],
+            }},
+        )
             
-    return updated_stop
\ No newline at end of file
+    return updated_stop
+
+
+@router.get(
+    "/stops/nearby",
+    response_model=List[StopNearbyOut],
+    summary="Obtener las paradas PENDIENTES cercanas al repartidor"
+)
+async def get_nearby_stops(
+    lat: float = Query(..., ge=-90, le=90, description="Latitud actual del repartidor"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitud actual del repartidor"),
+    max_distance: float = Query(500, gt=0, le=50000, description="Radio de búsqueda en metros"),
+    limit: int = Query(20, gt=0, le=200),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Devuelve las paradas pendientes de las rutas del usuario actual
+    que están a menos de 'max_distance' metros de su posición,
+    ordenadas de la más cercana a la más lejana.
+
+    Usa '$geoNear' sobre el índice '2dsphere' del campo 'location'.
+    """
+
+    # 1. Rutas asignadas al usuario actual (solo necesitamos los IDs)
+    routes_cursor = collection_route.find(
+        {"owner_id": current_user["_id"]}, {"_id": 1}
+    )
+    route_ids = [route["_id"] async for route in routes_cursor]
+
+    if not route_ids:
+        return []
+
+    # 2. $geoNear debe ser la PRIMERA etapa del pipeline.
+    # Ya devuelve los documentos ordenados por distancia.
+    pipeline = [
+        {
+            "$geoNear": {
+                "near": build_geo_point(lat, lon),
+                "key": "location",
+                "distanceField": "distance_m",
+                "maxDistance": max_distance,
+                "spherical": True,
+                "query": {
+                    "route_id": {"$in": route_ids},
+                    "status": "PENDIENTE",
+                },
+            }
+        },
+        {"$limit": limit},
+    ]
+
+    # 3. Validamos y construimos la respuesta
+    stops = await collection_stop.aggregate(pipeline).to_list(length=None)
+    nearby_stops_list = []
+
+    for validated_stop in await validate_stops(stops):
+        validated_stop["id"] = str(validated_stop["_id"])
+        validated_stop["route_id"] = str(validated_stop["route_id"])
+        nearby_stops_list.append(validated_stop)
+
+    return nearby_stops_list
+
+
+@router.get(
+    "/routes/{route_id}/stops/changes",
+    response_model=StopChangesOut,
+    summary="Sincronización incremental: paradas cambiadas desde una watermark"
+)
+async def get_stop_changes_for_route(
+    route_id: str = Path(..., title="El ID de la ruta"),
+    since: Optional[datetime] = Query(
+        None, description="Watermark devuelta por la sincronización anterior"
+    ),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Devuelve solo las paradas creadas o modificadas después de 'since'
+    (y los IDs de las borradas), junto con la nueva watermark.
+
+    Sin 'since' (o con una watermark demasiado vieja) devuelve la ruta
+    completa con 'full_resync = true'.
+    """
+
+    # 1. Validar ruta (igual que GET /routes/{route_id}/stops)
+    try:
+        route_object_id = ObjectId(route_id)
+        route = await collection_route.find_one({"_id": route_object_id})
+    except Exception:
+        raise HTTPException(status_code=400, detail="ID de Ruta inválido")
+
+    if not route:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No se encontró la ruta con ID {route_id}"
+        )
+
+    # 2. Permisos
+    is_repartidor = current_user.get("role") == "repartidor"
+    if is_repartidor and route.get("owner_id") != current_user.get("_id"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para ver esta ruta."
+        )
+
+    # 3. Ventana de sincronización: (since, upper]
+    if since is not None and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    upper = sync_upper_bound()
+    full_resync = requires_full_resync(since)
+
+    if not full_resync and since >= upper:
+        # El cliente ya está al día (sincronizó hace instantes)
+        return {"stops": [], "deleted_stop_ids": [], "watermark": since}
+
+    window = {"$lte": upper}
+    if not full_resync:
+        window["$gt"] = since
+
+    # 4. Paradas cambiadas (índice route_id + updated_at)
+    stops_cursor = collection_stop.find(
+        {"route_id": route_object_id, "updated_at": window}
+    )
+    stops = await stops_cursor.to_list(length=None)
+    changed_stops_list = []
+
+    for validated_stop in await validate_stops(stops):
+        validated_stop["id"] = str(validated_stop["_id"])
+        validated_stop["route_id"] = str(validated_stop["route_id"])
+        changed_stops_list.append(validated_stop)
+
+    # 5. Paradas borradas (en un resync completo no hacen falta)
+    deleted_stop_ids = []
+    if not full_resync:
+        tombstones_cursor = collection_stop_tombstone.find(
+            {"route_id": route_object_id, "deleted_at": window},
+            {"stop_id": 1}
+        )
+        deleted_stop_ids = [str(t["stop_id"]) async for t in tombstones_cursor]
+
+    return {
+        "stops": changed_stops_list,
+        "deleted_stop_ids": deleted_stop_ids,
+        "watermark": upper,
+        "full_resync": full_resync,
+    }
\ No newline at end of file
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, HTTPException, status, Body
+from fastapi import APIRouter, HTTPException, status, Body, Path
+from bson import ObjectId
 from typing import List
 from datetime import datetime, timezone # <-- 1. Importamos datetime
 
@@ -12,11 +13,15 @@ from app.core.security import get_password_hash
 from app.config.database import collection_user
 
 from app.core.security import get_current_user
+from app.core.security import revoke_user_refresh_tokens
+from app.core.logger import get_logger
 
 from fastapi import Depends
 
 # (Ya no importamos UserModel, es lo que está fallando)
 
+logger = get_logger(__name__)
+
 router = APIRouter(
     prefix="/users",
     tags=["Users"]
@@ -69,6 +74,10 @@ async def create_user(user: UserCreate = Body(...)):
     )
     if created_user:
         created_user["id"] = str(created_user["_id"])
+        logger.info(
+            "Usuario creado",
+            extra={"fields": {"user_id": created_user["id"], "role": user.role}},
+        )
     # FastAPI usará UserOut para filtrar la respuesta (esto sí funciona)
     return created_user
 
@@ -93,4 +102,57 @@ async def read_users_me(
     # 'UserOut' (response_model) pueda validarlo.
     current_user["id"] = str(current_user["_id"])
     
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+# --- Endpoint para DESACTIVAR un Usuario (Solo Admins) ---
+@router.patch(
+    "/{user_id}/deactivate",
+    response_model=UserOut,
+    summary="Desactivar un usuario y revocar sus refresh tokens (Solo Admins)"
+)
+async def deactivate_user(
+    user_id: str = Path(..., title="El ID del usuario a desactivar"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Marca al usuario como inactivo y revoca todos sus refresh tokens.
+    Desde ese momento '/token' y '/token/refresh' lo rechazan, y sus
+    access tokens ya emitidos dejan de ser aceptados.
+    """
+
+    # 1. Verificar Permisos
+    if current_user.get("role") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para desactivar usuarios."
+        )
+
+    # 2. Validar el User ID
+    try:
+        user_object_id = ObjectId(user_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="ID de Usuario inválido")
+
+    # 3. Desactivar
+    result = await collection_user.update_one(
+        {"_id": user_object_id},
+        {"$set": {"is_active": False}}
+    )
+
+    if result.matched_count == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No se encontró el usuario con ID {user_id}"
+        )
+
+    # 4. Revocar sus refresh tokens
+    revoked_count = await revoke_user_refresh_tokens(user_object_id, reason="deactivated")
+    logger.info(
+        "Usuario desactivado",
+        extra={"fields": {"user_id": user_id, "revoked_refresh_tokens": revoked_count}},
+    )
+
+    deactivated_user = await collection_user.find_one({"_id": user_object_id})
+    deactivated_user["id"] = str(deactivated_user["_id"])
+    return deactivated_user
\ No newline at end of file
@@ -0,0 +1,31 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Optional, List
+
+from app.schemas.stop_schema import ValidationDataIn
+
+# --- Búsqueda masiva en el directorio de clientes ---
+class CustomerLookupItem(BaseModel):
+    phone: str
+    address_street: str
+    address_number: str
+
+class CustomerLookupRequest(BaseModel):
+    customers: List[CustomerLookupItem] = Field(..., min_length=1, max_length=1000)
+
+class CustomerLookupResult(BaseModel):
+    found: bool
+    # None si el teléfono no es válido (no puede estar en el directorio)
+    phone_e164: Optional[str] = None
+    address_hash: Optional[str] = None
+
+    # Solo si 'found'
+    customer_name: Optional[str] = None
+    neighborhood: Optional[str] = None
+    validation_data: Optional[ValidationDataIn] = None
+    times_seen: Optional[int] = None
+    last_seen_at: Optional[datetime] = None
+
+class CustomerLookupResponse(BaseModel):
+    # Mismo orden que 'customers' en el request
+    results: List[CustomerLookupResult]
\ No newline at end of file
@@ -1,6 +1,8 @@
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
+
+from app.schemas.stop_schema import StopCreate
 
 # Esquema base con campos comunes
 class RouteBase(BaseModel):
@@ -16,7 +18,58 @@ class RouteOut(RouteBase):
     id: str
     owner_id: str # Devolveremos el ID del dueño como string
     created_at: datetime
+    eta_start_time: Optional[datetime] = None
     
     model_config = ConfigDict(
         from_attributes = True
-    )
\ No newline at end of file
+    )
+
+# --- Esquemas del Despacho (reparto de paradas entre repartidores) ---
+
+class DispatchStopIn(StopCreate):
+    # El orden lo calcula el despacho
+    order_in_route: Optional[int] = None
+
+class DispatchRequest(BaseModel):
+    # Cada ruta se llamará "<name_prefix> #1", "<name_prefix> #2", ...
+    name_prefix: str = Field(..., min_length=3, max_length=90)
+    driver_ids: List[str] = Field(..., min_length=1)
+    stops: List[DispatchStopIn] = Field(..., min_length=1)
+
+    # Punto de partida (depósito), opcional. Si falta, se usa el centro
+    # de todas las paradas para decidir por dónde empieza cada ruta.
+    depot_lat: Optional[float] = Field(None, ge=-90, le=90)
+    depot_lon: Optional[float] = Field(None, ge=-180, le=180)
+
+class DispatchRouteOut(RouteOut):
+    stop_count: int
+
+# --- Esquemas de ETAs / ventanas horarias ---
+
+class RouteEtaStartIn(BaseModel):
+    # Hora de llegada a la primera parada
+    start_time: datetime
+
+class RouteEtaStopOut(BaseModel):
+    stop_id: str
+    order_in_route: int
+    customer_name: str
+    time_window_start: Optional[datetime] = None
+    time_window_end: Optional[datetime] = None
+    arrival: datetime
+    service_start: datetime
+    departure: datetime
+    wait_s: float
+    late: bool
+    late_by_s: float
+    leg_km: float
+
+class RouteEtaOut(BaseModel):
+    route_id: str
+    start_time: datetime
+    end_time: Optional[datetime] = None   # Salida de la última parada
+    total_km: float
+    late_count: int
+    # False => cálculo "qué pasaría si" con 'start_time' (no se guardó)
+    persisted: bool
+    stops: List[RouteEtaStopOut]
\ No newline at end of file
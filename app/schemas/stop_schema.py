@@ -1,6 +1,13 @@
-from pydantic import BaseModel, Field, ConfigDict
-from datetime import datetime
-from typing import Optional
+from pydantic import BaseModel, Field, ConfigDict, model_validator
+from datetime import datetime, timezone
+from typing import Optional, List
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Fechas sin zona horaria = UTC (igual que las que devuelve Motor)."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
 
 # --- Esquema para el sub-documento de validación (v4) ---
 # Esto es lo que pedimos en el POST: solo la 'verdad' de la calle
@@ -19,18 +26,35 @@ class StopBase(BaseModel):
     # --- Datos del Cliente ("Sucios") ---
     neighborhood_cliente: str
     phone_cliente: str
-    gps_lat_cliente: float # <-- El GPS sigue siendo del cliente
-    gps_lon_cliente: float
+    gps_lat_cliente: float = Field(..., ge=-90, le=90) # <-- El GPS sigue siendo del cliente
+    gps_lon_cliente: float = Field(..., ge=-180, le=180)
     
     address_street_cliente: str
     address_number_cliente: str
     address_ref1_cliente: Optional[str] = None
     address_ref2_cliente: Optional[str] = None
 
+    # --- Ventana horaria de entrega (opcional) ---
+    time_window_start: Optional[datetime] = None
+    time_window_end: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def check_time_window(self):
+        # Se comparan en UTC: mezclar una fecha con zona y otra sin
+        # zona no debe romper la comparación (TypeError => 500)
+        if (
+            self.time_window_start is not None
+            and self.time_window_end is not None
+            and _as_utc(self.time_window_end) < _as_utc(self.time_window_start)
+        ):
+            raise ValueError("'time_window_end' no puede ser anterior a 'time_window_start'")
+        return self
+
 # --- Esquema para CREAR una parada (v4) ---
 class StopCreate(StopBase):
-    # Requerimos los datos de validación (solo calle/nro)
-    validation_data: ValidationDataIn
+    # Datos de validación (solo calle/nro). Si no se envían, se toman
+    # del directorio de clientes (mismo teléfono y dirección).
+    validation_data: Optional[ValidationDataIn] = None
 
 # --- Esquema para la respuesta de la API (v4) ---
 # Definimos qué datos de validación mostramos (opcional pero limpio)
@@ -40,12 +64,23 @@ class ValidationDataOut(BaseModel):
     correct_ref1: Optional[str] = None
     correct_ref2: Optional[str] = None
     is_phone_valid: bool
+
+# --- ETA calculado de la parada (ver app/core/eta.py) ---
+class StopEtaOut(BaseModel):
+    arrival: datetime        # Llegada estimada
+    service_start: datetime  # Inicio de la entrega (tras esperar la ventana)
+    departure: datetime
+    wait_s: float            # Espera si se llega antes de la ventana
+    late: bool               # La entrega empieza después de 'time_window_end'
+    late_by_s: float
+    leg_km: float            # Tramo desde la parada anterior
     
 class StopOut(StopBase):
     id: str
     route_id: str
     status: str
     created_at: datetime
+    updated_at: Optional[datetime] = None
     
     # Devolvemos los datos de validación que se guardaron
     validation_data: ValidationDataOut
@@ -53,6 +88,9 @@ class StopOut(StopBase):
     # Estos campos los AÑADE el motor de validación
     validation_status: str
     validation_message: str
+
+    # Solo si la ruta tiene hora de salida (PUT /routes/{route_id}/eta)
+    eta: Optional[StopEtaOut] = None
     
     model_config = ConfigDict(
         from_attributes = True
@@ -63,5 +101,24 @@ class StopLocationUpdate(BaseModel):
     Schema para recibir la actualización de coordenadas
     desde el pin arrastrable del mapa.
     """
-    gps_lat_cliente: float
-    gps_lon_cliente: float
\ No newline at end of file
+    gps_lat_cliente: float = Field(..., ge=-90, le=90)
+    gps_lon_cliente: float = Field(..., ge=-180, le=180)
+
+class StopNearbyOut(StopOut):
+    """
+    Parada devuelta por la búsqueda por cercanía,
+    con la distancia (en metros) hasta el repartidor.
+    """
+    distance_m: float
+
+class StopChangesOut(BaseModel):
+    """
+    Respuesta de la sincronización incremental de una ruta.
+    El cliente debe guardar 'watermark' y enviarla como 'since'
+    en la próxima sincronización.
+    """
+    stops: List[StopOut]             # Paradas creadas o modificadas
+    deleted_stop_ids: List[str]      # Paradas borradas (tombstones)
+    watermark: datetime
+    # True => 'stops' trae la ruta COMPLETA: reemplazar los datos locales
+    full_resync: bool = False
\ No newline at end of file
@@ -14,4 +14,12 @@ class Token(BaseModel):
     al cliente (React) cuando el login sea exitoso.
     """
     access_token: str
-    token_type: str = "bearer"
\ No newline at end of file
+    token_type: str = "bearer"
+    # Token opaco para pedir nuevos access tokens sin re-enviar la contraseña
+    refresh_token: Optional[str] = None
+
+class RefreshTokenRequest(BaseModel):
+    """
+    Body de '/token/refresh' y '/token/revoke'.
+    """
+    refresh_token: str
\ No newline at end of file
@@ -0,0 +1,77 @@
+"""
+Servidor HTTP de prueba que imita un geocodificador inverso real.
+
+Responde con los barrios de BOUNDING_BOXES (o del archivo compacto de
+geodata si está configurado), con la misma API que espera
+HttpGeocodingProvider. Sirve para tests y benchmarks sin depender de
+un servicio externo.
+
+Uso:
+    uvicorn app.tools.geocoding_server:app --port 8001
+
+    # y en el .env de la API:
+    GEOCODER_PROVIDER=http
+    GEOCODER_URL=http://127.0.0.1:8001
+
+Variables opcionales (para simular un servicio lento o inestable):
+    GEOCODER_STUB_LATENCY_MS   demora agregada a cada request (default 0)
+    GEOCODER_STUB_FAILURE_RATE fracción de requests que responden 503 (default 0)
+"""
+import asyncio
+import os
+import random
+from typing import Annotated, List, Tuple
+
+from fastapi import FastAPI, HTTPException, Query
+from pydantic import BaseModel, Field
+
+from app.core.validator import _simulate_geocoding_neighborhood
+
+LATENCY_MS = float(os.getenv("GEOCODER_STUB_LATENCY_MS", "0"))
+FAILURE_RATE = float(os.getenv("GEOCODER_STUB_FAILURE_RATE", "0"))
+
+app = FastAPI(
+    title="Geocodificador de Prueba",
+    description="Stand-in local del servicio de geocodificación inversa.",
+    version="0.0.1"
+)
+
+
+Latitude = Annotated[float, Field(ge=-90, le=90)]
+Longitude = Annotated[float, Field(ge=-180, le=180)]
+
+
+class ReverseBatchIn(BaseModel):
+    # [[lat, lon], ...]: cada punto es un par exacto (si no, 422)
+    points: List[Tuple[Latitude, Longitude]] = Field(..., max_length=1000)
+
+
+class ReverseBatchOut(BaseModel):
+    neighborhoods: List[str]
+
+
+async def _simulate_service_conditions() -> None:
+    if LATENCY_MS:
+        await asyncio.sleep(LATENCY_MS / 1000)
+    if FAILURE_RATE and random.random() < FAILURE_RATE:
+        raise HTTPException(status_code=503, detail="Falla simulada")
+
+
+@app.post("/reverse/batch", response_model=ReverseBatchOut)
+async def reverse_batch(body: ReverseBatchIn):
+    await _simulate_service_conditions()
+    return {
+        "neighborhoods": [
+            _simulate_geocoding_neighborhood(lat, lon)
+            for lat, lon in body.points
+        ]
+    }
+
+
+@app.get("/reverse")
+async def reverse(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+):
+    await _simulate_service_conditions()
+    return {"neighborhood": _simulate_geocoding_neighborhood(lat, lon)}
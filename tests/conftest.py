@@ -0,0 +1,6 @@
+import os
+
+# 'settings' exige estas variables al importarse (los tests no usan la BBDD)
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB_NAME", "test")
+os.environ.setdefault("SECRET_KEY", "test-secret")
\ No newline at end of file
@@ -0,0 +1,161 @@
+"""
+Colección de MongoDB en memoria para los tests (sin servidor).
+Cubre solo lo que usa la app: igualdad, $lt/$lte/$gt/$gte/$in/$ne,
+$set/$inc/$setOnInsert, upserts y 'sort' por varios campos.
+"""
+import copy
+from types import SimpleNamespace
+
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, InsertOne, UpdateMany, UpdateOne
+
+_OPERATORS = {
+    "$lt": lambda value, arg: value is not None and value < arg,
+    "$lte": lambda value, arg: value is not None and value <= arg,
+    "$gt": lambda value, arg: value is not None and value > arg,
+    "$gte": lambda value, arg: value is not None and value >= arg,
+    "$in": lambda value, arg: value in arg,
+    "$nin": lambda value, arg: value not in arg,
+    "$ne": lambda value, arg: value != arg,
+    "$exists": lambda value, arg: (value is not None) == arg,
+}
+
+
+def matches(doc, query) -> bool:
+    for field, expected in query.items():
+        value = doc.get(field)
+        if isinstance(expected, dict) and expected and all(key.startswith("$") for key in expected):
+            if not all(_OPERATORS[op](value, arg) for op, arg in expected.items()):
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+def _project(doc, projection):
+    if not projection:
+        return copy.deepcopy(doc)
+    fields = {key for key, include in projection.items() if include}
+    return copy.deepcopy({key: value for key, value in doc.items() if key in fields or key == "_id"})
+
+
+def _sorted(docs, sort):
+    for field, direction in reversed(sort or []):
+        docs = sorted(docs, key=lambda doc: doc.get(field), reverse=direction < 0)
+    return docs
+
+
+def _apply_update(doc, update, inserted: bool) -> None:
+    for field, value in update.get("$set", {}).items():
+        doc[field] = copy.deepcopy(value)
+    for field, value in update.get("$inc", {}).items():
+        doc[field] = doc.get(field, 0) + value
+    if inserted:
+        for field, value in update.get("$setOnInsert", {}).items():
+            doc[field] = copy.deepcopy(value)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def sort(self, sort, direction=None):
+        if isinstance(sort, str):
+            sort = [(sort, direction or 1)]
+        self._docs = _sorted(self._docs, sort)
+        return self
+
+    async def to_list(self, length=None):
+        return self._docs if length is None else self._docs[:length]
+
+    def __aiter__(self):
+        self._iter = iter(self._docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = [copy.deepcopy(doc) for doc in docs]
+        self.writes = 0
+
+    # --- Lecturas ---
+
+    async def find_one(self, query=None, projection=None, sort=None):
+        found = _sorted([doc for doc in self.docs if matches(doc, query or {})], sort)
+        return _project(found[0], projection) if found else None
+
+    def find(self, query=None, projection=None, **kwargs):
+        return FakeCursor([_project(doc, projection) for doc in self.docs if matches(doc, query or {})])
+
+    async def count_documents(self, query):
+        return sum(1 for doc in self.docs if matches(doc, query))
+
+    # --- Escrituras ---
+
+    async def insert_one(self, doc):
+        doc.setdefault("_id", ObjectId())
+        self.docs.append(copy.deepcopy(doc))
+        self.writes += 1
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    async def insert_many(self, docs, ordered=True):
+        ids = [(await self.insert_one(doc)).inserted_id for doc in docs]
+        return SimpleNamespace(inserted_ids=ids)
+
+    async def update_one(self, query, update, upsert=False):
+        return self._update(query, update, upsert, many=False)
+
+    async def update_many(self, query, update, upsert=False):
+        return self._update(query, update, upsert, many=True)
+
+    async def find_one_and_update(self, query, update, projection=None):
+        for doc in self.docs:
+            if matches(doc, query):
+                before = _project(doc, projection)
+                _apply_update(doc, update, inserted=False)
+                self.writes += 1
+                return before
+        return None
+
+    async def delete_many(self, query):
+        before = len(self.docs)
+        self.docs = [doc for doc in self.docs if not matches(doc, query)]
+        return SimpleNamespace(deleted_count=before - len(self.docs))
+
+    async def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            if isinstance(operation, (UpdateOne, UpdateMany)):
+                self._update(
+                    operation._filter, operation._doc, operation._upsert,
+                    many=isinstance(operation, UpdateMany),
+                )
+            elif isinstance(operation, InsertOne):
+                await self.insert_one(operation._doc)
+            elif isinstance(operation, (DeleteOne, DeleteMany)):
+                await self.delete_many(operation._filter)
+            else:
+                raise NotImplementedError(type(operation).__name__)
+        return SimpleNamespace(acknowledged=True)
+
+    def _update(self, query, update, upsert, many):
+        modified = 0
+        for doc in self.docs:
+            if matches(doc, query):
+                _apply_update(doc, update, inserted=False)
+                modified += 1
+                if not many:
+                    break
+        upserted_id = None
+        if not modified and upsert:
+            doc = {field: value for field, value in query.items() if not isinstance(value, dict)}
+            doc["_id"] = upserted_id = ObjectId()
+            _apply_update(doc, update, inserted=True)
+            self.docs.append(doc)
+        self.writes += 1
+        return SimpleNamespace(matched_count=modified, modified_count=modified, upserted_id=upserted_id)
\ No newline at end of file
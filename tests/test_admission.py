@@ -0,0 +1,93 @@
+import asyncio
+import json
+
+from app.core.admission import AdmissionClass, AdmissionController, AdmissionMiddleware
+
+
+def _controller(concurrency=1, max_queue=1, queue_timeout=0.05):
+    controller = AdmissionController()
+    controller.enabled = True
+    controller.classes["read"] = AdmissionClass("read", concurrency, max_queue, queue_timeout)
+    return controller
+
+
+def _slow_app(seconds: float):
+    async def app(scope, receive, send):
+        await asyncio.sleep(seconds)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+    return app
+
+
+async def _request(app, path="/routes/"):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    await app({"type": "http", "method": "GET", "path": path, "headers": []}, receive, send)
+    return messages
+
+
+def _status(messages):
+    return messages[0]["status"]
+
+
+def test_queue_timeout_returns_503_with_retry_after():
+    controller = _controller(concurrency=1, max_queue=5, queue_timeout=0.05)
+    app = AdmissionMiddleware(_slow_app(0.3), controller)
+
+    async def scenario():
+        return await asyncio.gather(_request(app), _request(app))
+
+    first, second = asyncio.run(scenario())
+    assert _status(first) == 200
+    # La segunda esperó en la fila más que el deadline
+    assert _status(second) == 503
+    headers = dict(second[0]["headers"])
+    assert headers[b"retry-after"] == str(controller.retry_after).encode()
+    assert "sobrecargado" in json.loads(second[1]["body"])["detail"]
+
+    stats = controller.classes["read"].stats()
+    assert stats["shed_timeout"] == 1
+    assert stats["queued"] == 0
+    assert stats["in_flight"] == 0
+
+
+def test_queued_request_is_admitted_before_the_deadline():
+    controller = _controller(concurrency=1, max_queue=5, queue_timeout=1.0)
+    app = AdmissionMiddleware(_slow_app(0.05), controller)
+
+    async def scenario():
+        return await asyncio.gather(*(_request(app) for _ in range(3)))
+
+    assert [_status(messages) for messages in asyncio.run(scenario())] == [200, 200, 200]
+    assert controller.classes["read"].stats()["admitted"] == 3
+
+
+def test_full_queue_is_shed_immediately():
+    controller = _controller(concurrency=1, max_queue=1, queue_timeout=1.0)
+    app = AdmissionMiddleware(_slow_app(0.1), controller)
+
+    async def scenario():
+        return await asyncio.gather(*(_request(app) for _ in range(4)))
+
+    statuses = [_status(messages) for messages in asyncio.run(scenario())]
+    assert sorted(statuses) == [200, 200, 503, 503]
+    assert controller.classes["read"].stats()["shed_queue_full"] == 2
+
+
+def test_metrics_and_docs_are_exempt():
+    controller = _controller(concurrency=1, max_queue=0, queue_timeout=0.01)
+    app = AdmissionMiddleware(_slow_app(0.05), controller)
+
+    async def scenario():
+        return await asyncio.gather(*(_request(app, "/metrics/admission") for _ in range(3)))
+
+    assert [_status(messages) for messages in asyncio.run(scenario())] == [200, 200, 200]
+    assert controller.classify("POST", "/token") == "auth"
+    assert controller.classify("DELETE", "/routes/1") == "write"
+    assert controller.classify("OPTIONS", "/routes/") is None
\ No newline at end of file
@@ -0,0 +1,106 @@
+from datetime import datetime, timezone
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+from app.core import security
+from app.core.security import get_password_hash
+from app.main import app
+from app.routes import auth_routes
+from fake_mongo import FakeCollection
+
+PASSWORD = "secreta-123"
+
+
+@pytest.fixture
+def users(monkeypatch):
+    collection = FakeCollection([{
+        "_id": ObjectId(),
+        "email": "ana@example.com",
+        "full_name": "Ana",
+        "role": "driver",
+        "is_active": True,
+        "hashed_password": get_password_hash(PASSWORD),
+        "created_at": datetime.now(timezone.utc),
+    }])
+    monkeypatch.setattr(auth_routes, "collection_user", collection)
+    monkeypatch.setattr(security, "collection_user", collection)
+    return collection
+
+
+@pytest.fixture
+def refresh_tokens(monkeypatch):
+    collection = FakeCollection()
+    monkeypatch.setattr(security, "collection_refresh_token", collection)
+    return collection
+
+
+@pytest.fixture
+def client(users, refresh_tokens, monkeypatch):
+    monkeypatch.setattr(auth_routes.login_throttle, "enabled", False)
+    return TestClient(app)
+
+
+def _login(client):
+    return client.post("/token", data={"username": "ana@example.com", "password": PASSWORD})
+
+
+def _deactivate(users):
+    users.docs[0]["is_active"] = False
+
+
+def test_refresh_rotates_token(client, refresh_tokens):
+    first = _login(client).json()["refresh_token"]
+
+    response = client.post("/token/refresh", json={"refresh_token": first})
+    assert response.status_code == 200
+    second = response.json()["refresh_token"]
+    assert second != first
+
+    reasons = {doc["revoked_reason"] for doc in refresh_tokens.docs if doc["revoked"]}
+    assert reasons == {"rotated"}
+
+
+def test_reused_refresh_token_revokes_family(client, refresh_tokens):
+    first = _login(client).json()["refresh_token"]
+    second = client.post("/token/refresh", json={"refresh_token": first}).json()["refresh_token"]
+
+    # El token viejo se vuelve a presentar (¿robado?): 401 y se revoca toda la familia
+    assert client.post("/token/refresh", json={"refresh_token": first}).status_code == 401
+    assert all(doc["revoked"] for doc in refresh_tokens.docs)
+    assert any(doc.get("revoked_reason") == "reused" for doc in refresh_tokens.docs)
+
+    # El último token emitido tampoco sirve
+    assert client.post("/token/refresh", json={"refresh_token": second}).status_code == 401
+
+
+def test_inactive_user_cannot_login(client, users, refresh_tokens):
+    _deactivate(users)
+    response = _login(client)
+    assert response.status_code == 403
+    assert refresh_tokens.docs == []
+
+
+def test_wrong_password_is_401(client):
+    response = client.post("/token", data={"username": "ana@example.com", "password": "x"})
+    assert response.status_code == 401
+
+
+def test_inactive_user_cannot_refresh(client, users, refresh_tokens):
+    tokens = _login(client).json()
+    _login(client)  # otra sesión del mismo usuario
+    _deactivate(users)
+
+    response = client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+    assert all(doc["revoked"] for doc in refresh_tokens.docs)
+
+
+def test_inactive_user_access_token_is_rejected(client, users):
+    access_token = _login(client).json()["access_token"]
+    headers = {"Authorization": f"Bearer {access_token}"}
+    assert client.get("/users/me", headers=headers).status_code == 200
+
+    _deactivate(users)
+    assert client.get("/users/me", headers=headers).status_code == 401
\ No newline at end of file
@@ -0,0 +1,172 @@
+import gzip
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core import compression
+from app.core.compression import (
+    CompressionMiddleware,
+    EncodingStats,
+    NegotiatedResponse,
+    choose_encoding,
+    wants_msgpack,
+)
+
+BIG_JSON = [{"validation_message": "Conflicto de barrio", "i": i} for i in range(200)]
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    fresh = EncodingStats()
+    monkeypatch.setattr(compression, "compression_stats", fresh)
+    return fresh
+
+
+@pytest.fixture
+def client(stats):
+    app = FastAPI(default_response_class=NegotiatedResponse)
+
+    @app.get("/big")
+    def big():
+        return BIG_JSON
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/random")
+    def random_bytes():
+        # Casi no se comprime
+        return Response(os.urandom(8192), media_type="text/plain")
+
+    @app.get("/image")
+    def image():
+        return Response(b"\x89PNG" + b"\x00" * 4096, media_type="image/png")
+
+    @app.get("/stream")
+    def stream():
+        async def chunks():
+            for i in range(50):
+                yield (f"linea {i}," * 100 + "\n").encode()
+        return StreamingResponse(chunks(), media_type="text/csv")
+
+    app.add_middleware(CompressionMiddleware)
+    # Sin descompresión automática del cliente: vemos los bytes reales
+    return TestClient(app)
+
+
+def _get(client, path, accept_encoding, **headers):
+    return client.get(path, headers={"Accept-Encoding": accept_encoding, **headers})
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("br", "br"),
+    ("gzip", "gzip"),
+    ("gzip, br", "br"),
+    ("br;q=0.1, gzip", "gzip"),
+    ("gzip;q=0.5, br;q=0.4", "gzip"),
+    ("*", "br"),
+    ("gzip;q=0, *", "br"),
+    ("br;q=0, gzip;q=0, *", None),
+    ("br;q=0, *;q=0.5", "gzip"),
+    ("*;q=0", None),
+    ("identity", None),
+    ("gzip;q=0.5, identity", None),
+    ("", None),
+    ("deflate", None),
+])
+def test_choose_encoding_honours_q_values(header, expected):
+    assert choose_encoding(header) == expected
+
+
+def test_choose_encoding_without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert choose_encoding("br") is None
+    assert choose_encoding("br, gzip;q=0.5") == "gzip"
+    assert choose_encoding("gzip;q=0, *") is None
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("application/msgpack", True),
+    ("application/json, application/msgpack;q=0.1", False),
+    ("application/msgpack, application/json;q=0.5", True),
+    ("*/*, application/msgpack", True),
+    ("application/json", False),
+    ("application/msgpack;q=0", False),
+])
+def test_wants_msgpack(accept, expected):
+    assert wants_msgpack(accept) is expected
+
+
+def test_big_response_is_compressed(client, stats):
+    response = _get(client, "/big", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < 2000
+    assert stats.snapshot()["/big"]["encoded"] == 1
+
+    response = _get(client, "/big", "br")
+    assert response.headers["content-encoding"] == "br"
+    assert response.json() == BIG_JSON
+
+
+@pytest.mark.parametrize("path, accept_encoding", [
+    ("/big", "identity"),   # el cliente no acepta compresión
+    ("/big", ""),
+    ("/small", "gzip"),     # por debajo del tamaño mínimo
+])
+def test_passthrough_responses_still_vary(client, path, accept_encoding):
+    response = _get(client, path, accept_encoding)
+    assert "content-encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["vary"]
+
+
+def test_not_paying_off_still_varies(client, stats, monkeypatch):
+    monkeypatch.setattr(compression.settings, "COMPRESSION_MIN_SAMPLES", 2)
+    monkeypatch.setattr(compression.settings, "COMPRESSION_RESAMPLE_EVERY", 1000)
+    for _ in range(2):
+        assert _get(client, "/random", "gzip").headers["content-encoding"] == "gzip"
+
+    response = _get(client, "/random", "gzip")
+    assert "content-encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert stats.snapshot()["/random"]["skipped"] == 1
+
+
+def test_incompressible_types_are_untouched(client):
+    response = _get(client, "/image", "gzip")
+    assert "content-encoding" not in response.headers
+    assert "vary" not in response.headers
+    assert len(response.content) == 4100
+
+
+def test_streaming_response_is_compressed_chunk_by_chunk(client):
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        raw = b"".join(response.iter_raw())
+    assert gzip.decompress(raw).decode().count("\n") == 50
+
+
+def test_msgpack_varies_on_both_headers(client):
+    response = _get(client, "/big", "br", Accept="application/msgpack")
+    assert response.headers["content-type"] == "application/msgpack"
+    assert response.headers["vary"] == "Accept, Accept-Encoding"
+
+
+def test_decayed_ratio_follows_recent_responses(monkeypatch):
+    monkeypatch.setattr(compression.settings, "COMPRESSION_MIN_SAMPLES", 1)
+    monkeypatch.setattr(compression.settings, "COMPRESSION_RESAMPLE_EVERY", 1000)
+    stats = EncodingStats()
+    for _ in range(49):
+        stats.record("/x", 1000, 990, 0.001)
+    assert not stats.pays_off("/x")
+
+    # Las respuestas cambian: el ratio reciente baja enseguida
+    for _ in range(10):
+        stats.record("/x", 1000, 100, 0.001)
+    assert stats.ratio("/x") < compression.settings.COMPRESSION_MAX_RATIO
+    assert stats.pays_off("/x")
\ No newline at end of file
@@ -0,0 +1,176 @@
+import asyncio
+
+import pytest
+from pymongo.errors import BulkWriteError, OperationFailure
+
+from app.core import customer_directory
+from app.core.customer_directory import (
+    address_hash,
+    customer_key,
+    normalize_address,
+    remember_customers,
+    resolve_validation_data,
+)
+from app.core.validator import _normalize_phone_ar
+from app.schemas.stop_schema import StopCreate
+from fake_mongo import FakeCollection
+
+
+# --- Normalización ---
+
+@pytest.mark.parametrize("phone, expected", [
+    # Celulares: 9 internacional o 15 local
+    ("+54 9 221 456-7890", "+5492214567890"),
+    ("5492214567890", "+5492214567890"),
+    ("9 221 4567890", "+5492214567890"),
+    ("0221 15 456-7890", "+5492214567890"),
+    ("221 15 4567890", "+5492214567890"),
+    ("011 15 1234-5678", "+5491112345678"),
+    ("(0291) 15 412-3456", "+5492914123456"),
+    ("+54 221 15 4567890", "+5492214567890"),
+    # Fijos: sin 9 ni 15
+    ("221 456-7890", "+542214567890"),
+    ("(0221) 456-7890", "+542214567890"),
+    ("+54 221 4567890", "+542214567890"),
+    ("011 4321-1234", "+541143211234"),
+    # Inválidos
+    ("", None),
+    ("456-7890", None),
+    ("221 456 78901 2", None),
+    ("abc", None),
+])
+def test_normalize_phone(phone, expected):
+    assert _normalize_phone_ar(phone) == expected
+
+
+def test_mobile_and_landline_are_different_customers():
+    mobile = customer_key("+54 9 221 456-7890", "Calle 7", "1234")
+    landline = customer_key("221 456-7890", "Calle 7", "1234")
+    assert mobile != landline
+    assert customer_key("0221 15 456-7890", "calle 7", "1234") == mobile
+
+
+@pytest.mark.parametrize("street, number, expected", [
+    ("Calle 7", "N° 1234", "calle 7 1234"),
+    ("calle 7", "nº 1.234", "calle 7 1234"),
+    ("Avenida   Belgrano", "Nro. 56", "avenida belgrano 56"),
+    ("Diagonal 74 (esq. 9)", "1,500", "diagonal 74 esq 9 1500"),
+    ("José Hernández", "número 12", "jose hernandez 12"),
+    ("Calle 7", "1234 Dpto B", "calle 7 1234 dpto b"),
+])
+def test_normalize_address(street, number, expected):
+    assert normalize_address(street, number) == expected
+
+
+def test_address_hash_ignores_formatting():
+    assert address_hash("Calle 7", "N° 1234") == address_hash("calle 7", "nº 1.234")
+    assert address_hash("Calle 7", "1234") != address_hash("Calle 7", "1243")
+
+
+def test_invalid_phone_has_no_key():
+    assert customer_key("123", "Calle 7", "1234") is None
+
+
+# --- Resolver / aprender ---
+
+def _stop(phone="221 15 4567890", number="1234", validation_data=None, name="Ana"):
+    return StopCreate(
+        customer_name=name,
+        order_in_route=1,
+        neighborhood_cliente="Centro",
+        phone_cliente=phone,
+        gps_lat_cliente=-34.92,
+        gps_lon_cliente=-57.95,
+        address_street_cliente="Calle 7",
+        address_number_cliente=number,
+        validation_data=validation_data,
+    )
+
+
+TRUTH = {"correct_street": "Calle 7", "correct_number": "1234"}
+
+
+@pytest.fixture
+def customers(monkeypatch):
+    collection = FakeCollection()
+    monkeypatch.setattr(customer_directory, "collection_customer", collection)
+    return collection
+
+
+def test_resolve_does_not_write(customers):
+    resolved = asyncio.run(resolve_validation_data([
+        _stop(validation_data=TRUTH),
+        _stop(),                    # mismo cliente, sin 'verdad': la toma del lote
+        _stop(phone="221 15 9999999"),
+    ]))
+    assert resolved[0]["correct_number"] == "1234"
+    assert resolved[1]["correct_number"] == "1234"
+    assert resolved[2] is None
+    assert customers.docs == []
+
+
+def test_remember_then_resolve_from_directory(customers):
+    stops = [_stop(validation_data=TRUTH), _stop(validation_data=TRUTH), _stop(phone="221 15 9999999")]
+    asyncio.run(remember_customers(stops, [TRUTH, TRUTH, None]))
+
+    assert len(customers.docs) == 1
+    entry = customers.docs[0]
+    assert entry["phone_e164"] == "+5492214567890"
+    assert entry["times_seen"] == 2
+
+    # Próxima parada del cliente, escrita de otra forma y sin 'verdad'
+    later = _stop(phone="+54 9 221 456-7890", number="N° 1.234")
+    resolved = asyncio.run(resolve_validation_data([later]))
+    assert resolved[0]["correct_street"] == "Calle 7"
+
+    asyncio.run(remember_customers([later], resolved))
+    assert len(customers.docs) == 1
+    assert customers.docs[0]["times_seen"] == 3
+
+
+def test_unknown_customer_without_truth_is_not_created(customers):
+    asyncio.run(remember_customers([_stop()], [None]))
+    assert customers.docs == []
+
+
+class RacingCustomers(FakeCollection):
+    """Otro worker crea al mismo cliente justo antes: el upsert choca (E11000)."""
+
+    def __init__(self, error_code=11000):
+        super().__init__()
+        self.error_code = error_code
+        self.calls = 0
+
+    async def bulk_write(self, operations, ordered=True):
+        self.calls += 1
+        if self.calls == 1:
+            concurrent = operations[0]._filter
+            self.docs.append({**concurrent, "_id": 1, "times_seen": 1, "validation_data": TRUTH})
+            raise BulkWriteError({"writeErrors": [
+                {"index": 0, "code": self.error_code, "errmsg": "E11000 duplicate key"},
+            ]})
+        return await super().bulk_write(operations, ordered)
+
+
+def test_duplicate_key_race_is_retried_as_update(monkeypatch):
+    customers = RacingCustomers()
+    monkeypatch.setattr(customer_directory, "collection_customer", customers)
+
+    asyncio.run(remember_customers([_stop(validation_data=TRUTH)], [TRUTH]))
+    assert customers.calls == 2
+    assert len(customers.docs) == 1
+    assert customers.docs[0]["times_seen"] == 2
+
+
+def test_other_directory_errors_do_not_propagate(monkeypatch):
+    customers = RacingCustomers(error_code=121)
+    monkeypatch.setattr(customer_directory, "collection_customer", customers)
+    asyncio.run(remember_customers([_stop(validation_data=TRUTH)], [TRUTH]))
+    assert customers.calls == 1
+
+    class Down(FakeCollection):
+        async def bulk_write(self, operations, ordered=True):
+            raise OperationFailure("no primary")
+
+    monkeypatch.setattr(customer_directory, "collection_customer", Down())
+    asyncio.run(remember_customers([_stop(validation_data=TRUTH)], [TRUTH]))
\ No newline at end of file
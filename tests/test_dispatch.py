@@ -0,0 +1,68 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from app.core.dispatch import balanced_kmeans, plan_routes
+
+
+def _two_dense_groups(n: int, seed: int = 0):
+    """Paradas concentradas en dos puntos de la ciudad (caso sesgado)."""
+    rng = np.random.default_rng(seed)
+    first = n // 2
+    lat = np.concatenate([
+        -34.92 + rng.normal(0, 0.0005, first),
+        -34.85 + rng.normal(0, 0.0005, n - first),
+    ])
+    lon = np.concatenate([
+        -57.95 + rng.normal(0, 0.0005, first),
+        -58.05 + rng.normal(0, 0.0005, n - first),
+    ])
+    return lat.tolist(), lon.tolist()
+
+
+def _uniform(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return (-34.95 + rng.random(n) * 0.1).tolist(), (-58.0 + rng.random(n) * 0.1).tolist()
+
+
+def _assert_balanced(routes, n_stops: int, n_drivers: int):
+    sizes = [len(route) for route in routes]
+    assert len(routes) == n_drivers
+    assert sorted(index for route in routes for index in route) == list(range(n_stops))
+    assert max(sizes) - min(sizes) <= 1
+    if n_stops >= n_drivers:
+        assert min(sizes) > 0
+
+
+@pytest.mark.parametrize("n_stops, n_drivers", [(53, 10), (47, 9), (25, 8), (10, 4), (100, 7)])
+def test_skewed_pools_are_balanced(n_stops, n_drivers):
+    lat, lon = _two_dense_groups(n_stops)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)
+        routes = plan_routes(lat, lon, n_drivers)
+    _assert_balanced(routes, n_stops, n_drivers)
+
+
+@pytest.mark.parametrize("n_drivers", range(1, 9))
+def test_small_pools_are_balanced(n_drivers):
+    for n_stops in range(n_drivers, 3 * n_drivers + 2):
+        lat, lon = _uniform(n_stops, seed=n_stops)
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", RuntimeWarning)
+            routes = plan_routes(lat, lon, n_drivers)
+        _assert_balanced(routes, n_stops, n_drivers)
+
+
+def test_more_drivers_than_stops_leaves_extra_routes_empty():
+    lat, lon = _uniform(3)
+    routes = plan_routes(lat, lon, 5)
+    assert sorted(len(route) for route in routes) == [0, 0, 1, 1, 1]
+
+
+def test_identical_points_do_not_produce_nan_centers():
+    points = np.zeros((12, 2))
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)
+        labels = balanced_kmeans(points, 5)
+    assert sorted(np.bincount(labels, minlength=5).tolist()) == [2, 2, 2, 3, 3]
\ No newline at end of file
@@ -0,0 +1,86 @@
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+from pymongo.errors import BulkWriteError
+
+from app.core import customer_directory
+from app.core.security import get_current_user
+from app.main import app
+from app.routes import route_routes
+from fake_mongo import FakeCollection
+
+DRIVERS = [ObjectId(), ObjectId(), ObjectId()]
+
+
+class FailingStops(FakeCollection):
+    """Inserta la mitad de las paradas y luego falla (como un BulkWriteError real)."""
+
+    async def insert_many(self, docs, ordered=True):
+        for doc in docs[: len(docs) // 2]:
+            await self.insert_one(doc)
+        raise BulkWriteError({"writeErrors": [{"index": len(docs) // 2, "code": 121}]})
+
+
+def _payload(n_stops=12):
+    return {
+        "name_prefix": "Martes",
+        "driver_ids": [str(driver_id) for driver_id in DRIVERS],
+        "stops": [
+            {
+                "customer_name": f"Cliente {i}",
+                "neighborhood_cliente": "Centro",
+                "phone_cliente": f"221555{i:04d}",
+                "gps_lat_cliente": -34.92 + i * 0.001,
+                "gps_lon_cliente": -57.95 - (i % 3) * 0.01,
+                "address_street_cliente": "Calle 7",
+                "address_number_cliente": str(1000 + i),
+                "validation_data": {"correct_street": "Calle 7", "correct_number": str(1000 + i)},
+            }
+            for i in range(n_stops)
+        ],
+    }
+
+
+@pytest.fixture
+def collections(monkeypatch):
+    collections = {
+        "users": FakeCollection([{"_id": driver_id, "role": "repartidor"} for driver_id in DRIVERS]),
+        "routes": FakeCollection(),
+        "stops": FakeCollection(),
+        "customers": FakeCollection(),
+    }
+    monkeypatch.setattr(route_routes, "collection_user", collections["users"])
+    monkeypatch.setattr(route_routes, "collection_route", collections["routes"])
+    monkeypatch.setattr(route_routes, "collection_stop", collections["stops"])
+    monkeypatch.setattr(customer_directory, "collection_customer", collections["customers"])
+    app.dependency_overrides[get_current_user] = lambda: {"_id": ObjectId(), "role": "admin"}
+    yield collections
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+def test_dispatch_creates_routes_and_stops(collections):
+    response = TestClient(app).post("/routes/dispatch", json=_payload())
+    assert response.status_code == 201
+
+    routes = response.json()
+    assert sorted(route["stop_count"] for route in routes) == [4, 4, 4]
+    assert {route["owner_id"] for route in routes} == {str(driver_id) for driver_id in DRIVERS}
+    assert len(collections["routes"].docs) == 3
+    assert len(collections["stops"].docs) == 12
+    route_ids = {route["_id"] for route in collections["routes"].docs}
+    assert {stop["route_id"] for stop in collections["stops"].docs} == route_ids
+    # El directorio aprende de los clientes despachados
+    assert len(collections["customers"].docs) == 12
+
+
+def test_failed_stop_insert_removes_everything(collections, monkeypatch):
+    failing = FailingStops()
+    monkeypatch.setattr(route_routes, "collection_stop", failing)
+
+    response = TestClient(app).post("/routes/dispatch", json=_payload())
+    assert response.status_code == 500
+    # Ni rutas huérfanas ni paradas a medio insertar
+    assert collections["routes"].docs == []
+    assert failing.docs == []
+    # ... ni clientes aprendidos de un despacho que no existe
+    assert collections["customers"].docs == []
\ No newline at end of file
@@ -0,0 +1,233 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from app.config.settings import settings
+from app.core import eta
+from app.core.eta import compute_schedule, haversine_km, recompute_route_etas, route_eta_report
+from app.core.security import get_current_user
+from app.main import app
+from app.routes import stop_routes
+from app.schemas.stop_schema import StopCreate
+from fake_mongo import FakeCollection
+
+START = datetime(2026, 3, 2, 8, 0, tzinfo=timezone.utc)
+
+
+def _loop_schedule(lat, lon, window_start, window_end, start_time, previous_point=None):
+    """Referencia: el cálculo parada por parada, con un bucle común."""
+    service = settings.ETA_SERVICE_MINUTES * 60
+    rows = []
+    clock, previous = start_time, previous_point
+    for i in range(len(lat)):
+        leg_km = 0.0
+        if previous is not None:
+            leg_km = float(haversine_km(previous[0], previous[1], lat[i], lon[i])) * settings.ETA_DETOUR_FACTOR
+        arrival = clock + leg_km / settings.ETA_SPEED_KMH * 3600
+        service_start = max(arrival, window_start[i])
+        rows.append({
+            "arrival": arrival,
+            "service_start": service_start,
+            "departure": service_start + service,
+            "wait_s": service_start - arrival,
+            "late_by_s": max(service_start - window_end[i], 0.0),
+        })
+        clock, previous = service_start + service, (lat[i], lon[i])
+    return rows
+
+
+@pytest.mark.parametrize("with_previous", [False, True])
+def test_schedule_matches_plain_loop(with_previous):
+    rng = np.random.default_rng(7)
+    n = 60
+    lat = (-34.92 + rng.normal(0, 0.02, n)).tolist()
+    lon = (-57.95 + rng.normal(0, 0.02, n)).tolist()
+    start = START.timestamp()
+
+    # Ventanas: algunas obligan a esperar, otras ya vencieron (llega tarde)
+    window_start = np.full(n, -np.inf)
+    window_end = np.full(n, np.inf)
+    for i in range(0, n, 5):
+        window_start[i] = start + i * 600 + 3600       # abre más tarde: espera
+    for i in range(2, n, 7):
+        window_end[i] = start + i * 60                  # cierra muy temprano: tarde
+    for i in range(3, n, 11):
+        window_start[i], window_end[i] = start + i * 400, start + i * 400 + 1800
+
+    previous = (-34.90, -57.93) if with_previous else None
+    schedule = compute_schedule(lat, lon, window_start, window_end, start, previous_point=previous)
+    expected = _loop_schedule(lat, lon, window_start, window_end, start, previous)
+
+    for key in ("arrival", "service_start", "departure", "wait_s", "late_by_s"):
+        np.testing.assert_allclose(schedule[key], [row[key] for row in expected], rtol=0, atol=1e-6)
+    assert schedule["wait_s"].max() > 0
+    assert schedule["late"].sum() > 0
+    assert list(schedule["late"]) == [row["late_by_s"] > 0 for row in expected]
+
+
+def test_waits_carry_over_to_later_stops():
+    start = START.timestamp()
+    schedule = compute_schedule(
+        [-34.92, -34.921],
+        [-57.95, -57.951],
+        np.array([start + 3600, -np.inf]),
+        np.array([np.inf, start + 3600]),
+        start,
+        service_seconds=300,
+    )
+    assert schedule["wait_s"][0] == pytest.approx(3600)
+    # La espera en la 1ª hace llegar tarde a la 2ª
+    assert schedule["late"][1]
+
+
+# --- Ventanas horarias (schema) ---
+
+def _stop_payload(**windows):
+    return dict(
+        customer_name="Ana",
+        order_in_route=1,
+        neighborhood_cliente="Centro",
+        phone_cliente="2214567890",
+        gps_lat_cliente=-34.92,
+        gps_lon_cliente=-57.95,
+        address_street_cliente="Calle 7",
+        address_number_cliente="1234",
+        **windows,
+    )
+
+
+def test_time_window_mixing_aware_and_naive():
+    # 10:00 en Argentina (-03:00) = 13:00 UTC; el fin "naive" se toma como UTC
+    stop = StopCreate(**_stop_payload(
+        time_window_start="2026-03-02T10:00:00-03:00",
+        time_window_end="2026-03-02T14:00:00",
+    ))
+    assert stop.time_window_end.tzinfo is None
+
+    with pytest.raises(ValidationError) as error:
+        StopCreate(**_stop_payload(
+            time_window_start="2026-03-02T10:00:00-03:00",
+            time_window_end="2026-03-02T12:00:00",
+        ))
+    assert "time_window_end" in str(error.value)
+
+
+def test_time_window_mixed_input_is_a_422_not_a_500(monkeypatch):
+    route_id = ObjectId()
+    monkeypatch.setattr(stop_routes, "collection_route", FakeCollection([{"_id": route_id}]))
+    app.dependency_overrides[get_current_user] = lambda: {"_id": ObjectId(), "role": "admin"}
+    try:
+        response = TestClient(app).post(f"/routes/{route_id}/stops", json=_stop_payload(
+            time_window_start="2026-03-02T10:00:00-03:00",
+            time_window_end="2026-03-02T12:00:00",
+            validation_data={"correct_street": "Calle 7", "correct_number": "1234"},
+        ))
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+    assert response.status_code == 422
+
+
+# --- Recalcular y guardar (BBDD en memoria) ---
+
+ROUTE_ID = ObjectId()
+
+
+def _route_stops(n=8):
+    rng = np.random.default_rng(3)
+    stops = []
+    for order in range(1, n + 1):
+        stops.append({
+            "_id": ObjectId(),
+            "route_id": ROUTE_ID,
+            "order_in_route": order,
+            "customer_name": f"Cliente {order}",
+            "gps_lat_cliente": float(-34.92 + rng.normal(0, 0.01)),
+            "gps_lon_cliente": float(-57.95 + rng.normal(0, 0.01)),
+            "time_window_start": None,
+            "time_window_end": None,
+        })
+    # La 6ª abre tarde: absorbe los cambios anteriores (espera)
+    stops[5]["time_window_start"] = (START + timedelta(hours=3)).replace(tzinfo=None)
+    return stops
+
+
+@pytest.fixture
+def stops_collection(monkeypatch):
+    collection = FakeCollection(_route_stops())
+    monkeypatch.setattr(eta, "collection_stop", collection)
+    return collection
+
+
+def _etas(collection):
+    return {doc["order_in_route"]: doc.get("eta") for doc in collection.docs}
+
+
+ROUTE = {"_id": ROUTE_ID, "eta_start_time": START}
+
+
+def test_full_recompute_writes_every_stop_once(stops_collection):
+    assert asyncio.run(recompute_route_etas(ROUTE)) == 8
+    assert all(_etas(stops_collection).values())
+    # Nada cambió: no se reescribe nada
+    assert asyncio.run(recompute_route_etas(ROUTE)) == 0
+
+
+def test_suffix_recompute_matches_full_recompute(stops_collection, monkeypatch):
+    asyncio.run(recompute_route_etas(ROUTE))
+    before = _etas(stops_collection)
+
+    # Se mueve la 3ª parada
+    moved = next(doc for doc in stops_collection.docs if doc["order_in_route"] == 3)
+    moved["gps_lat_cliente"] += 0.02
+    moved["gps_lon_cliente"] -= 0.02
+
+    updated = asyncio.run(recompute_route_etas(ROUTE, from_order=3))
+    after = _etas(stops_collection)
+
+    # Las anteriores no se tocan; la 3ª y las siguientes hasta la espera sí
+    assert after[1] == before[1] and after[2] == before[2]
+    assert after[3] != before[3]
+    # La espera de la 6ª absorbe el cambio: ella y las siguientes quedan igual
+    assert after[6]["service_start"] == before[6]["service_start"]
+    assert after[7] == before[7] and after[8] == before[8]
+    assert updated == 4  # paradas 3, 4, 5 y 6 (la 6ª cambia su llegada / espera)
+
+    # Mismo resultado que recalcular TODO desde cero
+    fresh = FakeCollection([{k: v for k, v in doc.items() if k != "eta"} for doc in stops_collection.docs])
+    monkeypatch.setattr(eta, "collection_stop", fresh)
+    asyncio.run(recompute_route_etas(ROUTE))
+    for order, value in _etas(fresh).items():
+        for key in ("arrival", "service_start", "departure"):
+            assert abs((value[key] - after[order][key]).total_seconds()) < 1e-3, (order, key)
+
+
+def test_suffix_without_previous_eta_falls_back_to_full(stops_collection):
+    # Nunca se calculó: se recalcula la ruta completa
+    assert asyncio.run(recompute_route_etas(ROUTE, from_order=4)) == 8
+
+
+def test_route_without_start_time_is_untouched(stops_collection):
+    assert asyncio.run(recompute_route_etas({"_id": ROUTE_ID})) == 0
+    assert not any(_etas(stops_collection).values())
+
+
+def test_report_persists_missing_etas_once(stops_collection):
+    report = asyncio.run(route_eta_report(ROUTE))
+    assert report["persisted"] is True
+    assert [item["order_in_route"] for item in report["stops"]] == list(range(1, 9))
+    writes = stops_collection.writes
+    assert writes > 0
+
+    # Segunda lectura: ya no escribe
+    asyncio.run(route_eta_report(ROUTE))
+    assert stops_collection.writes == writes
+
+    # Simulación con otra hora de salida: no se guarda nada
+    simulated = asyncio.run(route_eta_report(ROUTE, START + timedelta(hours=1)))
+    assert simulated["persisted"] is False
+    assert stops_collection.writes == writes
\ No newline at end of file
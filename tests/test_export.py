@@ -0,0 +1,133 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timezone
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+from app.core import exporter
+from app.core.security import get_current_user
+from app.main import app
+from app.routes import export_routes
+from fake_mongo import FakeCollection
+
+ROUTE_ID = ObjectId()
+OWNER_ID = ObjectId()
+
+
+def _stop(order, **overrides):
+    stop = {
+        "_id": ObjectId(),
+        "route_id": ROUTE_ID,
+        "order_in_route": order,
+        "customer_name": f"Cliente {order}",
+        "status": "pending",
+        "neighborhood_cliente": "Centro",
+        "phone_cliente": "221 555-1234",
+        "gps_lat_cliente": -34.92,
+        "gps_lon_cliente": -57.95,
+        "address_street_cliente": "Calle 7",
+        "address_number_cliente": str(1000 + order),
+        "address_ref1_cliente": "Portón verde",
+        "address_ref2_cliente": "",
+        "validation_data": {"correct_street": "Calle 7", "correct_number": str(1000 + order)},
+        "created_at": datetime(2026, 1, 1, tzinfo=timezone.utc),
+    }
+    stop.update(overrides)
+    return stop
+
+
+async def _fake_validate_stops(stops):
+    return [{**stop, "validation_status": "OK", "validation_message": "Sin conflictos"} for stop in stops]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(exporter, "validate_stops", _fake_validate_stops)
+    monkeypatch.setattr(export_routes, "collection_route", FakeCollection([
+        {"_id": ROUTE_ID, "owner_id": OWNER_ID, "created_at": datetime(2026, 1, 1)},
+    ]))
+    app.dependency_overrides[get_current_user] = lambda: {"_id": OWNER_ID, "role": "admin"}
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+def _use_stops(monkeypatch, stops):
+    monkeypatch.setattr(export_routes, "collection_stop", FakeCollection(stops))
+
+
+def _read_csv(content: bytes):
+    text = content.decode("utf-8")
+    assert text.startswith("﻿")
+    return list(csv.DictReader(io.StringIO(text[1:])))
+
+
+def test_csv_export_streams_every_stop_in_order(client, monkeypatch):
+    # Suficientes filas para que se envíen varios pedazos
+    stops = [_stop(order) for order in range(1500, 0, -1)]
+    _use_stops(monkeypatch, stops)
+
+    url = f"/routes/{ROUTE_ID}/export?format=csv"
+    with client.stream("GET", url, headers={"Accept-Encoding": "identity"}) as response:
+        assert response.status_code == 200
+        assert "attachment" in response.headers["content-disposition"]
+        chunks = list(response.iter_raw())
+    rows = _read_csv(b"".join(chunks))
+
+    assert len(rows) == 1500
+    assert [int(row["order_in_route"]) for row in rows] == list(range(1, 1501))
+    assert rows[0]["validation_status"] == "OK"
+    assert list(rows[0]) == exporter.CSV_COLUMNS
+
+
+def test_stream_csv_yields_bounded_chunks(monkeypatch):
+    monkeypatch.setattr(exporter, "validate_stops", _fake_validate_stops)
+    cursor = FakeCollection([_stop(order) for order in range(1, 2001)]).find({})
+
+    async def collect():
+        return [chunk async for chunk in exporter.stream_csv(cursor)]
+
+    chunks = asyncio.run(collect())
+    assert len(chunks) > 1
+    # Cada pedazo se envía apenas supera CHUNK_SIZE (nunca el archivo entero)
+    assert max(len(chunk) for chunk in chunks) < exporter.CHUNK_SIZE + 1024
+    assert len(_read_csv(b"".join(chunks))) == 2000
+
+
+def test_csv_export_escapes_formulas(client, monkeypatch):
+    _use_stops(monkeypatch, [_stop(
+        1,
+        customer_name='=HYPERLINK("http://evil.example","clic")',
+        address_ref1_cliente="+54 cmd|' /C calc'!A0",
+        address_ref2_cliente="@SUM(1+1)",
+        neighborhood_cliente="-2+3",
+        address_street_cliente="\t=1+1",
+        gps_lon_cliente=-57.95,
+    )])
+
+    response = client.get(f"/routes/{ROUTE_ID}/export?format=csv")
+    row = _read_csv(response.content)[0]
+
+    assert row["customer_name"] == '\'=HYPERLINK("http://evil.example","clic")'
+    assert row["address_ref1_cliente"].startswith("'+")
+    assert row["address_ref2_cliente"] == "'@SUM(1+1)"
+    assert row["neighborhood_cliente"] == "'-2+3"
+    assert row["address_street_cliente"] == "'\t=1+1"
+    # Los números no se tocan
+    assert row["gps_lon_cliente"] == "-57.95"
+    assert row["status"] == "pending"
+
+
+def test_gzip_geojson_export(client, monkeypatch):
+    _use_stops(monkeypatch, [_stop(2), _stop(1)])
+
+    response = client.get(f"/routes/{ROUTE_ID}/export?format=geojson&gzip=true")
+    assert response.headers["content-type"] == "application/gzip"
+    collection = json.loads(gzip.decompress(response.content))
+
+    assert [f["properties"]["order_in_route"] for f in collection["features"]] == [1, 2]
+    assert collection["features"][0]["geometry"]["coordinates"] == [-57.95, -34.92]
\ No newline at end of file
@@ -0,0 +1,193 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.geocoding import (
+    BoundingBoxProvider,
+    CircuitBreaker,
+    GeocodeCache,
+    HttpGeocodingProvider,
+)
+from app.core.validator import _simulate_geocoding_neighborhood
+from app.tools import geocoding_server
+
+CENTRO = (-34.915, -57.95)      # la plata (casco urbano)
+TOLOSA = (-34.89, -57.97)
+FUERA = (-30.0, -60.0)          # desconocido
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """El servidor de prueba, sin demora ni fallas (se cambian por test)."""
+    monkeypatch.setattr(geocoding_server, "LATENCY_MS", 0)
+    monkeypatch.setattr(geocoding_server, "FAILURE_RATE", 0)
+    return geocoding_server
+
+
+def _provider(batch_size=2, failure_threshold=2, reset_seconds=30.0, cache_size=100):
+    provider = HttpGeocodingProvider(
+        "http://geocoder",
+        fallback=BoundingBoxProvider(lambda lat, lon: "respaldo"),
+        timeout_seconds=2.0,
+        max_concurrency=4,
+        batch_size=batch_size,
+        breaker=CircuitBreaker(failure_threshold, reset_seconds),
+        cache=GeocodeCache(max_size=cache_size, precision=4),
+    )
+    # Las requests van directo a la app ASGI del servidor de prueba
+    provider._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=geocoding_server.app))
+    return provider
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+# --- Servidor de prueba ---
+
+def test_stub_rejects_points_that_are_not_lat_lon_pairs(stub):
+    client = TestClient(stub.app)
+    assert client.post("/reverse/batch", json={"points": [[-34.9]]}).status_code == 422
+    assert client.post("/reverse/batch", json={"points": [[-34.9, -57.9, 1]]}).status_code == 422
+    assert client.post("/reverse/batch", json={"points": [[-134.9, -57.9]]}).status_code == 422
+
+    response = client.post("/reverse/batch", json={"points": [list(CENTRO), list(FUERA)]})
+    assert response.json() == {"neighborhoods": ["la plata (casco urbano)", "desconocido"]}
+
+
+# --- Proveedor HTTP ---
+
+def test_http_provider_matches_local_lookup(stub):
+    provider = _provider(batch_size=2)
+    points = [CENTRO, TOLOSA, FUERA, CENTRO, TOLOSA]
+
+    names = _run(provider.reverse_batch(points))
+    assert names == [_simulate_geocoding_neighborhood(lat, lon) for lat, lon in points]
+    # 3 puntos distintos en lotes de 2 => 2 requests
+    assert provider.requests == 2
+    assert provider.fallbacks == 0
+
+
+def test_http_provider_sends_original_coordinates(stub, monkeypatch):
+    received = []
+    original = geocoding_server._simulate_geocoding_neighborhood
+
+    def spy(lat, lon):
+        received.append((lat, lon))
+        return original(lat, lon)
+
+    monkeypatch.setattr(geocoding_server, "_simulate_geocoding_neighborhood", spy)
+    _run(_provider().reverse_batch([(-34.900004, -57.960004)]))
+    assert received == [(-34.900004, -57.960004)]
+
+
+def test_cache_serves_repeated_points_without_requests(stub):
+    provider = _provider()
+    _run(provider.reverse_batch([CENTRO, TOLOSA]))
+    requests = provider.requests
+
+    # Mismo edificio (difiere en el 5º decimal): acierto de caché
+    near_centro = (CENTRO[0] + 0.00001, CENTRO[1])
+    assert _run(provider.reverse_batch([near_centro, TOLOSA])) == [
+        "la plata (casco urbano)", "tolosa",
+    ]
+    assert provider.requests == requests
+    assert provider.cache.hits == 2
+
+
+def test_cache_returns_the_neighbour_answer_near_a_border(stub):
+    """Límite documentado: dentro de una celda manda el primer punto consultado."""
+    provider = _provider()
+    # Límite centro / tolosa en lat -34.90: mismos 4 decimales, distinto barrio
+    inside_centro = (-34.90004, -57.96)
+    inside_tolosa = (-34.89996, -57.96)
+    assert provider.cache.key(*inside_centro) == provider.cache.key(*inside_tolosa)
+
+    first = _run(provider.reverse_batch([inside_tolosa]))
+    second = _run(provider.reverse_batch([inside_centro]))
+    assert second == first
+    assert _simulate_geocoding_neighborhood(*inside_centro) != first[0]
+
+
+# --- Circuit breaker ---
+
+def test_breaker_opens_and_falls_back(stub, monkeypatch):
+    monkeypatch.setattr(stub, "FAILURE_RATE", 1.0)
+    provider = _provider(batch_size=10, failure_threshold=2)
+
+    for _ in range(2):
+        assert _run(provider.reverse_batch([CENTRO])) == ["respaldo"]
+    assert provider.breaker.state == "open"
+    assert provider.requests == 2
+
+    # Abierto: ni siquiera se intenta
+    assert _run(provider.reverse_batch([TOLOSA])) == ["respaldo"]
+    assert provider.requests == 2
+    # Las respuestas del respaldo no se cachean
+    assert provider.cache.stats()["cache_size"] == 0
+
+
+def test_half_open_lets_a_single_probe_through(stub, monkeypatch):
+    monkeypatch.setattr(stub, "FAILURE_RATE", 1.0)
+    provider = _provider(batch_size=1, failure_threshold=1, reset_seconds=30)
+    _run(provider.reverse_batch([CENTRO]))
+    assert provider.breaker.state == "open"
+
+    # Pasa el tiempo de espera y el servicio se recupera
+    provider.breaker.opened_at -= 31
+    monkeypatch.setattr(stub, "FAILURE_RATE", 0)
+    requests = provider.requests
+
+    # 4 lotes a la vez: solo UNO sale como prueba, el resto usa el respaldo
+    points = [CENTRO, TOLOSA, FUERA, (-34.94, -57.90)]
+    names = _run(provider.reverse_batch(points))
+    assert provider.requests == requests + 1
+    assert names.count("respaldo") == 3
+    assert provider.breaker.state == "closed"
+
+    # Cerrado otra vez: todo va al servicio
+    assert "respaldo" not in _run(provider.reverse_batch(points))
+
+
+def test_failed_probe_reopens(stub, monkeypatch):
+    monkeypatch.setattr(stub, "FAILURE_RATE", 1.0)
+    provider = _provider(batch_size=1, failure_threshold=3)
+    for _ in range(3):
+        _run(provider.reverse_batch([CENTRO]))
+    assert provider.breaker.times_opened == 1
+
+    provider.breaker.opened_at -= 31
+    assert provider.breaker.state == "half-open"
+    _run(provider.reverse_batch([CENTRO]))
+    # Una sola falla en semi-abierto alcanza para volver a abrir
+    assert provider.breaker.state == "open"
+    assert provider.breaker.times_opened == 2
+    assert not provider.breaker.probe_in_flight
+
+
+def test_cancelled_probe_releases_the_slot():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.abort_probe()
+    assert breaker.allow()
+
+
+# --- Caché LRU ---
+
+def test_cache_is_lru_and_quantized():
+    cache = GeocodeCache(max_size=2, precision=3)
+    assert cache.key(-34.91234, -57.95678) == (-34.912, -57.957)
+
+    cache.put(cache.key(1, 1), "a")
+    cache.put(cache.key(2, 2), "b")
+    assert cache.get(cache.key(1, 1)) == "a"   # 'a' pasa a ser la más reciente
+    cache.put(cache.key(3, 3), "c")            # se descarta 'b'
+
+    assert cache.get(cache.key(2, 2)) is None
+    assert cache.get(cache.key(3, 3)) == "c"
+    assert cache.stats()["cache_size"] == 2
+    assert (cache.hits, cache.misses) == (2, 1)
\ No newline at end of file
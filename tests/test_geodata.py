@@ -0,0 +1,96 @@
+import struct
+
+import numpy as np
+import pytest
+
+from app.core.geodata import (
+    CompactGeodata,
+    areas_from_bounding_boxes,
+    box_to_ring,
+    write_geodata,
+)
+
+
+def _linear_find(areas, lat, lon):
+    """Referencia: recorre todas las cajas en orden."""
+    for name, ring in areas:
+        lats = [p[0] for p in ring]
+        lons = [p[1] for p in ring]
+        if min(lats) <= lat <= max(lats) and min(lons) <= lon <= max(lons):
+            return name
+    return None
+
+
+@pytest.fixture
+def grid_areas():
+    """Barrios en cuadrícula (5.000 áreas) con algunas superpuestas."""
+    areas = []
+    for row in range(70):
+        for col in range(70):
+            lat, lon = -35.0 + row * 0.01, -58.5 + col * 0.01
+            areas.append((f"B{row}-{col}", box_to_ring([lat, lon, lat + 0.01, lon + 0.01])))
+    for i in range(100):
+        lat, lon = -35.0 + i * 0.005, -58.5 + i * 0.005
+        areas.append((f"Grande{i}", box_to_ring([lat, lon, lat + 0.05, lon + 0.05])))
+    return areas
+
+
+def test_roundtrip_names_and_boxes(tmp_path):
+    areas = areas_from_bounding_boxes({
+        "Centro": [-34.93, -57.97, -34.90, -57.93],
+        "Tolosa": [-34.90, -57.98, -34.87, -57.95],
+    })
+    path = str(tmp_path / "areas.bin")
+    write_geodata(path, areas)
+
+    geodata = CompactGeodata(path)
+    assert geodata.n_areas == 2
+    assert [geodata.name(i) for i in range(2)] == ["Centro", "Tolosa"]
+    assert geodata.find_area(-34.92, -57.95) == "Centro"
+    assert geodata.find_area(-34.88, -57.96) == "Tolosa"
+    assert geodata.find_area(-34.50, -57.50) is None
+    # Borde compartido: gana la primera área (orden de construcción)
+    assert geodata.find_area(-34.90, -57.96) == "Centro"
+
+
+def test_polygon_outside_ring_but_inside_box(tmp_path):
+    triangle = [(0.0, 0.0), (0.0, 1.0), (1.0, 0.0), (0.0, 0.0)]
+    path = str(tmp_path / "areas.bin")
+    write_geodata(path, [("Triángulo", triangle)])
+
+    geodata = CompactGeodata(path)
+    assert geodata.find_area(0.2, 0.2) == "Triángulo"
+    assert geodata.find_area(0.9, 0.9) is None
+
+
+def test_grid_matches_linear_scan(tmp_path, grid_areas):
+    path = str(tmp_path / "areas.bin")
+    write_geodata(path, grid_areas)
+
+    rng = np.random.default_rng(0)
+    points = np.column_stack([
+        rng.uniform(-35.05, -34.25, 500),
+        rng.uniform(-58.55, -57.75, 500),
+    ])
+    # También puntos exactamente sobre bordes de celdas y cajas
+    points = np.vstack([points, [[-35.0 + 0.01 * k, -58.5 + 0.01 * k] for k in range(71)]])
+
+    geodata = CompactGeodata(path)
+    assert geodata.grid_rows > 1
+    for lat, lon in points.tolist():
+        assert geodata.find_area(lat, lon) == _linear_find(grid_areas, lat, lon)
+
+
+def test_empty_file(tmp_path):
+    path = str(tmp_path / "areas.bin")
+    write_geodata(path, [])
+    geodata = CompactGeodata(path)
+    assert geodata.n_areas == 0
+    assert geodata.find_area(-34.9, -57.9) is None
+
+
+def test_rejects_old_version(tmp_path):
+    path = tmp_path / "areas.bin"
+    path.write_bytes(struct.pack("<4sIIIQ", b"GEOD", 1, 0, 0, 0))
+    with pytest.raises(ValueError):
+        CompactGeodata(str(path))
\ No newline at end of file
@@ -0,0 +1,62 @@
+import json
+import logging
+import queue
+
+from app.core.logger import REDACTED, JsonFormatter, NonBlockingQueueHandler, redact
+
+
+def _record(fields, message="Intento de login"):
+    record = logging.LogRecord("app.test", logging.INFO, __file__, 1, message, None, None)
+    record.fields = fields
+    return record
+
+
+def test_redact_nested_and_case_insensitive():
+    data = {
+        "username": "ana@example.com",
+        "Password": "hunter2",
+        "headers": {"Authorization": "Bearer abc", "accept": "application/json"},
+        "tokens": [{"refresh_token": "r1"}, {"access_token": "a1", "id": 7}],
+    }
+    assert redact(data) == {
+        "username": "ana@example.com",
+        "Password": REDACTED,
+        "headers": {"Authorization": REDACTED, "accept": "application/json"},
+        "tokens": [{"refresh_token": REDACTED}, {"access_token": REDACTED, "id": 7}],
+    }
+    # No modifica el original
+    assert data["Password"] == "hunter2"
+
+
+def test_json_formatter_never_writes_secrets():
+    line = JsonFormatter().format(_record({
+        "username": "ana@example.com",
+        "password": "hunter2",
+        "hashed_password": "$5$rounds=...",
+        "secret_key": "s3cr3t",
+        "token": "abc.def.ghi",
+    }))
+    data = json.loads(line)
+
+    for secret in ("hunter2", "$5$rounds=...", "s3cr3t", "abc.def.ghi"):
+        assert secret not in line
+    assert data["password"] == REDACTED
+    assert data["username"] == "ana@example.com"
+    assert data["message"] == "Intento de login"
+
+
+def test_queue_handler_redacts_after_crossing_threads():
+    log_queue = queue.Queue()
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.handle(_record({"refresh_token": "r1", "user_id": "u1"}))
+
+    line = JsonFormatter().format(log_queue.get_nowait())
+    assert "r1" not in line
+    assert json.loads(line)["user_id"] == "u1"
+
+
+def test_queue_handler_drops_when_full():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    for _ in range(3):
+        handler.handle(_record({}))
+    assert handler.dropped == 2
\ No newline at end of file
@@ -0,0 +1,117 @@
+import asyncio
+import ipaddress
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.core import rate_limit
+from app.core.rate_limit import (
+    InMemoryRateLimitBackend,
+    LoginThrottle,
+    TokenBucketLimiter,
+    client_key,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", fake)
+    return fake
+
+
+def _request(peer: str, forwarded=None) -> Request:
+    headers = [(b"x-forwarded-for", value.encode()) for value in (forwarded or [])]
+    return Request({"type": "http", "client": (peer, 5000), "headers": headers})
+
+
+def test_bucket_allows_burst_then_waits(clock):
+    limiter = TokenBucketLimiter("t", capacity=3, refill_per_minute=6, backend=InMemoryRateLimitBackend())
+
+    waits = [asyncio.run(limiter.hit("a")) for _ in range(4)]
+    assert waits[:3] == [0, 0, 0]
+    assert waits[3] == pytest.approx(10.0)  # 1 token cada 10 s
+    assert limiter.stats()["allowed"] == 3
+    assert limiter.stats()["rejected"] == 1
+
+    # Otro balde no se ve afectado
+    assert asyncio.run(limiter.hit("b")) == 0
+
+    # Tras 10 s se recupera exactamente un token
+    clock.now += 10
+    assert asyncio.run(limiter.hit("a")) == 0
+    assert asyncio.run(limiter.hit("a")) > 0
+
+
+def test_bucket_refill_is_capped(clock):
+    limiter = TokenBucketLimiter("t", capacity=2, refill_per_minute=60, backend=InMemoryRateLimitBackend())
+    asyncio.run(limiter.hit("a"))
+    clock.now += 3600
+    waits = [asyncio.run(limiter.hit("a")) for _ in range(3)]
+    assert waits[:2] == [0, 0]
+    assert waits[2] > 0
+
+
+def test_backend_evicts_least_recently_used(clock):
+    backend = InMemoryRateLimitBackend(max_keys=2)
+    for key in ("a", "b", "c"):
+        asyncio.run(backend.consume(key, capacity=1, refill_per_second=0.01))
+    # 'a' se descartó: vuelve con el balde lleno
+    assert asyncio.run(backend.consume("a", capacity=1, refill_per_second=0.01)) == 0
+    assert asyncio.run(backend.consume("c", capacity=1, refill_per_second=0.01)) > 0
+
+
+def test_throttle_blocks_account_with_retry_after(clock):
+    throttle = LoginThrottle(InMemoryRateLimitBackend())
+    capacity = throttle.per_account.capacity
+
+    for _ in range(capacity):
+        asyncio.run(throttle.check("Ana@Example.com", "1.1.1.1"))
+
+    # Misma cuenta (normalizada) desde otra IP: bloqueada
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(throttle.check(" ana@example.com", "2.2.2.2"))
+    assert error.value.status_code == 429
+    assert int(error.value.headers["Retry-After"]) >= 1
+
+    # Otra cuenta desde la misma IP sigue pudiendo
+    asyncio.run(throttle.check("otro@example.com", "1.1.1.1"))
+
+
+def test_blocked_client_does_not_spend_account_tokens(clock):
+    throttle = LoginThrottle(InMemoryRateLimitBackend())
+
+    for i in range(throttle.per_client.capacity):
+        asyncio.run(throttle.check(f"user{i}@example.com", "6.6.6.6"))
+    for _ in range(10):
+        with pytest.raises(HTTPException):
+            asyncio.run(throttle.check("victima@example.com", "6.6.6.6"))
+
+    # El dueño legítimo (otra IP) no quedó bloqueado por el atacante
+    asyncio.run(throttle.check("victima@example.com", "3.3.3.3"))
+
+
+def test_client_key_ignores_forwarded_from_untrusted_peer():
+    proxies = [ipaddress.ip_network("10.0.0.0/8")]
+    request = _request("8.8.8.8", ["1.2.3.4"])
+    assert client_key(request, proxies) == "8.8.8.8"
+    assert client_key(request, []) == "8.8.8.8"
+
+
+def test_client_key_uses_forwarded_from_trusted_proxy():
+    proxies = [ipaddress.ip_network("10.0.0.0/8")]
+    # El cliente intenta falsificar la primera IP; el proxy agrega la real
+    request = _request("10.0.0.2", ["9.9.9.9, 203.0.113.7", "10.0.0.1"])
+    assert client_key(request, proxies) == "203.0.113.7"
+
+    # Sin encabezado: la IP del proxy
+    assert client_key(_request("10.0.0.2"), proxies) == "10.0.0.2"
\ No newline at end of file
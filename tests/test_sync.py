@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+from app.config.settings import settings
+from app.core.security import get_current_user
+from app.core.stop_builder import build_stop_document
+from app.core.sync import requires_full_resync, sync_upper_bound
+from app.main import app
+from app.routes import stop_routes
+from app.schemas.stop_schema import StopCreate
+from fake_mongo import FakeCollection
+
+ROUTE_ID = ObjectId()
+
+
+def test_upper_bound_lags_behind_now():
+    before = datetime.now(timezone.utc)
+    upper = sync_upper_bound()
+    lag = timedelta(seconds=settings.SYNC_WATERMARK_LAG_SECONDS)
+    assert before - lag - timedelta(seconds=1) <= upper <= datetime.now(timezone.utc) - lag
+    assert upper.tzinfo is not None
+
+
+def test_requires_full_resync():
+    retention = timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    now = datetime.now(timezone.utc)
+
+    assert requires_full_resync(None)
+    assert requires_full_resync(now - retention - timedelta(minutes=1))
+    assert not requires_full_resync(now - retention + timedelta(minutes=1))
+    assert not requires_full_resync(now - timedelta(minutes=5))
+    # Motor devuelve fechas "naive" en UTC
+    assert not requires_full_resync((now - timedelta(minutes=5)).replace(tzinfo=None))
+    assert requires_full_resync((now - retention - timedelta(hours=1)).replace(tzinfo=None))
+
+
+def _stop(order: int, updated_at: datetime):
+    document = build_stop_document(ROUTE_ID, StopCreate(
+        customer_name=f"Cliente {order}",
+        order_in_route=order,
+        neighborhood_cliente="Centro",
+        phone_cliente="2215551234",
+        gps_lat_cliente=-34.92,
+        gps_lon_cliente=-57.95,
+        address_street_cliente="Calle 7",
+        address_number_cliente=str(1000 + order),
+        validation_data={"correct_street": "Calle 7", "correct_number": str(1000 + order)},
+    ))
+    document["_id"] = ObjectId()
+    document["updated_at"] = updated_at
+    return document
+
+
+async def _fake_validate_stops(stops):
+    return [{**stop, "validation_status": "OK", "validation_message": ""} for stop in stops]
+
+
+@pytest.fixture
+def now():
+    return datetime.now(timezone.utc)
+
+
+@pytest.fixture
+def stops(now):
+    return [
+        _stop(1, now - timedelta(hours=2)),
+        _stop(2, now - timedelta(minutes=10)),
+        # Escrita hace un instante (dentro del margen de la watermark)
+        _stop(3, now),
+    ]
+
+
+@pytest.fixture
+def client(monkeypatch, stops, now):
+    monkeypatch.setattr(stop_routes, "validate_stops", _fake_validate_stops)
+    monkeypatch.setattr(stop_routes, "collection_route", FakeCollection([{"_id": ROUTE_ID}]))
+    monkeypatch.setattr(stop_routes, "collection_stop", FakeCollection(stops))
+    monkeypatch.setattr(stop_routes, "collection_stop_tombstone", FakeCollection([
+        {"stop_id": ObjectId(), "route_id": ROUTE_ID, "deleted_at": now - timedelta(hours=3)},
+        {"stop_id": ObjectId(), "route_id": ROUTE_ID, "deleted_at": now - timedelta(minutes=20)},
+    ]))
+    app.dependency_overrides[get_current_user] = lambda: {"_id": ObjectId(), "role": "admin"}
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+def _changes(client, since=None):
+    params = {"since": since.isoformat()} if since else {}
+    response = client.get(f"/routes/{ROUTE_ID}/stops/changes", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_changes_are_bounded_by_the_watermark(client, stops, now, monkeypatch):
+    full = _changes(client)
+    assert full["full_resync"] is True
+    # La parada recién escrita queda para la próxima sincronización
+    assert [stop["order_in_route"] for stop in full["stops"]] == [1, 2]
+    watermark = datetime.fromisoformat(full["watermark"])
+    assert watermark < stops[2]["updated_at"]
+
+    delta = _changes(client, now - timedelta(hours=1))
+    assert delta["full_resync"] is False
+    assert [stop["order_in_route"] for stop in delta["stops"]] == [2]
+    assert len(delta["deleted_stop_ids"]) == 1
+
+    # Pasado el margen, la sincronización desde esa watermark trae la parada 3
+    monkeypatch.setattr(settings, "SYNC_WATERMARK_LAG_SECONDS", 0)
+    later = _changes(client, watermark)
+    assert [stop["order_in_route"] for stop in later["stops"]] == [3]
+    assert datetime.fromisoformat(later["watermark"]) > watermark
+
+
+def test_old_watermark_forces_full_resync(client, now):
+    retention = timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    response = _changes(client, now - retention - timedelta(days=1))
+    assert response["full_resync"] is True
+    assert response["deleted_stop_ids"] == []
+    assert len(response["stops"]) == 2
+
+
+def test_up_to_date_client_gets_nothing(client, now):
+    response = _changes(client, now)
+    assert response["stops"] == []
+    assert response["deleted_stop_ids"] == []
\ No newline at end of file